@@ -6,40 +6,303 @@ Handles CORS and proxies requests to FMP (Financial Modeling Prep) for real-time
 
 import http.server
 import socketserver
-import urllib.request
 import urllib.parse
 import json
+import logging
+import os
+import queue
+import signal
 import sys
+import threading
 import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from urllib.error import HTTPError, URLError
 
+from history_store import INTERVAL_SECONDS, HistoryStore, format_day, parse_day
+from indicators import IndicatorEngine
+from prefetcher import UniversePrefetcher
+from providers import (BULK_FIELDS, DETAIL_FIELDS, LIST_FIELDS, REALTIME_FIELDS, STREAM_FIELDS,
+                       FailoverProvider, FMPProvider, PolygonProvider, ReplayProvider, load_recording, normalize_quote)
+from proxy_logging import setup_logging
+from proxy_metrics import ProxyMetrics
+from quote_cache import QuoteCache
+from quote_store import COLUMNS as SCAN_COLUMNS, HAVE_NUMPY, QuoteStore
+from quote_stream import SSE_HEADERS, SSE_KEEPALIVE, QuoteStreamHub, sse_event, sse_quotes_event
+from rate_limit import UpstreamGovernor, upstream_priority
+from snapshot_store import SnapshotStore
+from serialization import build_json_response, to_columnar
+from universes import UniverseIndex
+from upstream_client import UpstreamClient
+
+# Server tuning - override through the supervisord environment
+PROXY_PORT = int(os.environ.get('PROXY_PORT', '8001'))
+PROXY_SERVER_MODE = os.environ.get('PROXY_SERVER_MODE', 'pool')  # 'pool', 'asyncio' or 'single'
+PROXY_WORKERS = int(os.environ.get('PROXY_WORKERS', '16'))
+PROXY_QUEUE_DEPTH = int(os.environ.get('PROXY_QUEUE_DEPTH', '64'))
+PROXY_DRAIN_TIMEOUT = float(os.environ.get('PROXY_DRAIN_TIMEOUT', '10'))
+ASYNC_REQUEST_TIMEOUT = float(os.environ.get('ASYNC_REQUEST_TIMEOUT', '30'))  # asyncio mode: 504 after this
+ASYNC_KEEPALIVE_TIMEOUT = float(os.environ.get('ASYNC_KEEPALIVE_TIMEOUT', '15'))
+ASYNC_MAX_CONNECTIONS = int(os.environ.get('ASYNC_MAX_CONNECTIONS', '10000'))
+QUOTE_CACHE_TTL = float(os.environ.get('QUOTE_CACHE_TTL', '5'))
+QUOTE_CACHE_MAX_ENTRIES = int(os.environ.get('QUOTE_CACHE_MAX_ENTRIES', '10000'))
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', '8'))
+BULK_CONCURRENCY = int(os.environ.get('BULK_CONCURRENCY', '4'))
+REALTIME_BATCH_SIZE = int(os.environ.get('REALTIME_BATCH_SIZE', '50'))
+REALTIME_MAX_TICKERS = int(os.environ.get('REALTIME_MAX_TICKERS', '200'))  # batch/realtime: more is a 400, never truncated
+FMP_API_KEY = os.environ.get('FMP_API_KEY', 'm2XfxOS0sZxs6hLEY5yRzUgDyp5Dur4V')
+FMP_BASE_URL = os.environ.get('FMP_BASE_URL', 'https://financialmodelingprep.com/api/v3')
+POLYGON_API_KEY = os.environ.get('POLYGON_API_KEY', '')
+POLYGON_BASE_URL = os.environ.get('POLYGON_BASE_URL', 'https://api.polygon.io')
+QUOTE_PROVIDER = os.environ.get('QUOTE_PROVIDER', 'fmp')  # 'fmp', 'polygon' or 'replay'
+QUOTE_PROVIDER_FALLBACK = os.environ.get('QUOTE_PROVIDER_FALLBACK', '')  # tried when the provider fails
+REPLAY_FILE = os.environ.get('REPLAY_FILE', '')  # replay: recorded quotes, synthetic when unset
+REPLAY_LATENCY = float(os.environ.get('REPLAY_LATENCY', '0.05'))
+REPLAY_ERROR_RATE = float(os.environ.get('REPLAY_ERROR_RATE', '0'))  # share of replay calls failing with 503
+REPLAY_THROTTLE_RATE = float(os.environ.get('REPLAY_THROTTLE_RATE', '0'))  # share failing with 429
+UPSTREAM_RATE = float(os.environ.get('UPSTREAM_RATE', '5'))  # upstream calls per second (used when UPSTREAM_RPM is unset)
+UPSTREAM_RPM = float(os.environ.get('UPSTREAM_RPM', str(UPSTREAM_RATE * 60)))  # upstream calls per minute
+UPSTREAM_BURST = float(os.environ.get('UPSTREAM_BURST', '10'))
+UPSTREAM_DAILY_LIMIT = int(os.environ.get('UPSTREAM_DAILY_LIMIT', '0'))  # FMP plan calls per day, 0 = unlimited
+UPSTREAM_COALESCE_MAX = int(os.environ.get('UPSTREAM_COALESCE_MAX', '50'))  # symbols per coalesced /quote call
+UPSTREAM_QUEUE_TIMEOUT = float(os.environ.get('UPSTREAM_QUEUE_TIMEOUT', '30'))  # max wait for budget
+UPSTREAM_BACKOFF_MAX = float(os.environ.get('UPSTREAM_BACKOFF_MAX', '60'))  # longest 429 pause
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', '8'))  # keep-alive connections per host
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', '3'))
+UPSTREAM_READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', '10'))
+UPSTREAM_RETRIES = int(os.environ.get('UPSTREAM_RETRIES', '2'))
+PROXY_LOG_LEVEL = os.environ.get('PROXY_LOG_LEVEL', 'INFO')
+PROXY_LOG_FORMAT = os.environ.get('PROXY_LOG_FORMAT', 'json')  # 'json' or 'text'
+PROXY_LOG_SAMPLE_RATE = float(os.environ.get('PROXY_LOG_SAMPLE_RATE', '0.05'))  # share of per-quote lines kept
+PROXY_METRICS_ENABLED = os.environ.get('PROXY_METRICS', '1') == '1'
+PREFETCH_ENABLED = os.environ.get('PREFETCH_ENABLED', '1') == '1'
+PREFETCH_UNIVERSES = os.environ.get('PREFETCH_UNIVERSES', 'popular,sp500_top50,growth,high_volume,volatility')
+PREFETCH_INTERVAL = float(os.environ.get('PREFETCH_INTERVAL', '15'))
+PREFETCH_CONCURRENCY = int(os.environ.get('PREFETCH_CONCURRENCY', '2'))  # own threads, never the client batch executor
+STREAM_INTERVAL = float(os.environ.get('STREAM_INTERVAL', '2'))  # shared upstream poll period
+STREAM_MAX_CLIENTS = int(os.environ.get('STREAM_MAX_CLIENTS', '0'))  # 0 = by serving mode, see stream_client_limit()
+STREAM_MAX_SYMBOLS = int(os.environ.get('STREAM_MAX_SYMBOLS', '500'))
+STREAM_HEARTBEAT = float(os.environ.get('STREAM_HEARTBEAT', '15'))
+STREAM_WRITE_TIMEOUT = float(os.environ.get('STREAM_WRITE_TIMEOUT', '10'))
+PREFETCH_MAX_AGE = float(os.environ.get('PREFETCH_MAX_AGE', '60'))  # older snapshots fall back to a live fetch
+SCAN_MAX_AGE = float(os.environ.get('SCAN_MAX_AGE', '120'))  # store rows older than this are refetched / skipped
+SCAN_MAX_LIMIT = int(os.environ.get('SCAN_MAX_LIMIT', '500'))
+INDICATOR_WINDOW = int(os.environ.get('INDICATOR_WINDOW', '30'))  # ticks kept per symbol for volatility
+INDICATOR_MAX_SYMBOLS = int(os.environ.get('INDICATOR_MAX_SYMBOLS', '5000'))
+UNIVERSES_FILE = os.environ.get('UNIVERSES_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'universes.json'))
+UNIVERSES_RELOAD_CHECK = float(os.environ.get('UNIVERSES_RELOAD_CHECK', '5'))  # seconds between mtime checks
+# Runtime data stays out of the web root: the static server (and gateway) would serve it otherwise
+PROXY_DATA_DIR = os.environ.get('PROXY_DATA_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'scanner_pro_ai'))
+SNAPSHOT_ENABLED = os.environ.get('SNAPSHOT_ENABLED', '1') == '1'  # persist quotes for warm restarts
+SNAPSHOT_FILE = os.environ.get('SNAPSHOT_FILE', os.path.join(PROXY_DATA_DIR, 'api_proxy_snapshot.log'))
+SNAPSHOT_FLUSH_INTERVAL = float(os.environ.get('SNAPSHOT_FLUSH_INTERVAL', '1'))
+HISTORY_DIR = os.environ.get('HISTORY_DIR', os.path.join(PROXY_DATA_DIR, 'history_cache'))
+HISTORY_TAIL_TTL = float(os.environ.get('HISTORY_TAIL_TTL', '60'))  # refresh of the session in progress
+HISTORY_MAX_SYMBOLS = int(os.environ.get('HISTORY_MAX_SYMBOLS', '50'))
+HISTORY_CONCURRENCY = int(os.environ.get('HISTORY_CONCURRENCY', '4'))  # own threads, never the client batch executor
+
+logger = logging.getLogger('api_proxy')
+
+
+# Stock universes live in universes.json; edits are picked up without a restart
+UNIVERSES = UniverseIndex(UNIVERSES_FILE, check_interval=UNIVERSES_RELOAD_CHECK)
+
+
+class WorkerPoolHTTPServer(socketserver.TCPServer):
+    """TCP server that hands accepted connections to a bounded pool of worker threads.
+
+    Connections wait in a queue of at most ``queue_depth`` entries; once the
+    queue is full new clients get an immediate 503 instead of stalling behind
+    slow upstream calls. ``server_close`` drains queued and in-flight requests
+    for up to ``drain_timeout`` seconds before the workers exit.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+    request_queue_size = 128  # listen backlog; socketserver's 5 drops SYNs (1s client stalls) on bursts
+
+    def __init__(self, server_address, handler_class, workers=PROXY_WORKERS,
+                 queue_depth=PROXY_QUEUE_DEPTH, drain_timeout=PROXY_DRAIN_TIMEOUT):
+        self.workers = max(1, workers)
+        self.drain_timeout = drain_timeout
+        self._requests = queue.Queue(maxsize=max(1, queue_depth))
+        self._threads = []
+        self._active = 0
+        self._active_lock = threading.Lock()
+        self.rejected = 0
+        super().__init__(server_address, handler_class)
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"proxy-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def process_request(self, request, client_address):
+        """Queue the connection for a worker, or reject it when saturated"""
+        try:
+            self._requests.put_nowait((request, client_address))
+        except queue.Full:
+            self.rejected += 1
+            self._reject_request(request)
+
+    def _reject_request(self, request):
+        """Answer with a fast 503 without touching the handler"""
+        body = json.dumps({
+            "status": "error",
+            "message": "Proxy saturated, retry shortly",
+            "code": 503
+        }).encode()
+        head = (
+            "HTTP/1.0 503 Service Unavailable\r\n"
+            "Content-Type: application/json\r\n"
+            "Access-Control-Allow-Origin: *\r\n"
+            "Retry-After: 1\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode()
+        try:
+            request.sendall(head + body)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def _worker(self):
+        """Worker loop - serve queued connections until a stop sentinel arrives"""
+        while True:
+            item = self._requests.get()
+            if item is None:
+                self._requests.task_done()
+                return
+            request, client_address = item
+            with self._active_lock:
+                self._active += 1
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                with self._active_lock:
+                    self._active -= 1
+                self._requests.task_done()
+
+    def stats(self):
+        """Snapshot of pool utilisation"""
+        with self._active_lock:
+            active = self._active
+        return {
+            "workers": self.workers,
+            "active": active,
+            "queued": self._requests.qsize(),
+            "queue_depth": self._requests.maxsize,
+            "rejected": self.rejected
+        }
+
+    def server_close(self):
+        """Stop accepting, drain queued work, then stop the workers"""
+        super().server_close()
+        deadline = time.monotonic() + self.drain_timeout
+        for thread in self._threads:
+            # Sentinels queue behind pending requests so those still get served
+            while True:
+                try:
+                    self._requests.put(None, timeout=0.1)
+                    break
+                except queue.Full:
+                    if time.monotonic() >= deadline:
+                        break
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
 class APIProxyHandler(http.server.BaseHTTPRequestHandler):
     
-    # API Configuration - Using FMP for real-time live data
-    FMP_API_KEY = 'm2XfxOS0sZxs6hLEY5yRzUgDyp5Dur4V'
-    FMP_BASE_URL = 'https://financialmodelingprep.com/api/v3'
+    # Upstream data source (FMP by default), set right after the class - see create_provider()
+    provider = None
+    
+    # Shared by every handler thread - one upstream fetch per symbol per TTL
+    quote_cache = QuoteCache(ttl=QUOTE_CACHE_TTL, max_entries=QUOTE_CACHE_MAX_ENTRIES)
+    governor = UpstreamGovernor(
+        UPSTREAM_RPM, UPSTREAM_BURST,
+        max_coalesce=UPSTREAM_COALESCE_MAX,
+        retries=UPSTREAM_RETRIES,
+        backoff_max=UPSTREAM_BACKOFF_MAX,
+        daily_limit=UPSTREAM_DAILY_LIMIT
+    )
+    upstream = UpstreamClient(
+        max_per_host=UPSTREAM_POOL_SIZE,
+        connect_timeout=UPSTREAM_CONNECT_TIMEOUT,
+        read_timeout=UPSTREAM_READ_TIMEOUT,
+        retries=0,  # the governor retries, taking budget for every attempt
+        retry_statuses=()
+    )
+    metrics = ProxyMetrics(enabled=PROXY_METRICS_ENABLED)
+    prefetcher = None  # UniversePrefetcher, started by main()
+    stream_hub = None  # QuoteStreamHub, created by main()
+    snapshot_store = None  # SnapshotStore, created by main()
+    history_store = None  # HistoryStore, created by main()
+    quote_store = QuoteStore() if HAVE_NUMPY else None  # fed by every upstream /quote fetch
+    indicators = IndicatorEngine(window=INDICATOR_WINDOW, max_symbols=INDICATOR_MAX_SYMBOLS)  # same feed
+    batch_executor = ThreadPoolExecutor(max_workers=max(1, BULK_CONCURRENCY), thread_name_prefix='fmp-batch')
+    # Background batches park here while they wait for budget, so client batches always reach the governor
+    prefetch_executor = ThreadPoolExecutor(max_workers=max(1, PREFETCH_CONCURRENCY), thread_name_prefix='fmp-prefetch')
+    # Cold history reads wait for budget per missing range - same reason
+    history_executor = ThreadPoolExecutor(max_workers=max(1, HISTORY_CONCURRENCY), thread_name_prefix='fmp-history')
     
     def _send_cors_headers(self):
         """Send CORS headers for cross-origin requests"""
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.send_header('Content-Type', 'application/json')
     
     def do_OPTIONS(self):
         """Handle preflight OPTIONS requests"""
         self.send_response(200)
         self._send_cors_headers()
+        self.send_header('Content-Length', '0')
         self.end_headers()
     
+    # Paths reported as their own metrics label; everything else is 'other'
+    METRIC_ENDPOINTS = frozenset({
+        '/api/test', '/api/fmp/quote', '/api/fmp/batch-quotes', '/api/fmp/realtime-quotes',
+        '/api/fmp/bulk-quotes', '/api/fmp/history', '/api/scan', '/api/stream', '/metrics'
+    })
+    
+    # Upstream priority class per endpoint label; everything else is 'batch'
+    ENDPOINT_PRIORITIES = {
+        '/api/fmp/quote': 'interactive',
+        '/api/fmp/quote/{ticker}': 'interactive'
+    }
+    
+    def send_response(self, code, message=None):
+        """Remember the status code for request metrics"""
+        self._response_status = code
+        super().send_response(code, message)
+    
     def do_GET(self):
         """Handle GET requests and proxy to FMP API for real-time data"""
+        path = urllib.parse.urlparse(self.path).path
+        if path.startswith('/api/fmp/quote/'):
+            endpoint = '/api/fmp/quote/{ticker}'
+        elif path in self.METRIC_ENDPOINTS:
+            endpoint = path
+        else:
+            endpoint = '/api/*/stats' if path.endswith('/stats') else 'other'
+        self._response_status = 500
+        self.metrics.begin_request(endpoint)
+        try:
+            with upstream_priority(self.ENDPOINT_PRIORITIES.get(endpoint, 'batch')):
+                self._route_get()
+        finally:
+            self.metrics.end_request(self._response_status)
+    
+    def _route_get(self):
+        """Dispatch a GET request to its handler"""
         try:
             parsed_path = urllib.parse.urlparse(self.path)
             path = parsed_path.path
             query_params = urllib.parse.parse_qs(parsed_path.query)
+            self.query_params = query_params
             
-            print(f"📡 Proxy request: {path}")
+            logger.debug("📡 Proxy request: %s", path)
             
             if path == '/api/test':
                 self._handle_test_request()
@@ -56,14 +319,66 @@ class APIProxyHandler(http.server.BaseHTTPRequestHandler):
                 tickers = query_params.get('tickers', ['AAPL,MSFT,NVDA,GOOGL,TSLA'])[0].split(',')
                 self._handle_fmp_realtime_quotes(tickers)
             elif path == '/api/fmp/bulk-quotes':
-                # New bulk endpoint for large universes
+                # New bulk endpoint for large universes (comma list + mode=union|intersection)
                 universe = query_params.get('universe', ['popular'])[0]
-                self._handle_fmp_bulk_quotes(universe)
+                mode = query_params.get('mode', ['union'])[0]
+                self._handle_fmp_bulk_quotes(universe, mode)
+            elif path == '/api/fmp/history':
+                if self.history_store is None:
+                    self._send_error_response(404, "History cache is disabled")
+                else:
+                    self._handle_fmp_history(query_params)
+            elif path == '/api/history/stats':
+                if self.history_store is None:
+                    self._send_error_response(404, "History cache is disabled")
+                else:
+                    self._send_json_response({"status": "success", "history": self.history_store.stats()})
+            elif path == '/api/scan':
+                self._handle_scan(query_params)
+            elif path == '/api/scan/stats':
+                if self.quote_store is None:
+                    self._send_error_response(501, "Quote store needs numpy")
+                else:
+                    self._send_json_response({"status": "success", "store": self.quote_store.stats()})
+            elif path == '/api/universes':
+                self._handle_universes(query_params.get('symbol', [None])[0])
+            elif path == '/api/snapshot/stats':
+                if self.snapshot_store is None:
+                    self._send_error_response(404, "Snapshots are disabled")
+                else:
+                    self._send_json_response({"status": "success", "snapshot": self.snapshot_store.stats()})
+            elif path == '/api/indicators/stats':
+                self._send_json_response({"status": "success", "indicators": self.indicators.stats()})
+            elif path == '/metrics':
+                self._handle_metrics()
+            elif path == '/api/cache/stats':
+                self._send_json_response({"status": "success", "cache": self.quote_cache.stats()})
+            elif path == '/api/stream':
+                symbols = [t for t in query_params.get('symbols', [''])[0].split(',') if t.strip()]
+                universes = [u for u in query_params.get('universes', [''])[0].split(',') if u.strip()]
+                self._handle_quote_stream(symbols, universes)
+            elif path == '/api/stream/stats':
+                if self.stream_hub is None:
+                    self._send_error_response(404, "Streaming is disabled")
+                else:
+                    self._send_json_response({"status": "success", "stream": self.stream_hub.stats()})
+            elif path == '/api/prefetch/stats':
+                if self.prefetcher is None:
+                    self._send_error_response(404, "Prefetcher is disabled")
+                else:
+                    self._send_json_response({"status": "success", "prefetch": self.prefetcher.stats()})
+            elif path == '/api/upstream/stats':
+                self._send_json_response({
+                    "status": "success",
+                    "provider": self.provider.stats(),
+                    "pool": self.upstream.stats(),
+                    "governor": self.governor.stats()
+                })
             else:
                 self._send_error_response(404, "Endpoint not found")
                 
         except Exception as e:
-            print(f"❌ Proxy error: {e}")
+            logger.exception("❌ Proxy error: %s", e)
             self._send_error_response(500, f"Internal server error: {str(e)}")
     
     def _handle_test_request(self):
@@ -76,48 +391,190 @@ class APIProxyHandler(http.server.BaseHTTPRequestHandler):
             "endpoints": [
                 "/api/fmp/quote/{ticker}",
                 "/api/fmp/batch-quotes?tickers=AAPL,MSFT,...",
-                "/api/fmp/realtime-quotes?tickers=AAPL,MSFT,..."
+                "/api/fmp/realtime-quotes?tickers=AAPL,MSFT,...",
+                "/api/fmp/bulk-quotes?universe=popular",
+                "/api/fmp/bulk-quotes?universe=growth,meme&mode=union|intersection",
+                "/api/universes?symbol=TSLA",
+                "/api/fmp/history?symbols=AAPL,MSFT&interval=1day&from=2024-01-01&to=2024-06-30",
+                "add &indicators=1 to quote endpoints for VWAP/EMA/RSI/volatility/relative volume",
+                "/api/scan?universe=popular&min_volume=1000000&sort=change&limit=20",
+                "/api/stream?symbols=AAPL,MSFT&universes=popular (Server-Sent Events)",
+                "/api/cache/stats",
+                "/api/upstream/stats",
+                "/api/prefetch/stats",
+                "/metrics (Prometheus)"
             ]
         }
         self._send_json_response(response_data)
     
+    def _handle_metrics(self):
+        """Prometheus text exposition of request metrics plus component gauges"""
+        if not self.metrics.enabled:
+            self._send_error_response(404, "Metrics are disabled (PROXY_METRICS=0)")
+            return
+        
+        gauges = {}
+        def add_gauges(prefix, description, stats):
+            for name, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauges[f"{prefix}_{name}"] = (f"{description} {name}", [({}, value)])
+        
+        add_gauges('proxy_cache', 'Quote cache', self.quote_cache.stats())
+        add_gauges('proxy_upstream_pool', 'Upstream connection pool', self.upstream.stats())
+        add_gauges('proxy_provider', 'Quote data provider', self.provider.stats())
+        governor_stats = self.governor.stats()
+        add_gauges('proxy_upstream_quota', 'Upstream governor', governor_stats)
+        for priority, stats in governor_stats['priorities'].items():
+            add_gauges(f'proxy_upstream_{priority}', f'Upstream governor {priority} class', stats)
+        if hasattr(self.server, 'stats'):
+            add_gauges('proxy_server', 'Worker pool', self.server.stats())
+        if self.stream_hub is not None:
+            add_gauges('proxy_stream', 'Quote stream hub', self.stream_hub.stats())
+        if self.prefetcher is not None:
+            add_gauges('proxy_prefetch', 'Universe prefetcher', self.prefetcher.stats())
+        if self.quote_store is not None:
+            add_gauges('proxy_quote_store', 'Columnar quote store', self.quote_store.stats())
+        add_gauges('proxy_indicators', 'Indicator engine', self.indicators.stats())
+        if self.history_store is not None:
+            add_gauges('proxy_history', 'Historical bar cache', self.history_store.stats())
+        if self.snapshot_store is not None:
+            add_gauges('proxy_snapshot', 'Persistent quote snapshot', self.snapshot_store.stats())
+        
+        body = self.metrics.render(gauges).encode()
+        self._write_response(200, [
+            ('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+            ('Content-Length', str(len(body)))
+        ], body)
+    
+    @classmethod
+    def _get_json(cls, url, label, timeout=10):
+        """GET an upstream URL and decode the JSON body; ``label`` names the call in metrics"""
+        started = time.perf_counter()
+        try:
+            body = cls.upstream.get(url, timeout=timeout)
+        except Exception as e:
+            outcome = "throttled" if getattr(e, 'code', None) == 429 else "error"
+            cls.metrics.inc('proxy_upstream_calls_total', {"path": label, "outcome": outcome})
+            raise
+        cls.metrics.observe('proxy_upstream_seconds', time.perf_counter() - started, {"path": label})
+        cls.metrics.inc('proxy_upstream_calls_total', {"path": label, "outcome": "ok"})
+        with cls.metrics.span('parse'):
+            return json.loads(body.decode())
+    
+    @classmethod
+    def _fetch_quote_records(cls, symbols, timeout=10):
+        """Canonical quote records keyed by symbol, served from the shared cache when fresh"""
+        def fetch_batch(batch):
+            records = cls.provider.quotes(batch, timeout)
+            if cls.quote_store is not None:
+                cls.quote_store.update(records)
+            cls.indicators.update(records)
+            if cls.snapshot_store is not None:
+                cls.snapshot_store.record(records)
+            return records
+        
+        def fetch_missing(missing):
+            # Queued with every other thread's missing symbols, fetched in coalesced calls
+            return cls.governor.fetch_symbols('quote', missing, fetch_batch, timeout=UPSTREAM_QUEUE_TIMEOUT)
+        return cls.quote_cache.get_many('quote', symbols, fetch_missing)
+    
+    @classmethod
+    def _fetch_quote_short_records(cls, symbols, timeout=5):
+        """Short (price/volume) quote records keyed by symbol, served from the shared cache when fresh"""
+        def fetch_missing(missing):
+            return cls.governor.fetch_symbols('quote-short', missing, lambda batch: cls.provider.quote_short(batch, timeout),
+                                              timeout=UPSTREAM_QUEUE_TIMEOUT)
+        return cls.quote_cache.get_many('quote-short', symbols, fetch_missing)
+    
+    @classmethod
+    def _submit_batches(cls, fetch, symbols, batch_size, timeout, executor=None):
+        """Split symbols into batches and start fetching them on ``executor`` (the batch executor by default)"""
+        executor = executor or cls.batch_executor
+        batches = [symbols[i:i + batch_size] for i in range(0, len(symbols), batch_size)]
+        # Each batch carries the caller's context so it keeps the caller's upstream priority
+        return [(batch, executor.submit(contextvars.copy_context().run, fetch, batch, timeout))
+                for batch in batches]
+    
+    @staticmethod
+    def _collect_batches(submitted):
+        """Wait for submitted batches and merge their records.
+        
+        Returns the merged records keyed by symbol plus a list describing every
+        batch that failed, so callers can report partial results.
+        """
+        records = {}
+        failed_batches = []
+        for number, (batch, future) in enumerate(submitted, start=1):
+            try:
+                records.update(future.result())
+            except Exception as batch_error:
+                logger.warning("⚠️ Batch error for %s: %s", ', '.join(batch), batch_error,
+                               extra={"fields": {"batch": number, "symbols": len(batch)}})
+                failed_batches.append({
+                    "batch": number,
+                    "symbols": batch,
+                    "error": str(batch_error)
+                })
+        return records, failed_batches
+    
+    @classmethod
+    def _fetch_quote_batches(cls, symbols, batch_size=BULK_BATCH_SIZE, timeout=10, executor=None):
+        """Fetch /quote records for symbols as concurrent multi-symbol batches"""
+        return cls._collect_batches(cls._submit_batches(cls._fetch_quote_records, symbols, batch_size, timeout,
+                                                        executor))
+    
+    @classmethod
+    def _prefetch_quotes(cls, symbols):
+        """Prefetcher refreshes run in the lowest upstream priority class, on their own executor"""
+        with upstream_priority('background'):
+            return cls._fetch_quote_batches(symbols, executor=cls.prefetch_executor)
+    
+    @classmethod
+    def _fetch_stream_quotes(cls, symbols):
+        """Quotes for the streaming hub, keyed by symbol"""
+        records, failed_batches = cls._fetch_quote_batches(symbols, timeout=10)
+        return {symbol: normalize_quote(quote, STREAM_FIELDS) for symbol, quote in records.items()}
+    
+    @classmethod
+    def _fetch_history_bars(cls, symbol, interval, from_date, to_date):
+        """Daily or intraday bars for one symbol and date range, through the upstream governor"""
+        return cls.governor.call(lambda: cls.provider.history(symbol, interval, from_date, to_date),
+                                 timeout=UPSTREAM_QUEUE_TIMEOUT)
+    
+    @classmethod
+    def _restore_snapshot(cls, entries):
+        """Replay persisted quotes into the quote store and indicator engine, oldest first"""
+        by_time = {}
+        for symbol, (fetched_at, record) in entries.items():
+            by_time.setdefault(fetched_at, {})[symbol] = record
+        for fetched_at in sorted(by_time):
+            if cls.quote_store is not None:
+                cls.quote_store.update(by_time[fetched_at], updated_at=fetched_at)
+            cls.indicators.update(by_time[fetched_at])
+    
     def _handle_fmp_quote(self, ticker):
         """Fetch single stock quote from FMP API (real-time)"""
         try:
-            print(f"🔄 Fetching real-time quote for {ticker} from FMP...")
+            logger.debug("🔄 Fetching real-time quote for %s from FMP...", ticker)
             
-            # FMP real-time quote endpoint
-            url = f"{self.FMP_BASE_URL}/quote/{ticker.upper()}?apikey={self.FMP_API_KEY}"
+            # FMP real-time quote endpoint (shared cache, coalesced with concurrent requests)
+            with self.metrics.span('fetch'):
+                records = self._fetch_quote_records([ticker.upper()], timeout=10)
+            quote = records.get(ticker.upper())
             
-            with urllib.request.urlopen(url, timeout=10) as response:
-                data = json.loads(response.read().decode())
-            
-            if data and len(data) > 0:
-                quote = data[0]  # FMP returns array with single object
-                
+            if quote:
                 # Extract real-time data
-                quote_data = {
-                    "ticker": quote.get('symbol', ticker.upper()),
-                    "price": quote.get('price', 0),
-                    "change": quote.get('changesPercentage', 0),
-                    "change_amount": quote.get('change', 0),
-                    "volume": quote.get('volume', 0),
-                    "market_cap": quote.get('marketCap', 0),
-                    "pe": quote.get('pe', None),
-                    "day_low": quote.get('dayLow', 0),
-                    "day_high": quote.get('dayHigh', 0),
-                    "year_low": quote.get('yearLow', 0),
-                    "year_high": quote.get('yearHigh', 0),
-                    "timestamp": int(time.time()),
-                    "exchange": quote.get('exchange', 'NASDAQ'),
-                    "is_real_time": True
-                }
+                with self.metrics.span('normalize'):
+                    quote_data = normalize_quote(quote, DETAIL_FIELDS)
+                    quote_data["is_real_time"] = True
+                    self._attach_indicators([quote_data])
                 
                 response_data = {
                     "status": "success",
                     "quote": quote_data
                 }
-                print(f"✅ Real-time quote: {ticker} = ${quote_data['price']} ({quote_data['change']:+.2f}%)")
+                logger.info("✅ Real-time quote: %s = $%s (%s%%)", ticker, quote_data['price'], quote_data['change'],
+                            extra={"sampled": True})
                 
             else:
                 response_data = {
@@ -135,40 +592,38 @@ class APIProxyHandler(http.server.BaseHTTPRequestHandler):
     def _handle_fmp_batch_quotes(self, tickers):
         """Fetch multiple stock quotes from FMP (real-time batch)"""
         try:
-            print(f"🔄 Fetching real-time batch quotes for: {', '.join(tickers)}")
-            
-            # FMP batch quote endpoint - can handle multiple tickers at once
-            ticker_string = ','.join([t.upper().strip() for t in tickers[:20]])  # Limit to 20 tickers
-            url = f"{self.FMP_BASE_URL}/quote/{ticker_string}?apikey={self.FMP_API_KEY}"
+            logger.debug("🔄 Fetching real-time batch quotes for: %s", ', '.join(tickers))
             
-            with urllib.request.urlopen(url, timeout=15) as response:
-                data = json.loads(response.read().decode())
+            # Every ticker is queued with the upstream governor, which coalesces them into multi-symbol calls
+            symbols = list(dict.fromkeys(t.upper().strip() for t in tickers if t.strip()))
+            if len(symbols) > REALTIME_MAX_TICKERS:
+                self._send_error_response(400, f"Too many tickers: {len(symbols)} (max {REALTIME_MAX_TICKERS})")
+                return
+            with self.metrics.span('fetch'):
+                records, failed_batches = self._fetch_quote_batches(symbols, batch_size=REALTIME_BATCH_SIZE, timeout=15)
             
-            quotes = []
-            if data and isinstance(data, list):
-                for quote in data:
-                    quotes.append({
-                        "ticker": quote.get('symbol', ''),
-                        "price": quote.get('price', 0),
-                        "change": quote.get('changesPercentage', 0),
-                        "change_amount": quote.get('change', 0),
-                        "volume": quote.get('volume', 0),
-                        "market_cap": quote.get('marketCap', 0),
-                        "timestamp": int(time.time()),
-                        "is_real_time": True
-                    })
+            with self.metrics.span('normalize'):
+                quotes = []
+                for symbol in symbols:
+                    quote = records.get(symbol)
+                    if quote:
+                        quotes.append(dict(normalize_quote(quote, LIST_FIELDS), is_real_time=True))
+                self._attach_indicators(quotes)
             
-            print(f"✅ Fetched {len(quotes)} real-time quotes from FMP")
-            for quote in quotes:
-                print(f"   📈 {quote['ticker']}: ${quote['price']:.2f} ({quote['change']:+.2f}%)")
+            logger.info("✅ Fetched %d real-time quotes from FMP", len(quotes), extra={"fields": {"count": len(quotes)}})
+            if logger.isEnabledFor(logging.INFO):
+                for quote in quotes:
+                    logger.info("   📈 %s: $%s (%s%%)", quote['ticker'], quote['price'], quote['change'],
+                                extra={"sampled": True})
             
             response_data = {
                 "status": "success",
                 "count": len(quotes),
                 "quotes": quotes,
-                "provider": "FMP Real-time"
+                "failed_batches": failed_batches,
+                "provider": f"{self.provider.title} Real-time"
             }
-            self._send_json_response(response_data)
+            self._send_json_response(response_data, columnar=True)
             
         except HTTPError as e:
             self._send_error_response(e.code, f"FMP API error: {e.reason}")
@@ -178,296 +633,550 @@ class APIProxyHandler(http.server.BaseHTTPRequestHandler):
     def _handle_fmp_realtime_quotes(self, tickers):
         """Fetch real-time quotes using FMP's most current endpoint"""
         try:
-            print(f"🚀 Fetching REAL-TIME quotes for: {', '.join(tickers)}")
+            logger.debug("🚀 Fetching REAL-TIME quotes for: %s", ', '.join(tickers))
             
-            quotes = []
+            symbols = [t.upper().strip() for t in tickers if t.strip()]
+            symbols = list(dict.fromkeys(symbols))
+            if len(symbols) > REALTIME_MAX_TICKERS:
+                self._send_error_response(400, f"Too many tickers: {len(symbols)} (max {REALTIME_MAX_TICKERS})")
+                return
             
-            # Use FMP's real-time quote endpoint for maximum freshness
-            for ticker in tickers[:10]:  # Process up to 10 tickers
-                try:
-                    ticker = ticker.upper().strip()
-                    url = f"{self.FMP_BASE_URL}/quote-short/{ticker}?apikey={self.FMP_API_KEY}"
-                    
-                    with urllib.request.urlopen(url, timeout=5) as response:
-                        data = json.loads(response.read().decode())
-                    
-                    if data and len(data) > 0:
-                        quote = data[0]
-                        
-                        # Get detailed quote for more info
-                        detail_url = f"{self.FMP_BASE_URL}/quote/{ticker}?apikey={self.FMP_API_KEY}"
-                        with urllib.request.urlopen(detail_url, timeout=5) as detail_response:
-                            detail_data = json.loads(detail_response.read().decode())
-                        
-                        if detail_data and len(detail_data) > 0:
-                            detail = detail_data[0]
-                            
-                            quotes.append({
-                                "ticker": ticker,
-                                "price": quote.get('price', detail.get('price', 0)),
-                                "change": detail.get('changesPercentage', 0),
-                                "change_amount": detail.get('change', 0),
-                                "volume": quote.get('volume', detail.get('volume', 0)),
-                                "timestamp": int(time.time()),
-                                "is_real_time": True,
-                                "source": "FMP Real-time API"
-                            })
-                            
-                            print(f"   ⚡ {ticker}: ${quote.get('price', 0):.2f} (REAL-TIME)")
+            # Short (freshest price/volume) and detailed quotes are both fetched as
+            # multi-symbol batches, all in flight at once, then merged per symbol
+            with self.metrics.span('fetch'):
+                short_batches = self._submit_batches(self._fetch_quote_short_records, symbols, REALTIME_BATCH_SIZE, 5)
+                detail_batches = self._submit_batches(self._fetch_quote_records, symbols, REALTIME_BATCH_SIZE, 5)
+                short_records, short_failures = self._collect_batches(short_batches)
+                detail_records, detail_failures = self._collect_batches(detail_batches)
+            
+            with self.metrics.span('normalize'):
+                quotes = []
+                for ticker in symbols:
+                    quote = short_records.get(ticker, {})
+                    detail = detail_records.get(ticker)
                 
-                except Exception as ticker_error:
-                    print(f"⚠️ Error fetching real-time data for {ticker}: {ticker_error}")
-                    continue
+                    if detail:
+                        merged = normalize_quote(detail, REALTIME_FIELDS)
+                        merged["ticker"] = ticker
+                        merged["price"] = quote.get('price', merged["price"])
+                        merged["volume"] = quote.get('volume', merged["volume"])
+                        merged["is_real_time"] = True
+                        merged["source"] = f"{self.provider.title} Real-time API"
+                        quotes.append(merged)
+                self._attach_indicators(quotes)
+            
+            logger.info("⚡ %d/%d REAL-TIME quotes merged", len(quotes), len(symbols),
+                        extra={"fields": {"count": len(quotes), "requested": len(symbols)}})
             
             response_data = {
                 "status": "success",
                 "count": len(quotes),
                 "quotes": quotes,
-                "provider": "FMP Real-time",
+                "failed_batches": [dict(failure, endpoint='quote-short') for failure in short_failures] +
+                                  [dict(failure, endpoint='quote') for failure in detail_failures],
+                "provider": f"{self.provider.title} Real-time",
                 "fetch_time": time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime())
             }
-            self._send_json_response(response_data)
+            self._send_json_response(response_data, columnar=True)
             
         except Exception as e:
             self._send_error_response(500, f"Error in FMP real-time quotes: {str(e)}")
     
-    def _handle_fmp_bulk_quotes(self, universe):
-        """Fetch bulk real-time quotes for large stock universes"""
+    def _handle_fmp_bulk_quotes(self, universe, mode='union'):
+        """Fetch bulk real-time quotes for one or more stock universes"""
         try:
-            print(f"🚀 Fetching BULK UNIVERSE: {universe}")
+            logger.debug("🚀 Fetching BULK UNIVERSE: %s (%s)", universe, mode)
             
-            # Define comprehensive stock universes for professional trading
-            universes = {
-                'popular': [
-                    # Mega Cap Tech
-                    'AAPL', 'MSFT', 'NVDA', 'GOOGL', 'GOOG', 'AMZN', 'META', 'TSLA',
-                    # Large Cap Tech  
-                    'NFLX', 'AMD', 'CRM', 'INTC', 'ORCL', 'ADBE', 'CSCO', 'AVGO',
-                    # Finance
-                    'JPM', 'BAC', 'WFC', 'GS', 'MS', 'C', 'AXP', 'BLK',
-                    # Healthcare
-                    'JNJ', 'PFE', 'UNH', 'ABBV', 'MRK', 'TMO', 'ABT', 'DHR',
-                    # Consumer
-                    'KO', 'PEP', 'WMT', 'HD', 'MCD', 'DIS', 'NKE', 'SBUX',
-                    # Energy
-                    'XOM', 'CVX', 'COP', 'EOG', 'SLB', 'MPC', 'VLO', 'PSX'
-                ],
-                'sp500_top50': [
-                    'AAPL', 'MSFT', 'NVDA', 'AMZN', 'GOOGL', 'GOOG', 'META', 'TSLA',
-                    'BRK-B', 'LLY', 'AVGO', 'JPM', 'WMT', 'V', 'UNH', 'XOM',
-                    'MA', 'PG', 'JNJ', 'HD', 'CVX', 'ABBV', 'NFLX', 'BAC',
-                    'KO', 'CRM', 'COST', 'ASML', 'MRK', 'AMD', 'PEP', 'TMO',
-                    'LIN', 'ACN', 'CSCO', 'ABT', 'ADBE', 'DHR', 'TXN', 'MCD',
-                    'VZ', 'NEE', 'ORCL', 'WFC', 'PM', 'COP', 'NVS', 'BMY',
-                    'DIS', 'INTC'
-                ],
-                
-                # 🚀 GROWTH & HIGH-MOMENTUM STOCKS
-                'growth': [
-                    'NVDA', 'TSLA', 'AMD', 'CRM', 'SHOP', 'SQ', 'ROKU', 'ZM',
-                    'PLTR', 'SNOW', 'NET', 'DDOG', 'CRWD', 'ZS', 'OKTA', 'TWLO',
-                    'TEAM', 'DOCU', 'SPLK', 'WDAY', 'NOW', 'VEEV', 'ADSK', 'ANSS'
-                ],
-                'meme': [
-                    'GME', 'AMC', 'BBBY', 'NOK', 'BB', 'KOSS', 'EXPR', 'CLOV',
-                    'WISH', 'SOFI', 'PLTR', 'SPCE', 'NIO', 'RIVN', 'LCID', 'HOOD'
-                ],
-                
-                # 📊 RUSSELL 2000 SMALL CAPS (High-volume leaders)
-                'russell2000': [
-                    'SMCI', 'IWM', 'MSTR', 'COIN', 'UPST', 'AFRM', 'BROS', 'CELH',
-                    'ENPH', 'FSLR', 'PLUG', 'BLNK', 'CHPT', 'LCID', 'RIVN', 'FFIE',
-                    'SOUN', 'RDDT', 'TPG', 'SOLV', 'CVNA', 'OPEN', 'RKT', 'UWMC',
-                    'RBLX', 'PATH', 'DKNG', 'PENN', 'FUBO', 'GENI', 'APPS', 'BMBL'
-                ],
-                
-                # 🏭 SECTOR-SPECIFIC UNIVERSES
-                'tech_pure': [
-                    'AAPL', 'MSFT', 'NVDA', 'GOOGL', 'META', 'TSLA', 'CRM', 'ORCL',
-                    'ADBE', 'NOW', 'INTU', 'AMD', 'QCOM', 'INTC', 'TXN', 'LRCX',
-                    'KLAC', 'AMAT', 'MU', 'NXPI', 'MRVL', 'ADI', 'SNPS', 'CDNS'
-                ],
-                'biotech': [
-                    'GILD', 'AMGN', 'BIIB', 'REGN', 'VRTX', 'ILMN', 'MRNA', 'BNTX',
-                    'SGEN', 'ALNY', 'BMRN', 'TECH', 'SRPT', 'RARE', 'BLUE', 'FOLD',
-                    'ARWR', 'EDIT', 'CRSP', 'NTLA', 'BEAM', 'PRME', 'VCYT', 'PACB'
-                ],
-                'energy_oil': [
-                    'XOM', 'CVX', 'COP', 'EOG', 'SLB', 'HAL', 'BKR', 'OXY',
-                    'KMI', 'WMB', 'MPC', 'VLO', 'PSX', 'HES', 'DVN', 'FANG',
-                    'APA', 'EQT', 'CNX', 'RRC', 'CLR', 'MRO', 'OVV', 'SM'
-                ],
-                'financials': [
-                    'JPM', 'BAC', 'WFC', 'GS', 'MS', 'C', 'AXP', 'BLK', 'SPGI', 'ICE',
-                    'CME', 'MCO', 'TRV', 'PGR', 'ALL', 'AIG', 'MET', 'PRU', 'AFL', 'AMP',
-                    'COF', 'DFS', 'SYF', 'ALLY', 'SOFI', 'AFRM', 'UPST', 'LC'
-                ],
-                
-                # ⛏️ CRYPTO MINING & BLOCKCHAIN (No crypto, just miners/infrastructure)
-                'crypto_miners': [
-                    'MSTR', 'COIN', 'MARA', 'RIOT', 'CLSK', 'BITF', 'HUT', 'BTBT',
-                    'CAN', 'ARGO', 'EBON', 'SOS', 'ANY', 'EBANG', 'NCTY', 'PHUN',
-                    'SDIG', 'WULF', 'IREN', 'CORZ', 'CIFR', 'BTC', 'GREE', 'SPRT'
-                ],
-                
-                # 💰 DIVIDEND ARISTOCRATS & HIGH YIELD
-                'dividends': [
-                    'KO', 'PEP', 'JNJ', 'PG', 'WMT', 'MCD', 'MMM', 'CAT', 'IBM', 'VZ',
-                    'T', 'CVX', 'XOM', 'JPM', 'HD', 'LOW', 'TGT', 'COST', 'SBUX', 'NKE',
-                    'O', 'AMT', 'PLD', 'CCI', 'EQIX', 'SPG', 'AVB', 'EQR'
-                ],
-                
-                # 🎯 SPECIALTY UNIVERSES
-                'ark_stocks': [
-                    'TSLA', 'ROKU', 'SQ', 'COIN', 'HOOD', 'DNA', 'CRSP', 'EDIT', 'NTLA',
-                    'BEAM', 'PACB', 'ILMN', 'TXG', 'RBLX', 'PATH', 'U', 'DKNG', 'Z',
-                    'TWLO', 'SHOP', 'SPOT', 'ZM', 'TDOC', 'TELADOC', 'PINS', 'SNAP'
-                ],
-                'ev_future': [
-                    'TSLA', 'RIVN', 'LCID', 'NIO', 'XPEV', 'LI', 'FSR', 'GOEV', 'RIDE',
-                    'F', 'GM', 'FORD', 'TM', 'HMC', 'CHPT', 'BLNK', 'EVgo', 'PLUG',
-                    'BE', 'QS', 'STEM', 'ENPH', 'SEDG', 'RUN', 'NOVA', 'FSLR'
-                ],
-                'spacs_hot': [
-                    'SPCE', 'OPEN', 'CLOV', 'SOFI', 'HOOD', 'DKNG', 'SKLZ', 'BMBL',
-                    'COUR', 'MAPS', 'BIRD', 'UBER', 'LYFT', 'DASH', 'ABNB', 'SNOW'
-                ],
-                
-                # 📈 TRADING FOCUSED
-                'high_volume': [
-                    'SPY', 'QQQ', 'IWM', 'AAPL', 'TSLA', 'NVDA', 'AMD', 'SQQQ', 'TQQQ',
-                    'SPXU', 'SPXL', 'TNA', 'TZA', 'LABU', 'LABD', 'TECL', 'SOXL', 'SOXS',
-                    'UDOW', 'SDOW', 'FAS', 'FAZ', 'CURE', 'YINN', 'YANG', 'KWEB'
-                ],
-                'volatility': [
-                    'TSLA', 'GME', 'AMC', 'BBBY', 'MSTR', 'COIN', 'MARA', 'RIOT', 'PLTR',
-                    'SPCE', 'LCID', 'RIVN', 'NIO', 'SNAP', 'TWTR', 'NFLX', 'ZM', 'PELOTON',
-                    'UPST', 'AFRM', 'ROKU', 'SQ', 'DKNG', 'PENN', 'FUBO', 'HOOD', 'RBLX'
-                ]
-            }
+            # Several universes resolve to their distinct symbols, so shared names are fetched once
+            names = [name.strip() for name in universe.split(',') if name.strip()]
+            try:
+                ticker_list, unknown = UNIVERSES.resolve(names, mode)
+            except ValueError as e:
+                self._send_error_response(400, str(e))
+                return
+            fallback = None
+            if len(unknown) == len(names):
+                # Nothing resolved: serve 'popular' as before, but still report the names that did not resolve
+                fallback = 'popular'
+                names = [fallback]
+                ticker_list = list(UNIVERSES[fallback])
+            known = [name for name in names if name not in unknown]
+            logger.debug("📊 Processing %d stocks for %s universe", len(ticker_list), universe)
             
-            # Get tickers for the requested universe
-            ticker_list = universes.get(universe, universes['popular'])
-            print(f"📊 Processing {len(ticker_list)} stocks for {universe} universe")
+            # Serve warm universes straight from the prefetch snapshot
+            with self.metrics.span('fetch'):
+                snapshot = None
+                if self.prefetcher is not None:
+                    for name in known:
+                        self.prefetcher.record_request(name)
+                    snapshot = self.prefetcher.lookup(ticker_list)
             
-            quotes = []
-            batch_size = 8  # Process 8 stocks per batch for stability
+                if snapshot and not self.prefetcher.warmed:
+                    # Right after a restart: serve what the last run persisted (marked stale)
+                    # rather than stampeding FMP before the first refresh lands
+                    records, snapshot_time = snapshot
+                    failed_batches = []
+                    source = "restored"
+                elif snapshot and time.time() - snapshot[1] <= PREFETCH_MAX_AGE:
+                    records, snapshot_time = snapshot
+                    failed_batches = []
+                    source = "snapshot"
+                else:
+                    # Batches run concurrently; the upstream governor keeps us within budget
+                    records, failed_batches = self._fetch_quote_batches(ticker_list, timeout=10)
+                    snapshot_time = time.time()
+                    source = "live"
             
-            # Process in batches to avoid API limits
-            for i in range(0, len(ticker_list), batch_size):
-                batch = ticker_list[i:i + batch_size]
-                print(f"🔄 Processing batch {i//batch_size + 1}: {', '.join(batch)}")
-                
-                try:
-                    # Use the efficient batch quote endpoint
-                    ticker_string = ','.join(batch)
-                    url = f"{self.FMP_BASE_URL}/quote/{ticker_string}?apikey={self.FMP_API_KEY}"
-                    
-                    with urllib.request.urlopen(url, timeout=10) as response:
-                        data = json.loads(response.read().decode())
-                    
-                    if data and isinstance(data, list):
-                        for quote in data:
-                            quotes.append({
-                                "ticker": quote.get('symbol', ''),
-                                "price": quote.get('price', 0),
-                                "change": quote.get('changesPercentage', 0),
-                                "change_amount": quote.get('change', 0),
-                                "volume": quote.get('volume', 0),
-                                "market_cap": quote.get('marketCap', 0),
-                                "pe": quote.get('pe', None),
-                                "day_low": quote.get('dayLow', 0),
-                                "day_high": quote.get('dayHigh', 0),
-                                "timestamp": int(time.time()),
-                                "is_real_time": True,
-                                "universe": universe
-                            })
-                
-                except Exception as batch_error:
-                    print(f"⚠️ Batch error for {', '.join(batch)}: {batch_error}")
-                    continue
-                
-                # Small delay between batches to be API-friendly
-                time.sleep(0.2)
+            # Merge in universe order
+            with self.metrics.span('normalize'):
+                quotes = []
+                for symbol in ticker_list:
+                    quote = records.get(symbol)
+                    if quote:
+                        quotes.append(dict(normalize_quote(quote, BULK_FIELDS, fetched_at=snapshot_time),
+                                           is_real_time=True, universe=universe))
+                if len(known) > 1:
+                    requested = set(known)
+                    for quote in quotes:
+                        quote["universes"] = [name for name in UNIVERSES.universes_for(quote["ticker"]) if name in requested]
+                self._attach_indicators(quotes)
             
-            print(f"✅ Successfully fetched {len(quotes)} quotes from {universe} universe")
+            logger.info("✅ Successfully fetched %d quotes from %s universe", len(quotes), universe,
+                        extra={"fields": {"universe": universe, "count": len(quotes), "source": source}})
             
             response_data = {
                 "status": "success",
                 "universe": universe,
+                "universes": known,
+                "mode": mode,
+                "unknown_universes": unknown,
+                "fallback_universe": fallback,
                 "count": len(quotes),
                 "total_requested": len(ticker_list),
                 "quotes": quotes,
-                "provider": "FMP Bulk Real-time",
-                "fetch_time": time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime())
+                "failed_batches": failed_batches,
+                "provider": f"{self.provider.title} Bulk Real-time",
+                "source": source,
+                "stale": source == "restored",
+                "snapshot_time": int(snapshot_time),
+                "fetch_time": time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime(snapshot_time))
             }
-            self._send_json_response(response_data)
+            # Staleness goes in the Age header so unchanged snapshots keep the same ETag
+            age = str(max(0, int(time.time() - snapshot_time)))
+            self._send_json_response(response_data, columnar=True, extra_headers=[('Age', age)])
             
         except Exception as e:
             self._send_error_response(500, f"Error in FMP bulk quotes: {str(e)}")
     
-    def _send_json_response(self, data):
-        """Send JSON response with proper headers"""
-        self.send_response(200)
-        self._send_cors_headers()
-        self.end_headers()
+    def _handle_fmp_history(self, query_params):
+        """OHLCV bars for one or more symbols, served from the local bar cache"""
+        symbols = query_params.get('symbols', query_params.get('symbol', ['']))[0]
+        symbols = list(dict.fromkeys(t.upper().strip() for t in symbols.split(',') if t.strip()))
+        interval = query_params.get('interval', ['1day'])[0]
+        if not symbols:
+            self._send_error_response(400, "Pass ?symbols=AAPL,MSFT (or ?symbol=AAPL)")
+            return
+        if len(symbols) > HISTORY_MAX_SYMBOLS:
+            self._send_error_response(400, f"At most {HISTORY_MAX_SYMBOLS} symbols per history request")
+            return
+        if interval not in INTERVAL_SECONDS:
+            self._send_error_response(400, f"Unknown interval '{interval}', use one of: {', '.join(INTERVAL_SECONDS)}")
+            return
+        try:
+            today = int(time.time()) // 86400 * 86400
+            end_day = parse_day(query_params['to'][0]) if 'to' in query_params else today
+            default_days = 365 if interval == '1day' else 5
+            start_day = parse_day(query_params['from'][0]) if 'from' in query_params else end_day - default_days * 86400
+        except ValueError:
+            self._send_error_response(400, "Dates must be YYYY-MM-DD")
+            return
+        if start_day > end_day:
+            self._send_error_response(400, "'from' is after 'to'")
+            return
+        columnar = query_params.get('format', [''])[0] == 'columnar'
         
-        json_data = json.dumps(data, indent=2)
-        self.wfile.write(json_data.encode())
+        # Symbols are filled concurrently; each only fetches the day ranges its file lacks
+        with self.metrics.span('fetch'):
+            futures = [(symbol, self.history_executor.submit(contextvars.copy_context().run, self.history_store.read,
+                                                              symbol, interval, start_day, end_day))
+                       for symbol in symbols]
+            results, failed = {}, []
+            for symbol, future in futures:
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    logger.warning("⚠️ History fetch failed for %s: %s", symbol, e)
+                    failed.append({"symbol": symbol, "error": str(e)})
+        
+        with self.metrics.span('normalize'):
+            date_format = '%Y-%m-%d' if interval == '1day' else '%Y-%m-%d %H:%M:%S'
+            history = {}
+            fetched_ranges = 0
+            for symbol, (columns, fetched) in results.items():
+                fetched_ranges += fetched
+                dates = [time.strftime(date_format, time.gmtime(t)) for t in columns['time']]
+                if columnar:
+                    bars = {"date": dates}
+                    bars.update((name, columns[name].tolist()) for name in ('open', 'high', 'low', 'close', 'volume'))
+                else:
+                    bars = [{"date": date, "open": o, "high": h, "low": l, "close": c, "volume": v}
+                            for date, o, h, l, c, v in zip(dates, columns['open'], columns['high'], columns['low'],
+                                                           columns['close'], columns['volume'])]
+                history[symbol] = {"count": len(dates), "bars": bars}
         
-        print(f"✅ Response sent: {len(json_data)} bytes")
+        self._send_json_response({
+            "status": "success",
+            "interval": interval,
+            "from": format_day(start_day),
+            "to": format_day(end_day),
+            "format": "columnar" if columnar else "rows",
+            "history": history,
+            "failed": failed
+        }, extra_headers=[('X-Upstream-Fetches', str(fetched_ranges))])
     
-    def _send_error_response(self, status_code, message):
-        """Send error response"""
+    def _handle_universes(self, symbol=None):
+        """List universes with their sizes, or the universes containing ?symbol="""
+        if symbol:
+            symbol = symbol.upper().strip()
+            self._send_json_response({
+                "status": "success",
+                "symbol": symbol,
+                "universes": list(UNIVERSES.universes_for(symbol))
+            })
+            return
+        self._send_json_response({
+            "status": "success",
+            "universes": {name: len(UNIVERSES[name]) for name in UNIVERSES},
+            "index": UNIVERSES.stats()
+        })
+    
+    def _attach_indicators(self, quotes):
+        """Add rolling indicator values to normalized quotes when ?indicators=1"""
+        if getattr(self, 'query_params', {}).get('indicators', ['0'])[0] != '1':
+            return
+        values = self.indicators.get_many([quote['ticker'] for quote in quotes])
+        for quote in quotes:
+            quote['indicators'] = values.get(quote['ticker'])
+    
+    def _handle_scan(self, query_params):
+        """Screen the quote store: ?min_<column>=&max_<column>=, sort, order, limit, universe/symbols"""
+        if self.quote_store is None:
+            self._send_error_response(501, "Screening needs numpy on the proxy host (pip install numpy)")
+            return
+        
+        try:
+            filters = {}
+            for column in SCAN_COLUMNS:
+                low = query_params.get(f'min_{column}', [None])[0]
+                high = query_params.get(f'max_{column}', [None])[0]
+                if low is not None or high is not None:
+                    filters[column] = (float(low) if low is not None else None,
+                                       float(high) if high is not None else None)
+            sort = query_params.get('sort', ['change'])[0]
+            descending = query_params.get('order', ['desc'])[0] != 'asc'
+            limit = int(query_params.get('limit', ['50'])[0])
+        except ValueError as e:
+            self._send_error_response(400, f"Invalid scan parameter: {e}")
+            return
+        if limit < 1:
+            self._send_error_response(400, f"Invalid scan parameter: limit must be between 1 and {SCAN_MAX_LIMIT}")
+            return
+        limit = min(limit, SCAN_MAX_LIMIT)
+        if sort not in SCAN_COLUMNS:
+            self._send_error_response(400, f"Unknown sort column '{sort}', use one of: {', '.join(SCAN_COLUMNS)}")
+            return
+        
+        universe = query_params.get('universe', [None])[0]
+        symbols = list(dict.fromkeys(t.upper().strip() for t in query_params.get('symbols', [''])[0].split(',')
+                                     if t.strip()))
+        if len(symbols) > REALTIME_MAX_TICKERS:
+            self._send_error_response(400, f"Too many tickers: {len(symbols)} (max {REALTIME_MAX_TICKERS})")
+            return
+        names = []
+        if universe is not None:
+            names = [name.strip() for name in universe.split(',') if name.strip()]
+            try:
+                members, unknown = UNIVERSES.resolve(names, query_params.get('mode', ['union'])[0])
+            except ValueError as e:
+                self._send_error_response(400, str(e))
+                return
+            if unknown:
+                self._send_error_response(404, f"Unknown universe '{', '.join(unknown)}'")
+                return
+            symbols = list(dict.fromkeys(symbols + members))
+        
+        # Only symbols the store lacks (or holds stale) go upstream; warm universes cost nothing
+        failed_batches = []
+        with self.metrics.span('fetch'):
+            if symbols:
+                if self.prefetcher is not None:
+                    for name in names:
+                        self.prefetcher.record_request(name)
+                missing = self.quote_store.missing(symbols, SCAN_MAX_AGE)
+                if missing:
+                    _, failed_batches = self._fetch_quote_batches(missing, timeout=10)
+        
+        with self.metrics.span('scan'):  # reported in Server-Timing; kept out of the body so ETags hold
+            quotes, matched, scanned = self.quote_store.scan(
+                filters, sort=sort, descending=descending, limit=limit,
+                symbols=symbols or None, max_age=SCAN_MAX_AGE)
+        
+        self._send_json_response({
+            "status": "success",
+            "universe": universe or ("custom" if symbols else "all"),
+            "filters": {column: {"min": low, "max": high} for column, (low, high) in filters.items()},
+            "sort": sort,
+            "order": "desc" if descending else "asc",
+            "scanned": scanned,
+            "matched": matched,
+            "count": len(quotes),
+            "quotes": quotes,
+            "failed_batches": failed_batches
+        }, columnar=True)
+    
+    @staticmethod
+    def _stream_symbols(symbols, universes):
+        """Distinct symbols a stream subscribes to, capped at STREAM_MAX_SYMBOLS"""
+        wanted = [s.upper().strip() for s in symbols]
+        wanted.extend(UNIVERSES.resolve([name.strip() for name in universes])[0])
+        return list(dict.fromkeys(wanted))[:STREAM_MAX_SYMBOLS]
+    
+    def _handle_quote_stream(self, symbols, universes):
+        """Push changed quotes as Server-Sent Events until the client disconnects"""
+        if self.stream_hub is None:
+            self._send_error_response(404, "Streaming is disabled")
+            return
+        
+        wanted = self._stream_symbols(symbols, universes)
+        if not wanted:
+            self._send_error_response(400, "Subscribe with ?symbols=A,B or ?universes=popular")
+            return
+        
+        subscriber = self.stream_hub.subscribe(wanted)
+        if subscriber is None:
+            self._send_error_response(503, "Too many streaming clients, fall back to polling")
+            return
+        
+        logger.info("📺 Stream opened for %d symbols", len(wanted))
+        try:
+            self.send_response(200)
+            for name, value in SSE_HEADERS:
+                self.send_header(name, value)
+            self.end_headers()
+            # A consumer that stops reading must not pin this worker forever
+            self.connection.settimeout(STREAM_WRITE_TIMEOUT)
+            self.wfile.write(sse_event("subscribed", wanted, retry=3000))
+            self.wfile.flush()
+            
+            while not subscriber.closed:
+                pending = subscriber.drain(STREAM_HEARTBEAT)
+                if subscriber.closed:
+                    break
+                self.wfile.write(sse_quotes_event(pending) if pending else SSE_KEEPALIVE)
+                self.wfile.flush()
+        except OSError as e:
+            logger.info("📺 Stream closed: %s", e)
+        finally:
+            self.stream_hub.unsubscribe(subscriber)
+            self.close_connection = True
+    
+    def _write_response(self, status_code, headers, body):
+        """Write status line, CORS + response headers and body"""
         self.send_response(status_code)
         self._send_cors_headers()
+        for name, value in headers:
+            self.send_header(name, value)
+        server_timing = self.metrics.server_timing()
+        if server_timing:
+            self.send_header('Server-Timing', server_timing)
         self.end_headers()
+        if body:
+            with self.metrics.span('write'):
+                self.wfile.write(body)
+    
+    def _send_json_response(self, data, columnar=False, extra_headers=()):
+        """Send JSON response with proper headers.
         
+        Compact by default (``?pretty=1`` for indented output), gzip/deflate
+        when the client accepts it, and 304 when If-None-Match matches.
+        Endpoints passing ``columnar=True`` honour ``?format=columnar``.
+        """
+        query_params = getattr(self, 'query_params', {})
+        with self.metrics.span('serialize'):
+            if columnar and query_params.get('format', [''])[0] == 'columnar':
+                data = to_columnar(data)
+            pretty = query_params.get('pretty', ['0'])[0] == '1'
+            status_code, headers, body = build_json_response(data, self.headers, pretty=pretty)
+        self._write_response(status_code, headers + list(extra_headers), body)
+        
+        logger.debug("✅ Response sent: %d bytes", len(body), extra={"fields": {"status": status_code, "bytes": len(body)}})
+    
+    def _send_error_response(self, status_code, message):
+        """Send error response"""
         error_data = {
             "status": "error",
             "message": message,
             "code": status_code
         }
         
-        json_data = json.dumps(error_data, indent=2)
-        self.wfile.write(json_data.encode())
+        status_code, headers, body = build_json_response(error_data, self.headers, status=status_code,
+                                                         conditional=False)
+        self._write_response(status_code, headers, body)
         
-        print(f"❌ Error response: {status_code} - {message}")
+        logger.warning("❌ Error response: %s - %s", status_code, message, extra={"fields": {"status": status_code}})
     
     def log_message(self, format, *args):
-        """Custom logging"""
-        timestamp = self.log_date_time_string()
-        message = f"[{timestamp}] {format % args}"
-        print(message)
-        sys.stdout.flush()
+        """Access log through the queued logger (never blocks on I/O)"""
+        logger.info(format, *args, extra={"fields": {"client": self.address_string()}})
+
+def create_provider(name=QUOTE_PROVIDER, fallback=QUOTE_PROVIDER_FALLBACK):
+    """Upstream data source by name, wrapped with a failover source when ``fallback`` is set"""
+    def build(kind):
+        if kind == 'fmp':
+            return FMPProvider(FMP_BASE_URL, FMP_API_KEY, APIProxyHandler._get_json)
+        if kind == 'polygon':
+            return PolygonProvider(POLYGON_BASE_URL, POLYGON_API_KEY, APIProxyHandler._get_json)
+        if kind == 'replay':
+            return ReplayProvider(load_recording(REPLAY_FILE) if REPLAY_FILE else None, latency=REPLAY_LATENCY,
+                                  error_rate=REPLAY_ERROR_RATE, throttle_rate=REPLAY_THROTTLE_RATE)
+        raise ValueError(f"Unknown quote provider: {kind!r} (expected 'fmp', 'polygon' or 'replay')")
+    provider = build(name)
+    return FailoverProvider(provider, build(fallback)) if fallback else provider
+
+APIProxyHandler.provider = create_provider()
+
+def create_server(port=PROXY_PORT, mode=PROXY_SERVER_MODE):
+    """Build the proxy server for the configured serving mode"""
+    if mode == 'single':
+        socketserver.TCPServer.allow_reuse_address = True
+        return socketserver.TCPServer(("0.0.0.0", port), APIProxyHandler)
+    if mode != 'pool':
+        raise ValueError(f"Unknown PROXY_SERVER_MODE: {mode} (expected 'pool', 'asyncio' or 'single')")
+    return WorkerPoolHTTPServer(("0.0.0.0", port), APIProxyHandler)
+
+def _install_shutdown_handler(httpd):
+    """Translate SIGTERM (supervisord stop/restart) into a graceful shutdown"""
+    def handle_sigterm(signum, frame):
+        logger.info("🛑 Received signal %s, draining in-flight requests...", signum)
+        # shutdown() blocks until serve_forever returns, so call it off the main thread
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+        if APIProxyHandler.stream_hub is not None:
+            APIProxyHandler.stream_hub.close_all()
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+def stream_client_limit(server_mode):
+    """STREAM_MAX_CLIENTS, or the default for ``server_mode``"""
+    if STREAM_MAX_CLIENTS > 0:
+        return STREAM_MAX_CLIENTS
+    # Threaded modes pin a worker per stream; asyncio streams only cost a coroutine
+    return 1000 if server_mode == 'asyncio' else max(1, PROXY_WORKERS // 2)
+
+def start_components(server_mode, prefetch=PREFETCH_ENABLED, record_snapshots=True):
+    """Create the snapshot store, history cache, prefetcher and stream hub shared by every handler.
+
+    ``server_mode`` ('asyncio' or a threaded mode) sizes the stream client
+    limit. With ``record_snapshots=False`` the snapshot is only restored,
+    never written (for processes that share the file with a recording one).
+    """
+    restored = {}
+    if SNAPSHOT_ENABLED:
+        APIProxyHandler.snapshot_store = SnapshotStore(SNAPSHOT_FILE, flush_interval=SNAPSHOT_FLUSH_INTERVAL)
+        restored = APIProxyHandler.snapshot_store.load(repair=record_snapshots)
+        APIProxyHandler._restore_snapshot(restored)
+        logger.info("💾 Restored %d quotes from %s in %.1fms", len(restored), SNAPSHOT_FILE,
+                    APIProxyHandler.snapshot_store.load_seconds * 1000)
+        if record_snapshots:
+            APIProxyHandler.snapshot_store.start()
+        else:
+            APIProxyHandler.snapshot_store = None
+    
+    APIProxyHandler.history_store = HistoryStore(HISTORY_DIR, APIProxyHandler._fetch_history_bars,
+                                                 tail_ttl=HISTORY_TAIL_TTL)
+    
+    # `supervisorctl signal HUP api_proxy` forces a universe reload (file edits are also polled)
+    signal.signal(signal.SIGHUP, lambda signum, frame: threading.Thread(target=UNIVERSES.reload, daemon=True).start())
+    
+    if prefetch:
+        warm = [name.strip() for name in PREFETCH_UNIVERSES.split(',') if name.strip()]
+        APIProxyHandler.prefetcher = UniversePrefetcher(
+            UNIVERSES,
+            APIProxyHandler._prefetch_quotes,
+            warm_universes=warm,
+            interval=PREFETCH_INTERVAL
+        )
+        APIProxyHandler.prefetcher.restore(restored)
+        APIProxyHandler.prefetcher.start()
+        logger.info("🔥 Prefetching %s every %gs", ', '.join(warm), PREFETCH_INTERVAL)
+    
+    APIProxyHandler.stream_hub = QuoteStreamHub(
+        APIProxyHandler._fetch_stream_quotes,
+        interval=STREAM_INTERVAL,
+        max_subscribers=stream_client_limit(server_mode)
+    )
+
+def stop_components():
+    """Flush what start_components() left running"""
+    if APIProxyHandler.snapshot_store is not None:
+        APIProxyHandler.snapshot_store.close()
 
 def main():
-    PORT = 8001
+    PORT = PROXY_PORT
+    log_listener = setup_logging(PROXY_LOG_LEVEL, PROXY_LOG_FORMAT, PROXY_LOG_SAMPLE_RATE)
+    
+    logger.info("🚀 Scanner Pro AI - FMP Real-Time API Proxy Server")
+    logger.info("📡 Proxy Server: http://0.0.0.0:%s", PORT)
+    logger.info("🔑 FMP API: Ready (Real-time data)")
+    logger.info("💰 API Provider: %s", APIProxyHandler.provider.name)
+    logger.info("🌐 CORS: Enabled")
+    logger.info("⚡ Real-time quotes: ENABLED")
+    logger.info("🚦 Upstream budget: %g calls/min (burst %g%s), up to %d symbols per coalesced call",
+                UPSTREAM_RPM, UPSTREAM_BURST,
+                f", {UPSTREAM_DAILY_LIMIT}/day" if UPSTREAM_DAILY_LIMIT else "", UPSTREAM_COALESCE_MAX)
+    if PROXY_SERVER_MODE == 'pool':
+        logger.info("🧵 Worker pool: %d workers, queue depth %d", PROXY_WORKERS, PROXY_QUEUE_DEPTH)
+    elif PROXY_SERVER_MODE == 'asyncio':
+        logger.info("🧵 Asyncio event loop: %d route workers, queue depth %d, %gs request timeout",
+                    PROXY_WORKERS, PROXY_QUEUE_DEPTH, ASYNC_REQUEST_TIMEOUT)
+    else:
+        logger.info("🧵 Serving mode: %s", PROXY_SERVER_MODE)
     
-    print("🚀 Scanner Pro AI - FMP Real-Time API Proxy Server")
-    print(f"📡 Proxy Server: http://0.0.0.0:{PORT}")
-    print(f"🔑 FMP API: Ready (Real-time data)")
-    print(f"💰 API Provider: Financial Modeling Prep")
-    print("🌐 CORS: Enabled")
-    print("⚡ Real-time quotes: ENABLED")
-    print("=" * 60)
+    start_components(PROXY_SERVER_MODE)
     
+    exit_code = 0
     try:
-        with socketserver.TCPServer(("0.0.0.0", PORT), APIProxyHandler) as httpd:
-            print(f"✅ FMP API Proxy serving at port {PORT}")
-            print("📋 Available endpoints:")
-            print("   GET /api/test - Test endpoint")
-            print("   GET /api/fmp/quote/{ticker} - Get real-time quote")
-            print("   GET /api/fmp/batch-quotes?tickers=A,B,C - Get batch quotes")
-            print("   GET /api/fmp/realtime-quotes?tickers=A,B,C - Get real-time quotes")
-            print("🎯 Ready for LIVE market data!")
-            sys.stdout.flush()
-            httpd.serve_forever()
+        if PROXY_SERVER_MODE == 'asyncio':
+            from async_server import run_async_server
+            logger.info("✅ FMP API Proxy serving at port %s", PORT)
+            run_async_server(
+                APIProxyHandler, PORT,
+                workers=PROXY_WORKERS,
+                queue_depth=PROXY_QUEUE_DEPTH,
+                request_timeout=ASYNC_REQUEST_TIMEOUT,
+                keepalive_timeout=ASYNC_KEEPALIVE_TIMEOUT,
+                max_connections=ASYNC_MAX_CONNECTIONS,
+                stream_heartbeat=STREAM_HEARTBEAT,
+                stream_write_timeout=STREAM_WRITE_TIMEOUT,
+                drain_timeout=PROXY_DRAIN_TIMEOUT
+            )
+        else:
+            with create_server(PORT) as httpd:
+                _install_shutdown_handler(httpd)
+                logger.info("✅ FMP API Proxy serving at port %s", PORT)
+                logger.info("📋 Endpoints: /api/test, /api/fmp/quote/{ticker}, /api/fmp/batch-quotes, "
+                            "/api/fmp/realtime-quotes, /api/fmp/bulk-quotes, /api/stream, /metrics")
+                logger.info("🎯 Ready for LIVE market data!")
+                httpd.serve_forever()
+        logger.info("✅ FMP API Proxy drained and stopped")
     except KeyboardInterrupt:
-        print("\n🛑 FMP API Proxy stopped by user")
+        logger.info("🛑 FMP API Proxy stopped by user")
     except Exception as e:
-        print(f"❌ Proxy server error: {e}")
-        sys.exit(1)
+        logger.error("❌ Proxy server error: %s", e)
+        exit_code = 1
+    finally:
+        stop_components()
+    log_listener.stop()
+    if exit_code:
+        sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Asyncio Proxy Engine
+Alternative server mode: client connections, keep-alive and SSE streams live on one event loop,
+while route handlers run unchanged on a bounded executor
+"""
+
+import asyncio
+import concurrent.futures
+import http.client
+import io
+import logging
+import signal
+import threading
+import time
+import urllib.parse
+
+from quote_stream import SSE_HEADERS, SSE_KEEPALIVE, sse_event, sse_quotes_event
+from serialization import build_json_response
+
+logger = logging.getLogger(__name__)
+
+MAX_HEAD_BYTES = 64 * 1024
+
+
+def buffered_handler_class(handler_class):
+    """Subclass of ``handler_class`` that serves one request from memory.
+
+    The route code (``do_GET`` and everything below it) is reused as is; the
+    status line, headers and body it writes land in an in-memory buffer that
+    the event loop then sends, so responses stay byte-compatible with the
+    threaded server.
+    """
+
+    class BufferedHandler(handler_class):
+        protocol_version = 'HTTP/1.1'
+
+        def __init__(self, method, target, version, headers, client_address, server):
+            self.command = method
+            self.path = target
+            self.request_version = version
+            self.requestline = f"{method} {target} {version}"
+            self.headers = headers
+            self.client_address = client_address
+            self.server = server
+            self.connection = None  # no socket to sendfile() into; everything goes through wfile
+            self.rfile = io.BytesIO()
+            self.wfile = io.BytesIO()
+            self.close_connection = (version != 'HTTP/1.1' or
+                                     headers.get('Connection', '').lower() == 'close')
+
+        def run(self):
+            """Dispatch like BaseHTTPRequestHandler.handle_one_request; returns the raw response"""
+            method = getattr(self, 'do_' + self.command, None)
+            if method is None:
+                self.send_error(501, f"Unsupported method ({self.command!r})")
+            else:
+                method()
+            return self.wfile.getvalue(), self.close_connection
+
+    BufferedHandler.__name__ = f"Buffered{handler_class.__name__}"
+    return BufferedHandler
+
+
+class AsyncProxyServer:
+    """Asyncio HTTP/1.1 front end for an ``APIProxyHandler``-style class.
+
+    - idle keep-alive and streaming clients cost a coroutine, not a thread
+    - each request runs on a bounded executor under ``request_timeout``
+      (504 when exceeded); work still queued when the client disconnects is
+      cancelled before it reaches a worker
+    - more than ``queue_depth`` requests waiting for the executor get a fast
+      503, matching the threaded worker pool
+    - ``/api/stream`` is served natively on the loop from the shared hub
+    - ``reuse_port`` binds with SO_REUSEPORT so several processes can share the port
+    """
+
+    def __init__(self, handler_class, host='0.0.0.0', port=8001, workers=16, queue_depth=64,
+                 request_timeout=30.0, keepalive_timeout=15.0, max_connections=10000,
+                 stream_heartbeat=15.0, stream_write_timeout=10.0, drain_timeout=10.0, reuse_port=False):
+        self.handler_class = handler_class
+        self.buffered_class = buffered_handler_class(handler_class)
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.request_timeout = request_timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.max_connections = max_connections
+        self.stream_heartbeat = stream_heartbeat
+        self.stream_write_timeout = stream_write_timeout
+        self.drain_timeout = drain_timeout
+        self.reuse_port = reuse_port
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='async-route')
+        self._server = None
+        self._connections = set()
+        self._pending = 0  # submitted to the executor and not finished yet (under _active_lock)
+        self._active = 0
+        self._active_lock = threading.Lock()
+        self.rejected = 0
+        self.timed_out = 0
+        self.cancelled = 0
+
+    def stats(self):
+        """Same shape as WorkerPoolHTTPServer.stats, plus connection counters"""
+        return {
+            "workers": self.workers,
+            "active": self._active,
+            "queued": max(0, self._pending - self._active),
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+            "connections": len(self._connections),
+            "timed_out": self.timed_out,
+            "cancelled": self.cancelled
+        }
+
+    async def _read_request(self, reader):
+        """Parse one request head; returns None on a clean EOF between requests"""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.keepalive_timeout)
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip():
+                raise ValueError("Incomplete request head")
+            return None
+        except asyncio.LimitOverrunError:
+            raise ValueError("Request head too large")
+
+        request_line, _, header_block = head.partition(b'\r\n')
+        parts = request_line.decode('latin-1').split()
+        if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+            raise ValueError(f"Bad request line: {request_line[:100]!r}")
+        headers = http.client.parse_headers(io.BytesIO(header_block))
+
+        length = int(headers.get('Content-Length') or 0)
+        if length:
+            await reader.readexactly(length)  # routes are GET-only; discard any body
+        return parts[0], parts[1], parts[2], headers
+
+    def _raw_json(self, status, message, close=False):
+        """A complete JSON error response built without touching the handler"""
+        status, headers, body = build_json_response(
+            {"status": "error", "message": message, "code": status}, status=status, conditional=False)
+        reason = http.client.responses.get(status, '')
+        lines = [f"HTTP/1.1 {status} {reason}", "Access-Control-Allow-Origin: *"]
+        lines += [f"{name}: {value}" for name, value in headers]
+        if close:
+            lines.append("Connection: close")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body
+
+    async def _run_route(self, request, client_address, reader, writer):
+        """Run the buffered handler on the executor, watching timeout and disconnects"""
+        method, target, version, headers = request
+        handler = self.buffered_class(method, target, version, headers, client_address, self)
+
+        def run():
+            with self._active_lock:
+                self._active += 1
+            try:
+                return handler.run()
+            finally:
+                with self._active_lock:
+                    self._active -= 1
+
+        future = self.executor.submit(run)
+        with self._active_lock:
+            self._pending += 1
+        # Counted until the handler really finishes: cancel() cannot stop one that is already running
+        future.add_done_callback(self._route_done)
+        waiter = asyncio.wrap_future(future)
+        deadline = time.monotonic() + self.request_timeout
+        while True:
+            done, _ = await asyncio.wait({waiter}, timeout=min(0.25, max(0.0, deadline - time.monotonic())))
+            if done:
+                return waiter.result()
+            if reader.at_eof() or writer.transport.is_closing():
+                self.cancelled += 1
+                future.cancel()  # still queued -> never runs; running -> result is dropped
+                return None, True
+            if time.monotonic() >= deadline:
+                self.timed_out += 1
+                future.cancel()
+                return self._raw_json(504, f"Request timed out after {self.request_timeout:g}s", close=True), True
+
+    def _route_done(self, future):
+        with self._active_lock:
+            self._pending -= 1
+
+    async def _serve_stream(self, target, reader, writer):
+        """Native SSE: subscribe to the shared hub and await updates on the loop"""
+        handler = self.handler_class
+        hub = handler.stream_hub
+        if hub is None:
+            writer.write(self._raw_json(404, "Streaming is disabled", close=True))
+            return
+        query = _query_params(target)
+        symbols = [t for t in query.get('symbols', [''])[0].split(',') if t.strip()]
+        universes = [u for u in query.get('universes', [''])[0].split(',') if u.strip()]
+        wanted = handler._stream_symbols(symbols, universes)
+        if not wanted:
+            writer.write(self._raw_json(400, "Subscribe with ?symbols=A,B or ?universes=popular", close=True))
+            return
+
+        subscriber = hub.subscribe(wanted)
+        if subscriber is None:
+            writer.write(self._raw_json(503, "Too many streaming clients, fall back to polling", close=True))
+            return
+
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        wakeup.set()  # flush the snapshot offered before the callback was attached
+        subscriber.on_update = lambda: loop.call_soon_threadsafe(wakeup.set)
+        # SSE clients never send after the request, so any read completing means they hung up
+        hangup = asyncio.ensure_future(reader.read(1))
+        hangup.add_done_callback(lambda _: wakeup.set())
+        logger.info("📺 Stream opened for %d symbols", len(wanted))
+        try:
+            head = ["HTTP/1.1 200 OK"] + [f"{name}: {value}" for name, value in SSE_HEADERS] + ["Connection: close"]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1'))
+            writer.write(sse_event("subscribed", wanted, retry=3000))
+            await asyncio.wait_for(writer.drain(), self.stream_write_timeout)
+            while not subscriber.closed and not writer.transport.is_closing():
+                try:
+                    await asyncio.wait_for(wakeup.wait(), self.stream_heartbeat)
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+                if subscriber.closed or hangup.done():
+                    break
+                pending = subscriber.drain(0)
+                writer.write(sse_quotes_event(pending) if pending else SSE_KEEPALIVE)
+                # A consumer that stops reading gets disconnected instead of buffering forever
+                await asyncio.wait_for(writer.drain(), self.stream_write_timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.info("📺 Stream closed: %s", e or type(e).__name__)
+        finally:
+            hangup.cancel()
+            hub.unsubscribe(subscriber)
+
+    async def _handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        peer = writer.get_extra_info('peername') or ('-', 0)
+        try:
+            if len(self._connections) > self.max_connections:
+                self.rejected += 1
+                writer.write(self._raw_json(503, "Proxy saturated, retry shortly", close=True))
+                return
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError) as e:
+                    writer.write(self._raw_json(400, f"Bad request: {e}", close=True))
+                    return
+                except asyncio.TimeoutError:
+                    return  # idle keep-alive connection
+                if request is None:
+                    return
+
+                method, target, _, _ = request
+                if method == 'GET' and target.split('?', 1)[0] == '/api/stream':
+                    await self._serve_stream(target, reader, writer)
+                    return
+
+                if self._pending >= self.workers + self.queue_depth:
+                    self.rejected += 1
+                    response, close = self._raw_json(503, "Proxy saturated, retry shortly", close=True), True
+                else:
+                    response, close = await self._run_route(request, peer[:2], reader, writer)
+                if response is None:
+                    return
+                writer.write(response)
+                await writer.drain()
+                if close:
+                    return
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def serve(self, stop_event=None):
+        """Serve until ``stop_event`` is set, then drain in-flight requests"""
+        stop_event = stop_event or asyncio.Event()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_HEAD_BYTES, reuse_address=True,
+                                                  reuse_port=self.reuse_port or None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        async with self._server:
+            await stop_event.wait()
+            self._server.close()
+            if self.handler_class.stream_hub is not None:
+                self.handler_class.stream_hub.close_all()
+            deadline = time.monotonic() + self.drain_timeout
+            while self._pending and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            for task in list(self._connections):
+                task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _query_params(target):
+    return urllib.parse.parse_qs(urllib.parse.urlparse(target).query)
+
+
+def run_async_server(handler_class, port, **options):
+    """Blocking entry point used by ``api_proxy.main`` (PROXY_SERVER_MODE=asyncio) and the gateway"""
+    server = AsyncProxyServer(handler_class, port=port, **options)
+
+    async def main():
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop_event.set)
+        await server.serve(stop_event)
+
+    asyncio.run(main())
+    return server
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Realtime Quotes Benchmark
+Compares the legacy per-ticker double round-trip against the batched /api/fmp/realtime-quotes
+handler, both running against the local FMP stub
+
+Usage: python3 benchmarks/bench_realtime_quotes.py [--latency 0.05] [--sizes 10,50,100,200]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api_proxy  # noqa: E402
+from fmp_stub import FMPStubServer  # noqa: E402
+
+
+def legacy_realtime_fetch(base_url, api_key, tickers):
+    """The pre-batching algorithm: /quote-short then /quote, serially, per ticker"""
+    quotes = []
+    for ticker in tickers:
+        with urllib.request.urlopen(f"{base_url}/quote-short/{ticker}?apikey={api_key}", timeout=5) as response:
+            data = json.loads(response.read().decode())
+        if data:
+            with urllib.request.urlopen(f"{base_url}/quote/{ticker}?apikey={api_key}", timeout=5) as response:
+                detail = json.loads(response.read().decode())
+            if detail:
+                quotes.append(detail[0]['symbol'])
+    return quotes
+
+
+def batched_realtime_fetch(proxy_url, tickers):
+    """The current handler, called over HTTP through the proxy"""
+    url = f"{proxy_url}/api/fmp/realtime-quotes?tickers={','.join(tickers)}"
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return json.loads(response.read().decode())['quotes']
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.05, help='stub upstream latency in seconds')
+    parser.add_argument('--sizes', default='10,50,100,200', help='comma separated ticker counts')
+    args = parser.parse_args()
+
+    stub = FMPStubServer(latency=args.latency).start()
+    api_proxy.FMP_BASE_URL = stub.base_url
+    api_proxy.APIProxyHandler.provider = api_proxy.create_provider('fmp', '')
+    api_proxy.APIProxyHandler.governor.rate = 0  # measure latency, not the upstream budget
+    api_proxy.APIProxyHandler.log_message = lambda *a: None
+    proxy = api_proxy.WorkerPoolHTTPServer(("127.0.0.1", 0), api_proxy.APIProxyHandler)
+    threading.Thread(target=proxy.serve_forever, daemon=True).start()
+    proxy_url = f"http://127.0.0.1:{proxy.server_address[1]}"
+
+    universe = [f"T{i:03d}" for i in range(max(int(n) for n in args.sizes.split(',')))]
+
+    print(f"📊 realtime-quotes benchmark (stub latency {args.latency * 1000:.0f} ms)")
+    print(f"{'tickers':>8} {'legacy s':>10} {'calls':>6} {'batched s':>10} {'calls':>6} {'speedup':>8}")
+    results = []
+    for size in (int(n) for n in args.sizes.split(',')):
+        tickers = universe[:size]
+
+        stub.reset_counters()
+        legacy_time, legacy_quotes = timed(legacy_realtime_fetch, stub.base_url, 'bench', tickers)
+        legacy_calls = stub.calls
+
+        api_proxy.APIProxyHandler.quote_cache.clear()
+        stub.reset_counters()
+        with contextlib.redirect_stdout(io.StringIO()):
+            batched_time, batched_quotes = timed(batched_realtime_fetch, proxy_url, tickers)
+        batched_calls = stub.calls
+
+        assert len(legacy_quotes) == len(batched_quotes) == size
+        print(f"{size:>8} {legacy_time:>10.3f} {legacy_calls:>6} {batched_time:>10.3f} {batched_calls:>6} "
+              f"{legacy_time / batched_time:>7.1f}x")
+        results.append({
+            "tickers": size,
+            "legacy_seconds": round(legacy_time, 4),
+            "legacy_upstream_calls": legacy_calls,
+            "batched_seconds": round(batched_time, 4),
+            "batched_upstream_calls": batched_calls
+        })
+
+    proxy.shutdown()
+    proxy.server_close()
+    stub.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Local FMP API Stub
+Serves a ReplayProvider (recorded or deterministic synthetic quotes and history) over FMP's
+URLs with configurable latency and error rates, so the proxy can be benchmarked without
+touching the real FMP API or its quota
+"""
+
+import http.server
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+import urllib.parse
+from urllib.error import HTTPError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import INTERVAL_SECONDS, format_day  # noqa: E402
+from providers import ReplayProvider, load_recording  # noqa: E402
+
+
+class FMPStubHandler(http.server.BaseHTTPRequestHandler):
+    """Minimal stand-in for the FMP v3 quote and history endpoints"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # headers and body are separate writes; reused connections would wait on delayed ACKs
+
+    def do_GET(self):
+        server = self.server
+        path = urllib.parse.urlparse(self.path).path
+        with server.lock:
+            server.calls += 1
+            server.paths.append(path)
+
+        parts = path.rstrip('/').split('/')
+        try:
+            if 'historical-price-full' in parts or 'historical-chart' in parts:
+                self._send_history(parts)
+            elif len(parts) >= 2 and parts[-2] in ('quote', 'quote-short'):
+                symbols = [s for s in urllib.parse.unquote(parts[-1]).split(',') if s]
+                records = server.provider.quotes(symbols)
+                quotes = [records[symbol] for symbol in symbols if symbol in records]
+                if parts[-2] == 'quote-short':
+                    quotes = [{"symbol": q["symbol"], "price": q["price"], "volume": q["volume"]} for q in quotes]
+                self._send(200, quotes)
+            else:
+                self._send(404, {"Error Message": "Unknown endpoint"})
+        except HTTPError as e:
+            self._send(e.code, {"Error Message": e.reason}, retry_after=e.headers.get('Retry-After'))
+
+    def _send_history(self, parts):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        now = int(time.time())
+        to_date = query.get('to', [format_day(now - now % 86400)])[0]
+        from_date = query.get('from', [format_day(now - now % 86400 - 30 * 86400)])[0]
+        symbol = urllib.parse.unquote(parts[-1])
+        interval = parts[-2] if parts[-2] in INTERVAL_SECONDS else '1day'
+        bars = self.server.provider.history(symbol, interval, from_date, to_date)
+        self._send(200, bars if interval != '1day' else {"symbol": symbol, "historical": bars})
+
+    def _send(self, status, data, retry_after=None):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if retry_after:
+            self.send_header('Retry-After', retry_after)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FMPStubServer(socketserver.ThreadingTCPServer):
+    """Threaded stub server that counts upstream calls.
+
+    ``provider`` defaults to a synthetic ReplayProvider with ``latency``,
+    ``error_rate`` (HTTP 503) and ``throttle_rate`` (HTTP 429).
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.05, error_rate=0.0, throttle_rate=0.0, provider=None):
+        super().__init__(("127.0.0.1", port), FMPStubHandler)
+        self.provider = provider or ReplayProvider(latency=latency, error_rate=error_rate, throttle_rate=throttle_rate)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.paths = []
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/v3"
+
+    def reset_counters(self):
+        with self.lock:
+            self.calls = 0
+            self.paths = []
+
+    def start(self):
+        """Serve in a background thread and return self"""
+        threading.Thread(target=self.serve_forever, name="fmp-stub", daemon=True).start()
+        return self
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Local FMP API stub (point FMP_BASE_URL at it)")
+    parser.add_argument('--port', type=int, default=8101)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per upstream call')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of calls failing with 503')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='share of calls failing with 429')
+    parser.add_argument('--replay', help='recorded quotes: JSON list/object or a quote snapshot log')
+    args = parser.parse_args()
+
+    provider = ReplayProvider(load_recording(args.replay) if args.replay else None, latency=args.latency,
+                              error_rate=args.error_rate, throttle_rate=args.throttle_rate)
+    stub = FMPStubServer(port=args.port, provider=provider).start()
+    print(f"🧪 FMP stub serving at {stub.base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stub.shutdown()
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Benchmark Suite
+Drives api_proxy.py (against the local FMP stub) and scanner_server.py at configurable concurrency,
+micro-benchmarks quote normalization and serialization, and writes the results as JSON
+
+Usage: python3 benchmarks/run_benchmarks.py [--concurrency 1,8,32] [--requests 400] [--latency 0.02]
+                                            [--server-mode pool|asyncio] [--only quote,scan]
+                                            [--output results.json] [--compare baseline.json]
+
+Every proxy scenario reports throughput, p50/p95/p99/max latency, bytes on the wire (headers +
+body as received, gzip accepted unless --no-gzip) and upstream calls made against the stub.
+Scenarios run in a fixed order against one proxy process, so later scenarios see the quote
+cache state earlier ones left behind - the same on every run.
+"""
+
+import argparse
+import datetime
+import gzip
+import http.client
+import itertools
+import json
+import os
+import platform
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fmp_stub import FMPStubServer  # noqa: E402
+from providers import DETAIL_FIELDS, LIST_FIELDS, normalize_quote, synthetic_quote  # noqa: E402
+from serialization import build_json_response, encode_json, to_columnar  # noqa: E402
+from universes import UniverseIndex  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(port, path, process, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server on port {port} exited with {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', path)
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} not ready after {timeout}s")
+
+
+def start_process(script, env, port, ready_path):
+    """Run a repo script as a subprocess and wait until it answers ``ready_path``"""
+    log = tempfile.NamedTemporaryFile(prefix=f"bench-{os.path.splitext(script)[0]}-", suffix='.log', delete=False)
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, script)], cwd=ROOT,
+                               env=dict(os.environ, **env), stdout=log, stderr=subprocess.STDOUT)
+    try:
+        _wait_ready(port, ready_path, process)
+    except RuntimeError:
+        process.kill()
+        raise RuntimeError(f"{script} did not start, see {log.name}")
+    return process
+
+
+def stop_process(process):
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+class Client:
+    """One keep-alive connection; reconnects when the server closes it"""
+
+    def __init__(self, port, headers):
+        self.port = port
+        self.headers = headers
+        self.conn = None
+
+    def get(self, path):
+        """Returns ``(status, bytes on the wire)``"""
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            try:
+                self.conn.request('GET', path, headers=self.headers)
+                response = self.conn.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                self.close()
+                if attempt:
+                    raise
+                continue
+            status_line = len(f"HTTP/1.1 {response.status} {response.reason}\r\n")
+            header_bytes = sum(len(name) + len(value) + 4 for name, value in response.getheaders()) + 2
+            if response.will_close:
+                self.close()
+            return response.status, status_line + header_bytes + len(body)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def percentile(ordered, pct):
+    """Linear-interpolated percentile of a sorted list"""
+    if not ordered:
+        return None
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def run_load(port, paths, requests, concurrency, headers):
+    """``requests`` GETs cycling through ``paths`` from ``concurrency`` keep-alive clients"""
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies, statuses = [], {}
+    totals = {"bytes": 0, "errors": 0}
+
+    def worker():
+        client = Client(port, headers)
+        local, local_statuses, local_bytes, local_errors = [], {}, 0, 0
+        while True:
+            index = next(counter)
+            if index >= requests:
+                break
+            started = time.perf_counter()
+            try:
+                status, size = client.get(paths[index % len(paths)])
+            except (http.client.HTTPException, OSError):
+                local_errors += 1
+                continue
+            local.append(time.perf_counter() - started)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+            local_bytes += size
+            if status >= 400:
+                local_errors += 1
+        client.close()
+        with lock:
+            latencies.extend(local)
+            totals["bytes"] += local_bytes
+            totals["errors"] += local_errors
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    completed = len(latencies)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None  # noqa: E731
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(completed / elapsed, 1) if elapsed else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+        "errors": totals["errors"],
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "bytes_total": totals["bytes"],
+        "bytes_per_request": round(totals["bytes"] / completed) if completed else None
+    }
+
+
+def proxy_scenarios():
+    """name -> list of request paths (cycled)"""
+    universes = UniverseIndex(os.path.join(ROOT, 'universes.json'))
+    popular = list(universes['popular'])
+    rotating = [f"R{i:04d}" for i in range(2000)]
+    fifty = ','.join((popular * 4)[:50])
+    return {
+        "quote_hot": ["/api/fmp/quote/AAPL"],
+        "quote_rotating": [f"/api/fmp/quote/{symbol}" for symbol in rotating],
+        "batch_quotes_50": [f"/api/fmp/batch-quotes?tickers={fifty}"],
+        "realtime_quotes_50": [f"/api/fmp/realtime-quotes?tickers={fifty}"],
+        "bulk_popular": ["/api/fmp/bulk-quotes?universe=popular"],
+        "bulk_multi_union": ["/api/fmp/bulk-quotes?universe=growth,meme,volatility&mode=union"],
+        "scan": ["/api/scan?universe=popular&min_volume=1000000&sort=change&limit=20"],
+        "history_daily": ["/api/fmp/history?symbols=AAPL,MSFT,NVDA&interval=1day&from=2024-01-01&to=2024-06-30"],
+        "metrics": ["/metrics"]
+    }
+
+
+def static_scenarios():
+    return {
+        "static_index": ["/index.html"],
+        "static_mixed": ["/index.html", "/index_production.html", "/package.json", "/universes.json"]
+    }
+
+
+def bench_server(label, port, scenarios, args, headers, upstream=None):
+    results = []
+    for name, paths in scenarios.items():
+        if args.only and not any(token in name for token in args.only):
+            continue
+        probe_status, _ = Client(port, headers).get(paths[0])
+        if probe_status >= 400:
+            print(f"   ⏭️  {name}: skipped (probe returned HTTP {probe_status})")
+            results.append({"server": label, "scenario": name, "skipped": f"HTTP {probe_status}"})
+            continue
+        for concurrency in args.concurrency:
+            if upstream is not None:
+                upstream.reset_counters()
+            result = run_load(port, paths, args.requests, concurrency, headers)
+            result.update(server=label, scenario=name, key=f"{label}:{name}@c{concurrency}")
+            if upstream is not None:
+                result["upstream_calls"] = upstream.calls
+                result["upstream_calls_per_request"] = round(upstream.calls / args.requests, 3)
+            results.append(result)
+            print(f"   {name:<20} c={concurrency:<4} {result['throughput_rps']:>9} rps  "
+                  f"p50 {result['p50_ms']:>8} ms  p95 {result['p95_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+                  f"{result['bytes_per_request']:>7} B/req  errors {result['errors']}"
+                  + (f"  upstream {result['upstream_calls']}" if upstream is not None else ""))
+    return results
+
+
+def micro_benchmarks(size=1000, repeat=5):
+    """Per-call cost of quote normalization and response serialization"""
+    records = [synthetic_quote(f"M{i:04d}") for i in range(size)]
+    rows = [dict(normalize_quote(record, LIST_FIELDS), is_real_time=True) for record in records]
+    payload = {"status": "success", "count": len(rows), "quotes": rows}
+    gzip_headers = {'Accept-Encoding': 'gzip'}
+    cases = {
+        "normalize_list_fields": lambda: [normalize_quote(record, LIST_FIELDS) for record in records],
+        "normalize_detail_fields": lambda: [normalize_quote(record, DETAIL_FIELDS) for record in records],
+        "encode_rows": lambda: encode_json(payload),
+        "encode_columnar": lambda: encode_json(to_columnar(payload)),
+        "response_rows_identity": lambda: build_json_response(payload, {}),
+        "response_rows_gzip": lambda: build_json_response(payload, gzip_headers),
+        "response_columnar_gzip": lambda: build_json_response(to_columnar(payload), gzip_headers),
+        "gzip_level6_stdlib": lambda: gzip.compress(encode_json(payload), 6)
+    }
+    results = []
+    for name, fn in cases.items():
+        timer = timeit.Timer(fn)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=repeat, number=number)) / number
+        output = fn()
+        if isinstance(output, tuple):
+            output = output[2]
+        results.append({
+            "name": name,
+            "quotes": size,
+            "per_call_us": round(best * 1e6, 2),
+            "per_quote_ns": round(best / size * 1e9, 1),
+            "output_bytes": len(output) if isinstance(output, (bytes, bytearray)) else None
+        })
+        print(f"   {name:<26} {results[-1]['per_call_us']:>12} µs/call  {results[-1]['per_quote_ns']:>9} ns/quote"
+              + (f"  {results[-1]['output_bytes']} B" if results[-1]['output_bytes'] else ""))
+    return results
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True, timeout=30).stdout.strip())
+        return commit or None, dirty
+    except (OSError, subprocess.SubprocessError):
+        return None, None
+
+
+def compare(current, baseline_path, threshold):
+    """Print relative changes against a previous results file; returns the regressions"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = []
+    old_runs = {run["key"]: run for run in baseline.get("scenarios", []) if "key" in run}
+    print(f"\n📈 Compared with {baseline_path} ({baseline.get('meta', {}).get('git_commit')})")
+    for run in current["scenarios"]:
+        old = old_runs.get(run.get("key"))
+        if not old:
+            continue
+        checks = [("throughput_rps", True), ("p95_ms", False), ("bytes_per_request", False)]
+        parts = []
+        for field, higher_is_better in checks:
+            if not old.get(field) or run.get(field) is None:
+                continue
+            change = (run[field] - old[field]) / old[field]
+            worse = -change if higher_is_better else change
+            flag = " ⚠️" if worse > threshold else ""
+            if flag:
+                regressions.append(f"{run['key']} {field} {change:+.1%}")
+            parts.append(f"{field} {change:+.1%}{flag}")
+        print(f"   {run['key']:<40} " + "  ".join(parts))
+    old_micro = {case["name"]: case for case in baseline.get("micro", [])}
+    for case in current["micro"]:
+        old = old_micro.get(case["name"])
+        if old and old.get("per_call_us"):
+            change = (case["per_call_us"] - old["per_call_us"]) / old["per_call_us"]
+            flag = " ⚠️" if change > threshold else ""
+            if flag:
+                regressions.append(f"micro:{case['name']} per_call_us {change:+.1%}")
+            print(f"   micro:{case['name']:<34} per_call_us {change:+.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', default='1,8,32', help='comma separated client counts')
+    parser.add_argument('--requests', type=int, default=400, help='requests per scenario and concurrency')
+    parser.add_argument('--latency', type=float, default=0.02, help='stub upstream latency in seconds')
+    parser.add_argument('--server-mode', default='pool', choices=('pool', 'asyncio', 'single'))
+    parser.add_argument('--only', default='', help='comma separated substrings of scenario names to run')
+    parser.add_argument('--no-gzip', action='store_true', help='do not send Accept-Encoding: gzip')
+    parser.add_argument('--skip-proxy', action='store_true')
+    parser.add_argument('--skip-static', action='store_true')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--output', help='results file (default benchmarks/results/<time>-<commit>.json)')
+    parser.add_argument('--compare', help='previous results file to diff against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative change reported as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit 1 when --compare finds one')
+    args = parser.parse_args()
+    args.concurrency = [int(n) for n in args.concurrency.split(',') if n.strip()]
+    args.only = [token.strip() for token in args.only.split(',') if token.strip()]
+    headers = {} if args.no_gzip else {'Accept-Encoding': 'gzip'}
+
+    commit, dirty = git_revision()
+    results = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            "git_commit": commit,
+            "git_dirty": dirty,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {name: value for name, value in vars(args).items() if name not in ('output', 'compare')}
+        },
+        "scenarios": [],
+        "micro": []
+    }
+
+    if not args.skip_proxy:
+        stub = FMPStubServer(latency=args.latency).start()
+        port = _free_port()
+        history_dir = tempfile.mkdtemp(prefix='bench-history-')
+        proxy = start_process('api_proxy.py', {
+            'PROXY_PORT': str(port),
+            'PROXY_SERVER_MODE': args.server_mode,
+            'FMP_BASE_URL': stub.base_url,
+            'QUOTE_PROVIDER': 'fmp',
+            'QUOTE_PROVIDER_FALLBACK': '',
+            'UPSTREAM_RPM': '0',  # measure the proxy, not the upstream budget
+            'PREFETCH_ENABLED': '0',
+            'SNAPSHOT_ENABLED': '0',
+            'HISTORY_DIR': history_dir,
+            'PROXY_LOG_LEVEL': 'WARNING'
+        }, port, '/api/test')
+        print(f"🚀 api_proxy.py ({args.server_mode}) on port {port}, stub latency {args.latency * 1000:g} ms")
+        try:
+            results["scenarios"] += bench_server('proxy', port, proxy_scenarios(), args, headers, upstream=stub)
+        finally:
+            stop_process(proxy)
+            stub.shutdown()
+
+    if not args.skip_static:
+        port = _free_port()
+        static = start_process('scanner_server.py', {'SCANNER_PORT': str(port), 'SCANNER_ROOT': ROOT},
+                               port, '/index.html')
+        print(f"🌐 scanner_server.py on port {port}")
+        try:
+            results["scenarios"] += bench_server('static', port, static_scenarios(), args, headers)
+        finally:
+            stop_process(static)
+
+    if not args.skip_micro:
+        print("🔬 Micro-benchmarks (1000 quotes)")
+        results["micro"] = micro_benchmarks()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit or 'unknown'}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results written to {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"⚠️ {len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
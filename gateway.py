@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Unified Gateway
+The web app and the API on one port: static assets and /api/* share connections (no CORS preflights),
+optionally fanned out over several processes bound with SO_REUSEPORT
+"""
+
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+import urllib.parse
+
+import api_proxy
+from api_proxy import APIProxyHandler, start_components, stop_components
+from proxy_logging import setup_logging
+from rate_limit import UpstreamGovernor
+from scanner_server import SCANNER_ROOT, StaticAssetCache, StaticFilesMixin, ThreadedScannerServer
+
+
+GATEWAY_PORT = int(os.environ.get('GATEWAY_PORT', '8080'))
+GATEWAY_ROOT = os.environ.get('GATEWAY_ROOT', SCANNER_ROOT)
+GATEWAY_SERVER_MODE = os.environ.get('GATEWAY_SERVER_MODE', 'asyncio')  # 'asyncio' or 'threaded'
+GATEWAY_PROCESSES = int(os.environ.get('GATEWAY_PROCESSES', '1'))  # >1: SO_REUSEPORT workers
+GATEWAY_WORKERS = int(os.environ.get('GATEWAY_WORKERS', '32'))  # route threads per process (asyncio mode)
+GATEWAY_RESTART_DELAY = float(os.environ.get('GATEWAY_RESTART_DELAY', '1'))
+
+logger = logging.getLogger('gateway')
+
+
+class GatewayHandler(StaticFilesMixin, APIProxyHandler):
+    """``/api/*`` and ``/metrics`` from APIProxyHandler, everything else from the asset cache.
+
+    The page and its API calls share one origin, so browsers send no
+    preflights; CORS headers only go to requests whose Origin names
+    another host.
+    """
+
+    protocol_version = 'HTTP/1.1'  # keep-alive: every response carries a Content-Length
+    disable_nagle_algorithm = True
+    static_root = GATEWAY_ROOT
+    asset_cache = StaticAssetCache()
+    process_index = 0
+    process_count = 1
+
+    def _is_api(self):
+        path = urllib.parse.urlsplit(self.path).path
+        return path.startswith('/api/') or path == '/metrics'
+
+    def _cross_origin(self):
+        origin = self.headers.get('Origin')
+        return bool(origin) and urllib.parse.urlsplit(origin).netloc != self.headers.get('Host')
+
+    def _send_cors_headers(self):
+        """Same-origin requests need no CORS headers"""
+        if self._cross_origin():
+            super()._send_cors_headers()
+
+    def do_GET(self):
+        if self._is_api():
+            super().do_GET()
+        elif not self.serve_static():
+            self._send_not_found()
+
+    def do_HEAD(self):
+        if self._is_api():
+            self.send_error(501, "Unsupported method ('HEAD')")
+        elif not self.serve_static(head_only=True):
+            self._send_not_found()
+
+    def _route_get(self):
+        if urllib.parse.urlsplit(self.path).path == '/api/gateway/stats':
+            self._send_json_response({
+                "status": "success",
+                "process": self.process_index,
+                "processes": self.process_count,
+                "mode": GATEWAY_SERVER_MODE,
+                "static": self.asset_cache.stats(),
+                "server": self.server.stats() if hasattr(self.server, 'stats') else None
+            })
+        else:
+            super()._route_get()
+
+    def _send_not_found(self):
+        """Directories get their trailing slash (as SimpleHTTPRequestHandler does), anything else a 404"""
+        url = urllib.parse.urlsplit(self.path)
+        parts = [part for part in urllib.parse.unquote(url.path).split('/') if part and part not in ('.', '..')]
+        if not url.path.endswith('/') and os.path.isdir(os.path.join(self.static_root, *parts)):
+            self.send_response(301)
+            self.send_header('Location', url.path + '/' + (f"?{url.query}" if url.query else ''))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self.send_error(404, "File not found")
+
+
+class ThreadedGatewayServer(ThreadedScannerServer):
+    """Thread per connection; ``reuse_port`` lets sibling processes bind the same port"""
+
+    reuse_port = False
+
+    def server_bind(self):
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def _split_upstream_budget(processes):
+    """Give each process its share of the upstream quota so N processes never exceed it together"""
+    APIProxyHandler.governor = UpstreamGovernor(
+        api_proxy.UPSTREAM_RPM / processes,
+        max(1.0, api_proxy.UPSTREAM_BURST / processes),
+        max_coalesce=api_proxy.UPSTREAM_COALESCE_MAX,
+        retries=api_proxy.UPSTREAM_RETRIES,
+        backoff_max=api_proxy.UPSTREAM_BACKOFF_MAX,
+        daily_limit=api_proxy.UPSTREAM_DAILY_LIMIT // processes
+    )
+
+
+def serve(process_index=0, processes=1):
+    """Run one gateway process until SIGTERM/SIGINT.
+
+    Process 0 owns the snapshot log and the prefetcher; the others restore
+    the snapshot at startup and fetch on demand.
+    """
+    log_listener = setup_logging(api_proxy.PROXY_LOG_LEVEL, api_proxy.PROXY_LOG_FORMAT,
+                                 api_proxy.PROXY_LOG_SAMPLE_RATE)
+    GatewayHandler.process_index = process_index
+    GatewayHandler.process_count = processes
+    if processes > 1:
+        _split_upstream_budget(processes)
+    if process_index == 0:
+        logger.info("🚀 Scanner Pro AI - Unified Gateway")
+        logger.info("📡 Gateway: http://0.0.0.0:%s (static + /api on one origin)", GATEWAY_PORT)
+        logger.info("📁 Directory: %s", GATEWAY_ROOT)
+        logger.info("💰 API Provider: %s", APIProxyHandler.provider.name)
+        logger.info("🧵 Serving mode: %s, %d process%s", GATEWAY_SERVER_MODE, processes,
+                    "es (SO_REUSEPORT)" if processes > 1 else "")
+        logger.info("🚦 Upstream budget: %g calls/min per process", APIProxyHandler.governor.rpm)
+
+    start_components(server_mode=GATEWAY_SERVER_MODE,
+                     prefetch=api_proxy.PREFETCH_ENABLED and process_index == 0,
+                     record_snapshots=process_index == 0)
+    exit_code = 0
+    try:
+        if GATEWAY_SERVER_MODE == 'asyncio':
+            from async_server import run_async_server
+            logger.info("✅ Gateway process %d serving at port %s", process_index, GATEWAY_PORT)
+            run_async_server(
+                GatewayHandler, GATEWAY_PORT,
+                workers=GATEWAY_WORKERS,
+                queue_depth=api_proxy.PROXY_QUEUE_DEPTH,
+                request_timeout=api_proxy.ASYNC_REQUEST_TIMEOUT,
+                keepalive_timeout=api_proxy.ASYNC_KEEPALIVE_TIMEOUT,
+                max_connections=api_proxy.ASYNC_MAX_CONNECTIONS,
+                stream_heartbeat=api_proxy.STREAM_HEARTBEAT,
+                stream_write_timeout=api_proxy.STREAM_WRITE_TIMEOUT,
+                drain_timeout=api_proxy.PROXY_DRAIN_TIMEOUT,
+                reuse_port=processes > 1
+            )
+        elif GATEWAY_SERVER_MODE == 'threaded':
+            ThreadedGatewayServer.reuse_port = processes > 1
+            with ThreadedGatewayServer(("0.0.0.0", GATEWAY_PORT), GatewayHandler) as httpd:
+                api_proxy._install_shutdown_handler(httpd)
+                logger.info("✅ Gateway process %d serving at port %s", process_index, GATEWAY_PORT)
+                httpd.serve_forever()
+        else:
+            raise ValueError(f"Unknown GATEWAY_SERVER_MODE: {GATEWAY_SERVER_MODE} (expected 'asyncio' or 'threaded')")
+        logger.info("✅ Gateway process %d drained and stopped", process_index)
+    except KeyboardInterrupt:
+        logger.info("🛑 Gateway process %d stopped by user", process_index)
+    except Exception as e:
+        logger.error("❌ Gateway error: %s", e)
+        exit_code = 1
+    finally:
+        stop_components()
+    log_listener.stop()
+    return exit_code
+
+
+def run_processes(processes):
+    """Fork ``processes`` gateway workers sharing the port; restart any that die.
+
+    SIGTERM/SIGINT are forwarded so every worker drains, SIGHUP so every
+    worker reloads its universes. Forking happens before any thread starts.
+    """
+    children = {}  # pid -> process index
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            signal.signal(signal.SIGHUP, signal.SIG_DFL)
+            code = 1
+            try:
+                code = serve(index, processes)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+        children[pid] = index
+
+    def forward(signum, frame):
+        nonlocal stopping
+        if signum != signal.SIGHUP:
+            stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(signum, forward)
+    for index in range(processes):
+        spawn(index)
+
+    exit_code = 0
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid)
+        code = os.waitstatus_to_exitcode(status)
+        if stopping:
+            exit_code = exit_code or code
+            continue
+        print(f"⚠️ Gateway process {index} (pid {pid}) exited with {code}, restarting")
+        sys.stdout.flush()
+        time.sleep(GATEWAY_RESTART_DELAY)
+        spawn(index)
+    return exit_code
+
+
+def main():
+    processes = max(1, GATEWAY_PROCESSES)
+    if processes > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        print("⚠️ SO_REUSEPORT is not available on this platform, running a single gateway process")
+        processes = 1
+    exit_code = serve() if processes == 1 else run_processes(processes)
+    if exit_code:
+        sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Historical Bar Cache
+One memory-mapped columnar OHLCV file per symbol and interval, topped up gap by gap from FMP
+"""
+
+import array
+import bisect
+import calendar
+import collections
+import contextlib
+import datetime
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # no fcntl (Windows): single process only, file locks are skipped
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_SECONDS = {
+    '1min': 60, '5min': 300, '15min': 900, '30min': 1800,
+    '1hour': 3600, '4hour': 14400, '1day': 86400
+}
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+DAY = 86400
+
+_MAGIC = b'SPBARS01'
+_HEADER = struct.Struct('<8sqqq')  # magic, capacity, count, coverage ranges
+_RANGE = struct.Struct('<qq')
+MAX_RANGES = 64
+HEADER_SIZE = _HEADER.size + MAX_RANGES * _RANGE.size
+
+
+def parse_day(value):
+    """``YYYY-MM-DD`` -> epoch seconds at 00:00 UTC"""
+    return calendar.timegm(time.strptime(value, '%Y-%m-%d'))
+
+
+def format_day(epoch_day):
+    return time.strftime('%Y-%m-%d', time.gmtime(epoch_day))
+
+
+def _bar_time(date):
+    """FMP bar date (exchange-local, no zone) -> naive epoch seconds"""
+    return int(datetime.datetime.fromisoformat(date).replace(tzinfo=datetime.timezone.utc).timestamp())
+
+
+class BarFile:
+    """Columnar bar file: header, int64 timestamps, then five float64 columns.
+
+    Every column is preallocated to ``capacity`` rows so appends write in
+    place; anything else rewrites the file to a temp path and renames it
+    over the old one. Slices handed out by ``read`` are memoryviews into the
+    mapping: an old mapping stays alive for as long as someone still holds
+    a slice of it, so a rewrite never invalidates a response that is being
+    serialized.
+
+    The header also records which days have been fetched (``ranges``), so
+    weekends, holidays and days with no trades are not fetched again.
+
+    Several processes (gateway workers) may share a file: anything that
+    reads ``count``/``ranges`` and then writes must run under ``lock()``,
+    which takes an exclusive lock on ``<path>.lock`` and picks up what
+    other processes wrote since.
+    """
+
+    def __init__(self, path, capacity=256):
+        self.path = path
+        with self._file_lock():
+            if not os.path.exists(path):
+                self._rewrite([], [[] for _ in COLUMNS], [], capacity)
+            try:
+                self._open()
+            except ValueError as e:
+                logger.warning("⚠️ Rebuilding bar file %s: %s", path, e)
+                self._rewrite([], [[] for _ in COLUMNS], [], capacity)
+                self._open()
+
+    def _open(self):
+        with open(self.path, 'r+b') as f:
+            self._mm = mmap.mmap(f.fileno(), 0)
+            self._inode = os.fstat(f.fileno()).st_ino
+        if len(self._mm) < HEADER_SIZE:
+            raise ValueError("truncated header")
+        if len(self._mm) != HEADER_SIZE + _HEADER.unpack_from(self._mm, 0)[1] * 8 * (len(COLUMNS) + 1):
+            raise ValueError("not a bar file")
+        self._read_header()
+
+    def _read_header(self):
+        magic, self.capacity, self.count, range_count = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError("not a bar file")
+        self.ranges = [list(_RANGE.unpack_from(self._mm, _HEADER.size + i * _RANGE.size))
+                       for i in range(range_count)]
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield  # closing the file releases the lock
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Exclusive across processes; re-maps the file if another process rewrote it"""
+        with self._file_lock():
+            if os.stat(self.path).st_ino != self._inode:
+                self._open()
+            else:
+                self._read_header()  # in-place appends by others land in our shared mapping
+            yield self
+
+    def _column(self, index, start=0, stop=None):
+        offset = HEADER_SIZE + index * self.capacity * 8
+        stop = self.count if stop is None else stop
+        return memoryview(self._mm)[offset + start * 8:offset + stop * 8].cast('q' if index == 0 else 'd')
+
+    def read(self, start, end):
+        """Zero-copy column slices for bars with ``start <= t <= end``"""
+        times = self._column(0)
+        lo = bisect.bisect_left(times, start)
+        hi = bisect.bisect_right(times, end)
+        columns = {'time': times[lo:hi]}
+        for index, name in enumerate(COLUMNS, start=1):
+            columns[name] = self._column(index, lo, hi)
+        return columns
+
+    def replace(self, start, end, times, columns):
+        """Make ``times``/``columns`` (sorted) the bars for ``start <= t <= end``.
+
+        Bars newer than everything stored are appended in place, past the
+        rows any outstanding slice can see. Replacing stored bars (refreshing
+        the session in progress, back-filling older history) or outgrowing
+        the capacity rewrites the file instead.
+        """
+        existing = self._column(0)
+        lo = bisect.bisect_left(existing, start)
+        hi = bisect.bisect_right(existing, end)
+        if lo == hi == self.count and lo + len(times) <= self.capacity:
+            self._column(0, lo, lo + len(times))[:] = array.array('q', times)
+            for index, column in enumerate(columns, start=1):
+                self._column(index, lo, lo + len(times))[:] = array.array('d', column)
+            self.count = lo + len(times)
+            self._write_header()
+            return
+        keep_before, keep_after = slice(0, lo), slice(hi, self.count)
+        merged_times = existing[keep_before].tolist() + list(times) + existing[keep_after].tolist()
+        merged = [self._column(index)[keep_before].tolist() + list(column) + self._column(index)[keep_after].tolist()
+                  for index, column in enumerate(columns, start=1)]
+        self._rewrite(merged_times, merged, self.ranges, max(self.capacity, 2 * len(merged_times)))
+        self._open()
+
+    def cover(self, start_day, end_day):
+        """Record ``[start_day, end_day]`` as fetched, merging touching ranges"""
+        ranges = sorted(self.ranges + [[start_day, end_day]])
+        merged = [ranges[0]]
+        for first, last in ranges[1:]:
+            if first <= merged[-1][1] + DAY:
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last])
+        self.ranges = merged[-MAX_RANGES:]  # forgetting the oldest ranges only costs a refetch
+        self._write_header()
+
+    def missing(self, start_day, end_day):
+        """Day ranges within ``[start_day, end_day]`` not fetched yet"""
+        gaps = []
+        cursor = start_day
+        for first, last in self.ranges:
+            if last < cursor:
+                continue
+            if first > end_day:
+                break
+            if first > cursor:
+                gaps.append((cursor, first - DAY))
+            cursor = max(cursor, last + DAY)
+        if cursor <= end_day:
+            gaps.append((cursor, end_day))
+        return gaps
+
+    def _write_header(self):
+        _HEADER.pack_into(self._mm, 0, _MAGIC, self.capacity, self.count, len(self.ranges))
+        for i, (first, last) in enumerate(self.ranges):
+            _RANGE.pack_into(self._mm, _HEADER.size + i * _RANGE.size, first, last)
+
+    def _rewrite(self, times, columns, ranges, capacity):
+        header = bytearray(HEADER_SIZE)
+        _HEADER.pack_into(header, 0, _MAGIC, capacity, len(times), len(ranges))
+        for i, (first, last) in enumerate(ranges):
+            _RANGE.pack_into(header, _HEADER.size + i * _RANGE.size, first, last)
+        padding = bytes(8 * (capacity - len(times)))
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"  # gateway worker processes share the directory
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(array.array('q', times).tobytes() + padding)
+            for column in columns:
+                f.write(array.array('d', column).tobytes() + padding)
+        os.replace(tmp_path, self.path)
+
+
+class HistoryStore:
+    """Bar files under ``root/<interval>/<SYMBOL>.bars`` with gap-aware top-ups.
+
+    ``fetch(symbol, interval, from_date, to_date)`` returns FMP-style bar
+    dicts (``date``, ``open``, ``high``, ``low``, ``close``, ``volume``).
+    Only day ranges a file has not covered yet are fetched. The last
+    ``open_days`` days (the session in progress, in any exchange timezone)
+    are never marked covered; they are refetched at most every
+    ``tail_ttl`` seconds. Concurrent requests for the same file wait on one
+    fetch instead of repeating it.
+    """
+
+    def __init__(self, root, fetch, tail_ttl=60.0, open_days=2, max_open_files=512):
+        self.root = root
+        self.fetch = fetch
+        self.tail_ttl = tail_ttl
+        self.open_days = open_days
+        self.max_open_files = max_open_files
+        self._files = collections.OrderedDict()  # (symbol, interval) -> BarFile, LRU
+        self._locks = {}
+        self._tail_checked = {}
+        self._lock = threading.Lock()
+        self.upstream_fetches = 0
+        self.bars_fetched = 0
+        self.reads = 0
+        self.network_free_reads = 0
+
+    def _file(self, symbol, interval):
+        key = (symbol, interval)
+        with self._lock:
+            bar_file = self._files.get(key)
+            if bar_file is not None:
+                self._files.move_to_end(key)
+                return bar_file
+        directory = os.path.join(self.root, interval)
+        os.makedirs(directory, exist_ok=True)
+        bar_file = BarFile(os.path.join(directory, f"{symbol}.bars"))
+        with self._lock:
+            self._files[key] = bar_file
+            if len(self._files) > self.max_open_files:
+                self._files.popitem(last=False)  # mapping closes once no slice references it
+        return bar_file
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def read(self, symbol, interval, start_day, end_day):
+        """Column slices for ``[start_day, end_day]``, fetching only what is missing.
+
+        Returns ``(columns, fetched_ranges)``.
+        """
+        if interval not in INTERVAL_SECONDS:
+            raise ValueError(f"Unknown interval: {interval}")
+        key = (symbol, interval)
+        with self._key_lock(key), self._file(symbol, interval).lock() as bar_file:
+            open_from = (int(time.time()) // DAY - self.open_days + 1) * DAY
+            gaps = bar_file.missing(start_day, min(end_day, open_from - DAY))
+            if end_day >= open_from and time.monotonic() - self._tail_checked.get(key, -1e9) > self.tail_ttl:
+                gaps.append((max(start_day, open_from), end_day))
+
+            for first, last in gaps:
+                bars = self.fetch(symbol, interval, format_day(first), format_day(last))
+                self.upstream_fetches += 1
+                rows = sorted((_bar_time(bar['date']), bar) for bar in bars if bar.get('date'))
+                rows = list({t: bar for t, bar in rows}.items())  # one bar per timestamp
+                times = [t for t, _ in rows]
+                bar_file.replace(first, last + DAY - 1, times,
+                                 [[float(bar.get(name) or 0) for _, bar in rows] for name in COLUMNS])
+                self.bars_fetched += len(rows)
+                if first < open_from:
+                    bar_file.cover(first, min(last, open_from - DAY))
+                if last >= open_from:
+                    self._tail_checked[key] = time.monotonic()
+
+            self.reads += 1
+            if not gaps:
+                self.network_free_reads += 1
+            return bar_file.read(start_day, end_day + DAY - 1), len(gaps)
+
+    def stats(self):
+        with self._lock:
+            files = list(self._files.values())
+        return {
+            "open_files": len(files),
+            "cached_bars": sum(f.count for f in files),
+            "reads": self.reads,
+            "network_free_reads": self.network_free_reads,
+            "upstream_fetches": self.upstream_fetches,
+            "bars_fetched": self.bars_fetched
+        }
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Incremental Indicator Engine
+Per-symbol rolling state updated in O(1) per quote tick: VWAP, EMA, RSI, volatility, relative volume
+"""
+
+import collections
+import math
+import threading
+import time
+
+
+class _SymbolState:
+    """Rolling state for one symbol; memory is fixed by ``window``"""
+
+    __slots__ = ('session', 'last_timestamp', 'last_price', 'last_volume', 'ticks',
+                 'pv_sum', 'v_sum', 'ema_fast', 'ema_slow', 'avg_gain', 'avg_loss', 'rsi_seed',
+                 'returns', 'return_index', 'return_count', 'return_sum', 'return_sq_sum',
+                 'relative_volume')
+
+    def __init__(self, window):
+        self.session = None
+        self.last_timestamp = None
+        self.last_price = None
+        self.last_volume = 0.0
+        self.ticks = 0
+        self.pv_sum = 0.0
+        self.v_sum = 0.0
+        self.ema_fast = None
+        self.ema_slow = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.rsi_seed = 0
+        self.returns = [0.0] * window  # ring buffer of log returns
+        self.return_index = 0
+        self.return_count = 0
+        self.return_sum = 0.0
+        self.return_sq_sum = 0.0
+        self.relative_volume = None
+
+
+class IndicatorEngine:
+    """Updates every symbol's indicators from raw FMP /quote records.
+
+    - VWAP: volume-weighted price of the volume traded since tracking
+      began, from the growth of FMP's cumulative day volume; reset when the
+      trading day changes or the volume counter drops
+    - EMA: tick-based exponential averages (``fast``/``slow`` ticks)
+    - RSI: Wilder-smoothed over ``rsi_period`` ticks
+    - volatility: standard deviation of the last ``window`` log returns
+      (ring buffer with running sums), in percent
+    - relative_volume: day volume over FMP's average volume
+
+    Ticks repeating the previous quote timestamp are ignored, so replays
+    from the quote cache never double count. At most ``max_symbols``
+    symbols are tracked; the least recently updated are evicted.
+    """
+
+    def __init__(self, window=30, fast=12, slow=26, rsi_period=14, max_symbols=5000):
+        self.window = window
+        self.fast_alpha = 2.0 / (fast + 1)
+        self.slow_alpha = 2.0 / (slow + 1)
+        self.rsi_period = rsi_period
+        self.max_symbols = max_symbols
+        self._states = collections.OrderedDict()  # symbol -> _SymbolState, oldest update first
+        self._lock = threading.Lock()
+        self.ticks = 0
+        self.skipped = 0
+        self.evictions = 0
+
+    def update(self, records):
+        """Apply one tick per raw FMP /quote record keyed by symbol"""
+        with self._lock:
+            for symbol, quote in records.items():
+                if quote:
+                    self._tick(symbol, quote)
+
+    def _tick(self, symbol, quote):
+        price = quote.get('price')
+        if not price or price <= 0:
+            return
+        timestamp = quote.get('timestamp') or int(time.time())
+
+        state = self._states.get(symbol)
+        if state is None:
+            state = self._states[symbol] = _SymbolState(self.window)
+            if len(self._states) > self.max_symbols:
+                self._states.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._states.move_to_end(symbol)
+        if timestamp == state.last_timestamp:
+            self.skipped += 1
+            return
+
+        volume = float(quote.get('volume') or 0)
+        session = time.strftime('%Y-%m-%d', time.gmtime(timestamp))
+        if session != state.session or volume < state.last_volume:
+            # Volume already traded before the first tick has no known price: use it as the baseline
+            state.session = session
+            state.pv_sum = state.v_sum = 0.0
+            state.last_volume = volume
+
+        # VWAP: the volume traded since the previous tick happened at about this price
+        traded = volume - state.last_volume
+        if traded > 0:
+            state.pv_sum += price * traded
+            state.v_sum += traded
+        state.last_volume = volume
+
+        if state.ema_fast is None:
+            state.ema_fast = state.ema_slow = price
+        else:
+            state.ema_fast += self.fast_alpha * (price - state.ema_fast)
+            state.ema_slow += self.slow_alpha * (price - state.ema_slow)
+
+        if state.last_price is not None:
+            delta = price - state.last_price
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+            if state.rsi_seed < self.rsi_period:
+                # Simple average until the first full period, Wilder smoothing after
+                state.rsi_seed += 1
+                state.avg_gain += (gain - state.avg_gain) / state.rsi_seed
+                state.avg_loss += (loss - state.avg_loss) / state.rsi_seed
+            else:
+                state.avg_gain += (gain - state.avg_gain) / self.rsi_period
+                state.avg_loss += (loss - state.avg_loss) / self.rsi_period
+
+            log_return = math.log(price / state.last_price)
+            evicted = state.returns[state.return_index]
+            state.returns[state.return_index] = log_return
+            state.return_index = (state.return_index + 1) % self.window
+            if state.return_count < self.window:
+                state.return_count += 1
+            else:
+                state.return_sum -= evicted
+                state.return_sq_sum -= evicted * evicted
+            state.return_sum += log_return
+            state.return_sq_sum += log_return * log_return
+            if state.return_index == 0:
+                # Once per lap re-sum the buffer so float error in the running sums cannot build up
+                state.return_sum = math.fsum(state.returns)
+                state.return_sq_sum = math.fsum(r * r for r in state.returns)
+
+        avg_volume = quote.get('avgVolume')
+        state.relative_volume = volume / avg_volume if avg_volume else None
+        state.last_price = price
+        state.last_timestamp = timestamp
+        state.ticks += 1
+        self.ticks += 1
+
+    def get(self, symbol):
+        """Indicator values for ``symbol``, or None before its first tick"""
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is None:
+                return None
+            return self._values(state)
+
+    def get_many(self, symbols):
+        with self._lock:
+            return {symbol: self._values(self._states[symbol]) for symbol in symbols if symbol in self._states}
+
+    def _values(self, state):
+        rsi = None
+        if state.rsi_seed >= self.rsi_period:
+            rsi = 100.0 if state.avg_loss == 0 else 100.0 - 100.0 / (1.0 + state.avg_gain / state.avg_loss)
+        volatility = None
+        if state.return_count >= 2:
+            n = state.return_count
+            variance = max(0.0, (state.return_sq_sum - state.return_sum * state.return_sum / n) / (n - 1))
+            volatility = math.sqrt(variance) * 100
+        return {
+            "vwap": round(state.pv_sum / state.v_sum, 4) if state.v_sum else None,
+            "ema_fast": round(state.ema_fast, 4),
+            "ema_slow": round(state.ema_slow, 4),
+            "rsi": round(rsi, 2) if rsi is not None else None,
+            "volatility": round(volatility, 4) if volatility is not None else None,
+            "relative_volume": round(state.relative_volume, 3) if state.relative_volume is not None else None,
+            "ticks": state.ticks,
+            "warm": state.return_count >= self.window
+        }
+
+    def stats(self):
+        with self._lock:
+            symbols = len(self._states)
+        return {
+            "symbols": symbols,
+            "max_symbols": self.max_symbols,
+            "window": self.window,
+            "ticks": self.ticks,
+            "duplicate_ticks": self.skipped,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Background Universe Prefetcher
+Keeps hot stock universes warm in an in-memory snapshot so bulk requests never wait on FMP
+"""
+
+import logging
+import math
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class UniversePrefetcher:
+    """Periodically refreshes a set of universes into a per-symbol snapshot.
+
+    Every cycle the configured universes are ordered by recent request
+    frequency (an exponentially decayed counter), their symbols are merged
+    so a symbol shared by several universes is fetched once, and the result
+    is fetched through ``fetch(symbols) -> (records, failed_batches)``.
+    Symbols from failed batches keep their previous (older) snapshot entry.
+    """
+
+    def __init__(self, universes, fetch, warm_universes=None, interval=15.0, half_life=300.0):
+        self.universes = universes
+        self.fetch = fetch
+        self.warm_universes = list(warm_universes) if warm_universes else list(universes)
+        self.interval = interval
+        self.half_life = half_life
+        self._records = {}  # symbol -> (fetched_at, record or None when FMP has no quote)
+        self._scores = {}  # universe -> (score, updated_at)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.cycles = 0
+        self.last_cycle_seconds = 0.0
+        self.last_cycle_symbols = 0
+        self.last_error = None
+
+    def record_request(self, universe):
+        """Bump the decayed request counter used to prioritise refreshes"""
+        now = time.time()
+        with self._lock:
+            self._scores[universe] = (self._decayed_score(universe, now) + 1.0, now)
+
+    def _decayed_score(self, universe, now):
+        score, updated_at = self._scores.get(universe, (0.0, now))
+        return score * math.pow(0.5, (now - updated_at) / self.half_life)
+
+    def priority_order(self):
+        """Warm universes, most requested first (ties keep configured order)"""
+        now = time.time()
+        with self._lock:
+            scores = {name: self._decayed_score(name, now) for name in self.warm_universes}
+        return sorted((name for name in self.warm_universes if name in self.universes),
+                      key=lambda name: -scores[name])
+
+    def refresh_once(self):
+        """Fetch every distinct symbol of the warm universes once"""
+        started = time.monotonic()
+        symbols = []
+        for name in self.priority_order():
+            symbols.extend(self.universes[name])
+        symbols = list(dict.fromkeys(symbols))
+
+        records, failed_batches = self.fetch(symbols)
+        failed = {symbol for batch in failed_batches for symbol in batch['symbols']}
+        fetched_at = time.time()
+        with self._lock:
+            for symbol in symbols:
+                if symbol not in failed:
+                    self._records[symbol] = (fetched_at, records.get(symbol))
+
+        self.cycles += 1
+        self.last_cycle_symbols = len(symbols)
+        self.last_cycle_seconds = time.monotonic() - started
+        self.last_error = f"{len(failed_batches)} batch(es) failed" if failed_batches else None
+        return len(symbols), failed_batches
+
+    def restore(self, entries):
+        """Seed the snapshot from ``{symbol: (fetched_at, record)}`` persisted by a previous run"""
+        with self._lock:
+            for symbol, (fetched_at, record) in entries.items():
+                if symbol not in self._records:
+                    self._records[symbol] = (fetched_at, record)
+        return len(entries)
+
+    @property
+    def warmed(self):
+        """True once a full refresh cycle has completed in this process"""
+        return self.cycles > 0
+
+    def lookup(self, symbols):
+        """Snapshot records for symbols plus the oldest fetch time among them.
+
+        Returns ``None`` unless every symbol has been fetched at least once,
+        so callers fall back to a live fetch for cold universes.
+        """
+        with self._lock:
+            entries = [self._records.get(symbol) for symbol in symbols]
+        if not entries or any(entry is None for entry in entries):
+            return None
+        records = {symbol: entry[1] for symbol, entry in zip(symbols, entries) if entry[1] is not None}
+        return records, min(entry[0] for entry in entries)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                count, failed_batches = self.refresh_once()
+                logger.info("🔥 Prefetched %d symbols in %.2fs", count, self.last_cycle_seconds,
+                            extra={"fields": {"symbols": count, "failed_batches": len(failed_batches)}})
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning("⚠️ Prefetch cycle failed: %s", e)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start the refresh loop in a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="universe-prefetcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            oldest = min((entry[0] for entry in self._records.values()), default=None)
+            scores = {name: round(self._decayed_score(name, now), 3) for name in self._scores}
+            symbols = len(self._records)
+        return {
+            "interval_seconds": self.interval,
+            "warm_universes": self.priority_order(),
+            "request_scores": scores,
+            "symbols": symbols,
+            "cycles": self.cycles,
+            "last_cycle_seconds": round(self.last_cycle_seconds, 3),
+            "last_cycle_symbols": self.last_cycle_symbols,
+            "oldest_entry_age_seconds": round(now - oldest, 1) if oldest is not None else None,
+            "last_error": self.last_error
+        }
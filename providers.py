@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Quote Data Providers
+Upstream data sources behind one interface (FMP, Polygon, local replay) plus the shared quote normalization
+"""
+
+import datetime
+import json
+import logging
+import random
+import threading
+import time
+import urllib.parse
+import zlib
+from urllib.error import HTTPError
+
+from history_store import INTERVAL_SECONDS, parse_day
+
+try:
+    from zoneinfo import ZoneInfo
+    MARKET_TZ = ZoneInfo('America/New_York')
+except Exception:  # no tz database: fall back to UTC bar dates
+    MARKET_TZ = datetime.timezone.utc
+
+
+logger = logging.getLogger(__name__)
+
+# Every provider returns FMP /quote-shaped records ("canonical records"):
+# symbol, price, changesPercentage, change, dayLow, dayHigh, yearLow, yearHigh,
+# marketCap, volume, avgVolume, exchange, pe, timestamp. Missing values are None.
+
+# Client-facing field -> (canonical record key, default)
+QUOTE_FIELDS = {
+    "ticker": ('symbol', ''),
+    "price": ('price', 0),
+    "change": ('changesPercentage', 0),
+    "change_amount": ('change', 0),
+    "volume": ('volume', 0),
+    "market_cap": ('marketCap', 0),
+    "pe": ('pe', None),
+    "day_low": ('dayLow', 0),
+    "day_high": ('dayHigh', 0),
+    "year_low": ('yearLow', 0),
+    "year_high": ('yearHigh', 0),
+    "exchange": ('exchange', 'NASDAQ'),
+    "timestamp": ('timestamp', None)
+}
+DETAIL_FIELDS = tuple(QUOTE_FIELDS)
+LIST_FIELDS = ('ticker', 'price', 'change', 'change_amount', 'volume', 'market_cap', 'timestamp')
+STREAM_FIELDS = ('ticker', 'price', 'change', 'change_amount', 'volume', 'market_cap', 'day_low', 'day_high', 'timestamp')
+BULK_FIELDS = ('ticker', 'price', 'change', 'change_amount', 'volume', 'market_cap', 'pe', 'day_low', 'day_high',
+               'timestamp')
+REALTIME_FIELDS = ('ticker', 'price', 'change', 'change_amount', 'volume', 'timestamp')
+
+
+def normalize_quote(record, fields=LIST_FIELDS, fetched_at=None):
+    """Client-facing quote with ``fields`` from a canonical record.
+
+    A missing timestamp becomes ``fetched_at`` (default: now).
+    """
+    quote = {}
+    for name in fields:
+        key, default = QUOTE_FIELDS[name]
+        quote[name] = record.get(key, default)
+    if 'timestamp' in quote and quote['timestamp'] is None:
+        quote['timestamp'] = int(fetched_at if fetched_at is not None else time.time())
+    return quote
+
+
+def records_by_symbol(data):
+    """``[{symbol: ...}, ...]`` -> ``{symbol: record}``; anything else -> {}"""
+    if not isinstance(data, list):
+        return {}
+    return {quote.get('symbol'): quote for quote in data if isinstance(quote, dict) and quote.get('symbol')}
+
+
+class QuoteProvider:
+    """Interface every upstream data source implements.
+
+    ``quotes`` and ``quote_short`` return canonical records keyed by symbol;
+    ``history`` returns FMP-style bar dicts (``date``, ``open``, ``high``,
+    ``low``, ``close``, ``volume``). Upstream failures raise
+    ``urllib.error.HTTPError`` (429 for throttling) or ``OSError``.
+    """
+
+    name = 'base'
+    title = 'Base'
+
+    def quotes(self, symbols, timeout=10):
+        raise NotImplementedError
+
+    def quote_short(self, symbols, timeout=5):
+        """Freshest price and volume; providers without a cheaper call reuse ``quotes``"""
+        return {symbol: {"symbol": symbol, "price": record.get('price'), "volume": record.get('volume')}
+                for symbol, record in self.quotes(symbols, timeout).items()}
+
+    def history(self, symbol, interval, from_date, to_date, timeout=15):
+        raise NotImplementedError
+
+    def stats(self):
+        return {"provider": self.name}
+
+
+class FMPProvider(QuoteProvider):
+    """Financial Modeling Prep v3 - records already are canonical.
+
+    ``get_json(url, label, timeout)`` performs the GET and decodes the
+    body; ``label`` is a low-cardinality name for metrics.
+    """
+
+    name = 'fmp'
+    title = 'FMP'
+
+    def __init__(self, base_url, api_key, get_json):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.get_json = get_json
+
+    def _url(self, path, params=None):
+        return f"{self.base_url}{path}?{urllib.parse.urlencode({**(params or {}), 'apikey': self.api_key})}"
+
+    def quotes(self, symbols, timeout=10):
+        return records_by_symbol(self.get_json(self._url(f"/quote/{','.join(symbols)}"), '/quote', timeout))
+
+    def quote_short(self, symbols, timeout=5):
+        return records_by_symbol(self.get_json(self._url(f"/quote-short/{','.join(symbols)}"), '/quote-short', timeout))
+
+    def history(self, symbol, interval, from_date, to_date, timeout=15):
+        params = {'from': from_date, 'to': to_date}
+        if interval == '1day':
+            data = self.get_json(self._url(f"/historical-price-full/{symbol}", params), '/historical-price-full', timeout)
+            return data.get('historical', []) if isinstance(data, dict) else []
+        data = self.get_json(self._url(f"/historical-chart/{interval}/{symbol}", params), '/historical-chart', timeout)
+        return data if isinstance(data, list) else []
+
+
+class PolygonProvider(QuoteProvider):
+    """Polygon.io snapshot and aggregates endpoints, normalized to canonical records.
+
+    Polygon has no market cap, P/E or 52-week range in its snapshot; those
+    fields come back as None.
+    """
+
+    name = 'polygon'
+    title = 'Polygon'
+
+    # Proxy interval -> (multiplier, timespan)
+    INTERVALS = {
+        '1min': (1, 'minute'), '5min': (5, 'minute'), '15min': (15, 'minute'), '30min': (30, 'minute'),
+        '1hour': (1, 'hour'), '4hour': (4, 'hour'), '1day': (1, 'day')
+    }
+
+    def __init__(self, base_url, api_key, get_json):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.get_json = get_json
+
+    def _url(self, path, params=None):
+        return f"{self.base_url}{path}?{urllib.parse.urlencode({**(params or {}), 'apiKey': self.api_key})}"
+
+    @staticmethod
+    def normalize(ticker):
+        """Polygon snapshot ticker -> canonical record"""
+        day = ticker.get('day') or {}
+        last_trade = ticker.get('lastTrade') or {}
+        minute = ticker.get('min') or {}
+        updated = ticker.get('updated') or last_trade.get('t')
+        return {
+            "symbol": ticker.get('ticker'),
+            "price": last_trade.get('p') or minute.get('c') or day.get('c'),
+            "changesPercentage": ticker.get('todaysChangePerc'),
+            "change": ticker.get('todaysChange'),
+            "dayLow": day.get('l'),
+            "dayHigh": day.get('h'),
+            "yearLow": None,
+            "yearHigh": None,
+            "marketCap": None,
+            "volume": day.get('v') or minute.get('av'),
+            "avgVolume": None,
+            "open": day.get('o'),
+            "previousClose": (ticker.get('prevDay') or {}).get('c'),
+            "exchange": None,
+            "pe": None,
+            "timestamp": int(updated / 1e9) if updated else None  # nanoseconds
+        }
+
+    def quotes(self, symbols, timeout=10):
+        data = self.get_json(self._url('/v2/snapshot/locale/us/markets/stocks/tickers',
+                                       {'tickers': ','.join(symbols)}), '/v2/snapshot', timeout)
+        tickers = data.get('tickers') if isinstance(data, dict) else None
+        return {record['symbol']: record for record in map(self.normalize, tickers or []) if record['symbol']}
+
+    def history(self, symbol, interval, from_date, to_date, timeout=15):
+        multiplier, timespan = self.INTERVALS[interval]
+        data = self.get_json(self._url(f"/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from_date}/{to_date}",
+                                       {'adjusted': 'true', 'sort': 'asc', 'limit': 50000}), '/v2/aggs', timeout)
+        results = data.get('results') if isinstance(data, dict) else None
+        date_format = '%Y-%m-%d' if timespan == 'day' else '%Y-%m-%d %H:%M:%S'
+        return [{
+            # FMP bar dates are exchange-local; Polygon's are UTC milliseconds
+            "date": datetime.datetime.fromtimestamp(bar['t'] / 1000, MARKET_TZ).strftime(date_format),
+            "open": bar.get('o'),
+            "high": bar.get('h'),
+            "low": bar.get('l'),
+            "close": bar.get('c'),
+            "volume": bar.get('v')
+        } for bar in results or [] if 't' in bar]
+
+
+def synthetic_quote(symbol):
+    """Stable fake quote for a symbol (same symbol -> same numbers)"""
+    seed = zlib.crc32(symbol.encode())
+    price = 5 + (seed % 50000) / 100
+    change_pct = ((seed >> 8) % 2000 - 1000) / 100
+    return {
+        "symbol": symbol,
+        "name": f"{symbol} Inc.",
+        "price": round(price, 2),
+        "changesPercentage": change_pct,
+        "change": round(price * change_pct / 100, 2),
+        "dayLow": round(price * 0.97, 2),
+        "dayHigh": round(price * 1.03, 2),
+        "yearLow": round(price * 0.6, 2),
+        "yearHigh": round(price * 1.4, 2),
+        "marketCap": int(price * (1 + seed % 5000) * 1_000_000),
+        "volume": 100_000 + seed % 50_000_000,
+        "avgVolume": 100_000 + (seed >> 4) % 50_000_000,
+        "exchange": "NASDAQ",
+        "pe": round(5 + (seed >> 12) % 6000 / 100, 2),
+        "timestamp": int(time.time())
+    }
+
+
+def synthetic_bars(symbol, start, end, step):
+    """Weekday bars between two epoch days (inclusive), newest first like FMP.
+
+    Daily bars (``step`` 86400) come back as ``YYYY-MM-DD``; intraday bars
+    cover 09:30-16:00 as ``YYYY-MM-DD HH:MM:SS``.
+    """
+    seed = zlib.crc32(symbol.encode())
+    bars = []
+    day = start - start % 86400
+    while day <= end:
+        if time.gmtime(day).tm_wday < 5:
+            times = [day] if step >= 86400 else range(day + 34200, day + 57600, step)
+            for t in times:
+                base = 5 + (seed % 50000) / 100 + (t // step % 97) / 10
+                bars.append({
+                    "date": time.strftime('%Y-%m-%d' if step >= 86400 else '%Y-%m-%d %H:%M:%S', time.gmtime(t)),
+                    "open": round(base, 2),
+                    "high": round(base * 1.01, 2),
+                    "low": round(base * 0.99, 2),
+                    "close": round(base * 1.002, 2),
+                    "volume": 1000 + (seed + t // step) % 100000
+                })
+        day += 86400
+    bars.reverse()
+    return bars
+
+
+def load_recording(path):
+    """Canonical records keyed by symbol from a recording.
+
+    Accepts a JSON list of FMP quotes, a ``{symbol: quote}`` object, or a
+    quote snapshot log (``api_proxy_snapshot.log``; latest entry wins).
+    """
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if isinstance(data, list):
+        return records_by_symbol(data)
+    if isinstance(data, dict) and 'q' not in data:
+        return {symbol.upper(): dict(quote, symbol=symbol.upper()) for symbol, quote in data.items()
+                if isinstance(quote, dict)}
+    records = {}
+    for line in text.splitlines():
+        try:
+            batch = json.loads(line)["q"]
+        except (ValueError, KeyError, TypeError):
+            continue
+        records.update({symbol: entry[1] for symbol, entry in batch.items()})
+    return records
+
+
+class ReplayProvider(QuoteProvider):
+    """Local stand-in upstream for load tests, benchmarks and CI - never touches the network.
+
+    Serves ``records`` (see ``load_recording``) and, when ``synthesize`` is
+    set, deterministic synthetic quotes for every other symbol; history is
+    always synthetic. Each call sleeps ``latency`` seconds (plus up to
+    ``jitter``) and fails with HTTP 503 at ``error_rate`` or HTTP 429 at
+    ``throttle_rate``, so retries, backoff and partial results can be
+    exercised without burning real quota. ``seed`` makes failures
+    reproducible.
+    """
+
+    name = 'replay'
+    title = 'Replay'
+
+    def __init__(self, records=None, synthesize=True, latency=0.0, jitter=0.0,
+                 error_rate=0.0, throttle_rate=0.0, seed=None):
+        self.records = dict(records or {})
+        self.synthesize = synthesize
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.throttles = 0
+
+    def _call(self, url):
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        if roll < self.throttle_rate:
+            with self._lock:
+                self.throttles += 1
+            raise HTTPError(url, 429, "Too Many Requests (replay)", {'Retry-After': '1'}, None)
+        if roll < self.throttle_rate + self.error_rate:
+            with self._lock:
+                self.errors += 1
+            raise HTTPError(url, 503, "Service Unavailable (replay)", {}, None)
+
+    def quotes(self, symbols, timeout=10):
+        self._call(f"replay:/quote/{','.join(symbols)}")
+        now = int(time.time())
+        records = {}
+        for symbol in symbols:
+            record = self.records.get(symbol)
+            if record is not None:
+                records[symbol] = dict(record, timestamp=now)
+            elif self.synthesize:
+                records[symbol] = synthetic_quote(symbol)
+        return records
+
+    def history(self, symbol, interval, from_date, to_date, timeout=15):
+        self._call(f"replay:/history/{interval}/{symbol}")
+        return synthetic_bars(symbol, parse_day(from_date), parse_day(to_date), INTERVAL_SECONDS[interval])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "provider": self.name,
+                "recorded_symbols": len(self.records),
+                "calls": self.calls,
+                "errors": self.errors,
+                "throttles": self.throttles,
+                "latency": self.latency,
+                "error_rate": self.error_rate,
+                "throttle_rate": self.throttle_rate
+            }
+
+
+class FailoverProvider(QuoteProvider):
+    """Tries ``primary`` and, when it fails, ``fallback`` (e.g. FMP then Polygon).
+
+    A 429 from the primary is re-raised instead: the upstream governor has
+    to see it to back off, or the primary keeps getting full-rate traffic
+    while it is throttling us.
+    """
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+        self.title = primary.title
+        self._lock = threading.Lock()
+        self.failovers = 0
+        self.last_error = None
+
+    def _try(self, method, *args):
+        try:
+            return getattr(self.primary, method)(*args)
+        except Exception as e:
+            if getattr(e, 'code', None) == 429:
+                raise
+            with self._lock:
+                self.failovers += 1
+                self.last_error = f"{self.primary.name}: {e}"
+            logger.warning("⚠️ %s %s failed (%s), failing over to %s", self.primary.name, method, e, self.fallback.name)
+            return getattr(self.fallback, method)(*args)
+
+    def quotes(self, symbols, timeout=10):
+        return self._try('quotes', symbols, timeout)
+
+    def quote_short(self, symbols, timeout=5):
+        return self._try('quote_short', symbols, timeout)
+
+    def history(self, symbol, interval, from_date, to_date, timeout=15):
+        return self._try('history', symbol, interval, from_date, to_date, timeout)
+
+    def stats(self):
+        return {
+            "provider": self.name,
+            "failovers": self.failovers,
+            "last_error": self.last_error,
+            "primary": self.primary.stats(),
+            "fallback": self.fallback.stats()
+        }
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Proxy Logging
+Non-blocking, leveled and sampled logging: request threads only enqueue records,
+a background listener thread formats and writes them
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg plus any ``fields`` extra"""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable ``[time] LEVEL msg key=value`` lines"""
+
+    def __init__(self):
+        super().__init__('[%(asctime)s] %(levelname)s %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class SampleFilter(logging.Filter):
+    """Keep only ``rate`` of the records logged with ``extra={'sampled': True}``"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if getattr(record, 'sampled', False) and record.levelno < logging.WARNING:
+            return random.random() < self.rate
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level='INFO', fmt='json', sample_rate=0.05, queue_size=10000, stream=None):
+    """Route every logger through a bounded queue drained by a listener thread.
+
+    Returns the started ``QueueListener``; call ``stop()`` on shutdown to
+    flush whatever is still queued.
+    """
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(SampleFilter(sample_rate))
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    listener.start()
+    return listener
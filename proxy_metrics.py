@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Proxy Metrics
+Counters, latency histograms and per-request timing spans, rendered in Prometheus text format
+"""
+
+import bisect
+import contextlib
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class _RequestTrace:
+    __slots__ = ('endpoint', 'started', 'spans')
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.spans = []  # (stage, seconds)
+
+
+class _Span:
+    """Times one stage of the current request"""
+
+    __slots__ = ('metrics', 'stage', 'labels', 'started')
+
+    def __init__(self, metrics, stage, labels):
+        self.metrics = metrics
+        self.stage = stage
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        trace = getattr(self.metrics._local, 'trace', None)
+        labels = dict(self.labels, stage=self.stage)
+        if trace is not None:
+            trace.spans.append((self.stage, elapsed))
+            labels.setdefault('endpoint', trace.endpoint)
+        self.metrics.observe('proxy_stage_seconds', elapsed, labels)
+        return False
+
+
+class ProxyMetrics:
+    """Thread-safe metric registry for the proxy.
+
+    With ``enabled=False`` every method returns immediately and ``span``
+    hands back a shared no-op context manager, so instrumentation can stay
+    in the hot path at effectively zero cost.
+    """
+
+    HELP = {
+        'proxy_requests_total': ('counter', 'Requests served, by endpoint and status'),
+        'proxy_errors_total': ('counter', 'Error responses, by endpoint and status'),
+        'proxy_upstream_calls_total': ('counter', 'Upstream calls, by path and outcome'),
+        'proxy_request_seconds': ('histogram', 'End-to-end request latency'),
+        'proxy_stage_seconds': ('histogram', 'Latency of request stages (fetch, normalize, serialize, write)'),
+        'proxy_upstream_seconds': ('histogram', 'Upstream call latency, by path'),
+    }
+
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._counters = {}  # (name, label_key) -> value
+        self._histograms = {}  # (name, label_key) -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def inc(self, name, labels=None, amount=1):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, labels=None):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def span(self, stage, **labels):
+        """Context manager timing ``stage`` for the current request"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage, labels)
+
+    def begin_request(self, endpoint):
+        """Start collecting spans for the request handled by this thread"""
+        if self.enabled:
+            self._local.trace = _RequestTrace(endpoint)
+
+    def server_timing(self):
+        """Server-Timing header value for the spans recorded so far"""
+        trace = getattr(self._local, 'trace', None)
+        if not self.enabled or trace is None:
+            return None
+        totals = {}
+        for stage, seconds in trace.spans:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        return ', '.join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in totals.items()) or None
+
+    def end_request(self, status):
+        """Record the finished request and forget its trace"""
+        trace = getattr(self._local, 'trace', None)
+        if not self.enabled or trace is None:
+            return
+        self._local.trace = None
+        labels = {"endpoint": trace.endpoint, "status": str(status)}
+        self.observe('proxy_request_seconds', time.perf_counter() - trace.started, {"endpoint": trace.endpoint})
+        self.inc('proxy_requests_total', labels)
+        if status >= 400:
+            self.inc('proxy_errors_total', labels)
+
+    def render(self, gauges=None):
+        """Prometheus text exposition (format 0.0.4)"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(values)) for key, values in self._histograms.items())
+
+        lines = []
+        described = set()
+
+        def describe(name, kind=None, text=None):
+            if name in described:
+                return
+            described.add(name)
+            kind, text = self.HELP.get(name, (kind or 'gauge', text or name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, key), value in counters:
+            describe(name, 'counter')
+            lines.append(f"{name}{_format_labels(key)} {value}")
+
+        for (name, key), values in histograms:
+            describe(name, 'histogram')
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(key)} {values[-2]:.6f}")
+            lines.append(f"{name}_count{_format_labels(key)} {values[-1]}")
+
+        for name, (text, samples) in sorted((gauges or {}).items()):
+            describe(name, 'gauge', text)
+            for labels, value in samples:
+                if value is not None:
+                    lines.append(f"{name}{_format_labels(_label_key(labels))} {value}")
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Shared Quote Cache
+Per-symbol TTL cache with LRU eviction and single-flight request coalescing
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """An upstream fetch in progress that other threads can wait on"""
+
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class QuoteCache:
+    """Thread-safe quote cache shared by every proxy handler thread.
+
+    Entries are keyed by ``(namespace, symbol)`` so different upstream
+    endpoints (``quote``, ``quote-short``) can share one memory bound.
+    Symbols that are already being fetched by another thread are not fetched
+    again: the caller waits for the in-flight result instead.
+    """
+
+    def __init__(self, ttl=5.0, max_entries=10000, wait_timeout=30.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self._entries = OrderedDict()  # (namespace, symbol) -> (stored_at, value)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_many(self, namespace, symbols, fetch):
+        """Return ``{symbol: value}`` for ``symbols``, fetching stale ones once.
+
+        ``fetch`` receives the list of symbols this thread is responsible for
+        and must return a dict keyed by symbol. Symbols missing from that dict
+        are cached as negative entries so unknown tickers do not hammer the
+        upstream either. Fetch errors are re-raised to every waiting thread.
+        """
+        results = {}
+        owned = []
+        waiting = []
+        now = time.monotonic()
+
+        with self._lock:
+            for symbol in dict.fromkeys(symbols):
+                key = (namespace, symbol)
+                entry = self._entries.get(key)
+                if entry is not None and now - entry[0] < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results[symbol] = entry[1]
+                elif key in self._inflight:
+                    self.coalesced += 1
+                    waiting.append((symbol, self._inflight[key]))
+                else:
+                    self.misses += 1
+                    self._inflight[key] = _Flight()
+                    owned.append(symbol)
+
+        if owned:
+            try:
+                fetched = fetch(list(owned)) or {}
+            except BaseException as exc:
+                with self._lock:
+                    for symbol in owned:
+                        flight = self._inflight.pop((namespace, symbol))
+                        flight.error = exc
+                        flight.event.set()
+                raise
+
+            stored_at = time.monotonic()
+            with self._lock:
+                for symbol in owned:
+                    value = fetched.get(symbol)
+                    self._store((namespace, symbol), value, stored_at)
+                    flight = self._inflight.pop((namespace, symbol))
+                    flight.value = value
+                    flight.event.set()
+                    results[symbol] = value
+
+        for symbol, flight in waiting:
+            if not flight.event.wait(self.wait_timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight fetch of {symbol}")
+            if flight.error is not None:
+                raise flight.error
+            results[symbol] = flight.value
+
+        return {symbol: value for symbol, value in results.items() if value is not None}
+
+    def _store(self, key, value, stored_at):
+        """Insert an entry and evict least recently used ones over the bound"""
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every cached entry (in-flight fetches are unaffected)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "in_flight": len(self._inflight),
+                "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Columnar Quote Store
+Latest quote per symbol held in NumPy columns so screens over the whole universe run vectorized
+"""
+
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # optional - /api/scan answers 501 without it
+    np = None
+
+HAVE_NUMPY = np is not None
+
+# column -> FMP /quote field
+FIELDS = {
+    'price': 'price',
+    'change': 'changesPercentage',
+    'change_amount': 'change',
+    'volume': 'volume',
+    'avg_volume': 'avgVolume',
+    'market_cap': 'marketCap',
+    'pe': 'pe',
+    'day_low': 'dayLow',
+    'day_high': 'dayHigh',
+    'year_low': 'yearLow',
+    'year_high': 'yearHigh',
+}
+# Derived columns, recomputed for the rows touched by each update
+DERIVED = ('day_range', 'relative_volume')
+COLUMNS = tuple(FIELDS) + DERIVED
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+class QuoteStore:
+    """Symbol-indexed float64 columns (NaN = unknown) plus an ``updated`` column.
+
+    Every symbol owns one row for the life of the process; updates overwrite
+    its row in place, so a scan is a handful of array comparisons over
+    ``len(store)`` rows with no per-quote Python work. Columns grow by
+    doubling. Readers work on copies taken under the lock.
+    """
+
+    def __init__(self, capacity=1024):
+        if np is None:
+            raise RuntimeError("QuoteStore requires numpy")
+        self._index = {}  # symbol -> row
+        self._symbols = np.empty(capacity, dtype=object)
+        self._columns = {name: np.full(capacity, np.nan) for name in COLUMNS}
+        self._updated = np.zeros(capacity)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.updates = 0
+        self.scans = 0
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self, needed):
+        capacity = len(self._updated)
+        while capacity < needed:
+            capacity *= 2
+        extra = capacity - len(self._updated)
+        self._symbols = np.concatenate([self._symbols, np.empty(extra, dtype=object)])
+        for name, column in self._columns.items():
+            self._columns[name] = np.concatenate([column, np.full(extra, np.nan)])
+        self._updated = np.concatenate([self._updated, np.zeros(extra)])
+
+    def update(self, records, updated_at=None):
+        """Upsert raw FMP /quote records keyed by symbol"""
+        if not records:
+            return 0
+        updated_at = time.time() if updated_at is None else updated_at
+        symbols = list(records)
+        values = {name: np.array([_number(records[s].get(field)) for s in symbols])
+                  for name, field in FIELDS.items()}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values['day_range'] = (values['day_high'] - values['day_low']) / values['price'] * 100
+            values['relative_volume'] = values['volume'] / values['avg_volume']
+
+        with self._lock:
+            new = [s for s in symbols if s not in self._index]
+            if new:
+                if self._size + len(new) > len(self._updated):
+                    self._grow(self._size + len(new))
+                for offset, symbol in enumerate(new):
+                    self._index[symbol] = self._size + offset
+                self._symbols[self._size:self._size + len(new)] = new
+                self._size += len(new)
+            rows = np.fromiter((self._index[s] for s in symbols), dtype=np.intp, count=len(symbols))
+            for name, column in self._columns.items():
+                column[rows] = values[name]
+            self._updated[rows] = updated_at
+            self.updates += 1
+        return len(symbols)
+
+    def missing(self, symbols, max_age):
+        """Symbols with no row, or a row older than ``max_age`` seconds"""
+        cutoff = time.time() - max_age
+        with self._lock:
+            return [s for s in symbols if s not in self._index or self._updated[self._index[s]] < cutoff]
+
+    def scan(self, filters=None, sort='change', descending=True, limit=50, symbols=None, max_age=None):
+        """Filter, sort and cut the store down to the top ``limit`` rows.
+
+        ``filters`` maps a column to ``(low, high)``; either bound may be
+        None. Rows with NaN in a filtered column never match, and NaN sorts
+        last either way. ``symbols`` restricts the scan to a universe and
+        ``max_age`` drops rows not refreshed within that many seconds.
+        ``limit=None`` returns every match. Returns ``(rows, matched, scanned)``.
+        """
+        if sort not in self._columns:
+            raise ValueError(f"Unknown sort column: {sort}")
+        if limit is not None and limit < 1:
+            raise ValueError(f"limit must be positive: {limit}")
+        for name in filters or {}:
+            if name not in self._columns:
+                raise ValueError(f"Unknown filter column: {name}")
+
+        with self._lock:
+            size = self._size
+            if symbols is None:
+                rows = np.arange(size)
+            else:
+                rows = np.fromiter((self._index[s] for s in dict.fromkeys(symbols) if s in self._index), dtype=np.intp)
+            needed = set(filters or ()) | {sort}
+            columns = {name: self._columns[name][rows] for name in needed}
+            updated = self._updated[rows]
+            self.scans += 1
+
+        mask = np.ones(len(rows), dtype=bool)
+        if max_age is not None:
+            mask &= updated >= time.time() - max_age
+        for name, (low, high) in (filters or {}).items():
+            column = columns[name]
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+        matched = np.flatnonzero(mask)
+
+        keys = columns[sort][matched]
+        keys = np.where(np.isnan(keys), np.inf, -keys if descending else keys)
+        if limit is not None and limit < len(matched):
+            top = np.argpartition(keys, limit - 1)[:limit]
+            order = top[np.argsort(keys[top], kind='stable')]
+        else:
+            order = np.argsort(keys, kind='stable')
+        picked = rows[matched[order]]
+
+        with self._lock:
+            result = [self._row(row) for row in picked]
+        return result, len(matched), len(rows)
+
+    def _row(self, row):
+        entry = {"ticker": self._symbols[row]}
+        for name, column in self._columns.items():
+            value = column[row]
+            entry[name] = None if np.isnan(value) else round(float(value), 4)
+        entry["updated"] = int(self._updated[row])
+        return entry
+
+    def stats(self):
+        with self._lock:
+            size = self._size
+            oldest = float(self._updated[:size].min()) if size else None
+        return {
+            "symbols": size,
+            "capacity": len(self._updated),
+            "updates": self.updates,
+            "scans": self.scans,
+            "oldest_row_age_seconds": round(time.time() - oldest, 1) if oldest else None
+        }
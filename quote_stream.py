@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Quote Streaming Hub
+One shared upstream poll loop fanning changed quotes out to streaming (SSE) subscribers
+"""
+
+import json
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+SSE_HEADERS = (
+    ('Access-Control-Allow-Origin', '*'),
+    ('Content-Type', 'text/event-stream'),
+    ('Cache-Control', 'no-cache'),
+    ('X-Accel-Buffering', 'no')
+)
+SSE_KEEPALIVE = b": keepalive\n\n"
+
+
+def sse_event(event, data, retry=None):
+    """Encode one Server-Sent Event with a compact JSON data line"""
+    prefix = f"retry: {retry}\n" if retry else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+def sse_quotes_event(pending):
+    """The 'quotes' event for a drained batch of pending updates"""
+    return sse_event("quotes", {"quotes": list(pending.values()), "time": int(time.time())})
+
+
+class StreamSubscriber:
+    """Per-client mailbox of pending quote updates.
+
+    Updates are coalesced per symbol (latest wins), so a slow consumer never
+    holds more than one pending quote per subscribed symbol and never slows
+    the poll loop down; it simply skips intermediate ticks.
+    """
+
+    def __init__(self, symbols):
+        self.symbols = frozenset(symbols)
+        self.closed = False
+        self.coalesced = 0
+        self.last_drain = time.monotonic()
+        self.on_update = None  # optional callback, invoked from the poll thread
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+
+    def offer(self, quotes):
+        """Queue the quotes this subscriber cares about"""
+        relevant = {symbol: quote for symbol, quote in quotes.items() if symbol in self.symbols}
+        if not relevant:
+            return
+        with self._lock:
+            self.coalesced += len(relevant.keys() & self._pending.keys())
+            self._pending.update(relevant)
+        self._event.set()
+        if self.on_update is not None:
+            self.on_update()
+
+    def drain(self, timeout=None):
+        """Wait up to ``timeout`` for updates and take everything pending"""
+        self._event.wait(timeout)
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._event.clear()
+            self.last_drain = time.monotonic()
+        return pending
+
+    def close(self):
+        self.closed = True
+        self._event.set()
+        if self.on_update is not None:
+            self.on_update()
+
+
+class QuoteStreamHub:
+    """Polls the union of all subscribed symbols and pushes only changed quotes.
+
+    ``fetch(symbols)`` must return ``{symbol: quote}``. A quote counts as
+    changed when its ``fingerprint`` differs from the last one pushed.
+    Subscribers that have not drained for ``max_lag`` seconds are closed.
+    """
+
+    def __init__(self, fetch, interval=2.0, max_subscribers=8, max_lag=30.0,
+                 fingerprint=lambda quote: (quote.get('price'), quote.get('volume'), quote.get('change'))):
+        self.fetch = fetch
+        self.interval = interval
+        self.max_subscribers = max_subscribers
+        self.max_lag = max_lag
+        self.fingerprint = fingerprint
+        self._subscribers = set()
+        self._latest = {}  # symbol -> last pushed quote
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.polls = 0
+        self.pushed = 0
+        self.evicted = 0
+
+    def subscribe(self, symbols):
+        """Register a subscriber, or return None when the hub is full"""
+        subscriber = StreamSubscriber(symbols)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscriber)
+            known = {symbol: self._latest[symbol] for symbol in subscriber.symbols if symbol in self._latest}
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="quote-stream", daemon=True)
+                self._thread.start()
+        if known:
+            subscriber.offer(known)  # initial snapshot of what we already have
+        self._wakeup.set()  # poll right away for symbols nobody watched before
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.close()
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def close_all(self):
+        """Close every subscriber (used on shutdown so streaming workers can exit)"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def poll_once(self):
+        """Fetch all subscribed symbols once and push the changed quotes"""
+        now = time.monotonic()
+        with self._lock:
+            laggards = [s for s in self._subscribers if now - s.last_drain > self.max_lag]
+            for subscriber in laggards:
+                self._subscribers.discard(subscriber)
+            subscribers = list(self._subscribers)
+        for subscriber in laggards:
+            self.evicted += 1
+            subscriber.close()
+
+        symbols = sorted(set().union(*(s.symbols for s in subscribers))) if subscribers else []
+        if not symbols:
+            return 0
+
+        quotes = self.fetch(symbols)
+        changed = {}
+        with self._lock:
+            for symbol, quote in quotes.items():
+                fingerprint = self.fingerprint(quote)
+                if self._fingerprints.get(symbol) != fingerprint:
+                    self._fingerprints[symbol] = fingerprint
+                    self._latest[symbol] = quote
+                    changed[symbol] = quote
+            # Subscribers that joined mid-poll saw no snapshot yet; give them everything known
+            polled = set(subscribers)
+            joined = [(s, {symbol: self._latest[symbol] for symbol in s.symbols if symbol in self._latest})
+                      for s in self._subscribers if s not in polled]
+        self.polls += 1
+        if changed:
+            self.pushed += len(changed)
+            for subscriber in subscribers:
+                subscriber.offer(changed)
+        for subscriber, known in joined:
+            subscriber.offer(known)
+        return len(changed)
+
+    def _run(self):
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.warning("⚠️ Stream poll failed: %s", e)
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def stats(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            "subscribers": len(subscribers),
+            "max_subscribers": self.max_subscribers,
+            "symbols": len(set().union(*(s.symbols for s in subscribers))) if subscribers else 0,
+            "interval_seconds": self.interval,
+            "polls": self.polls,
+            "quotes_pushed": self.pushed,
+            "coalesced": sum(s.coalesced for s in subscribers),
+            "evicted": self.evicted
+        }
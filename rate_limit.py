@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Upstream Governor
+Central scheduler every FMP call goes through: requests-per-minute budget, priority classes,
+coalescing of queued symbols into multi-symbol calls, 429-aware backoff and budgeted retries
+"""
+
+import collections
+import contextlib
+import contextvars
+import heapq
+import http.client
+import itertools
+import random
+import threading
+import time
+
+
+# Highest priority first
+PRIORITIES = ('interactive', 'batch', 'background')
+
+# Priority class of the calling request; copied into executor threads with contextvars.copy_context()
+current_priority = contextvars.ContextVar('upstream_priority', default='batch')
+
+# Upstream statuses worth another attempt (429 is handled apart: it pauses every caller)
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+
+def is_transient(error):
+    """5xx responses and connection failures - another attempt may well succeed"""
+    code = getattr(error, 'code', None)
+    if code is not None:
+        return code in RETRY_STATUSES
+    return isinstance(error, (OSError, http.client.HTTPException))
+
+
+@contextlib.contextmanager
+def upstream_priority(name):
+    """Run the block's upstream calls in priority class ``name``"""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown upstream priority: {name}")
+    token = current_priority.set(name)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class _Pending:
+    """One symbol waiting for (or riding on) a coalesced upstream call"""
+
+    __slots__ = ('rank', 'seq', 'queued', 'done', 'record', 'error', 'attempts', 'waiters')
+
+    def __init__(self, rank, seq):
+        self.rank = rank
+        self.seq = seq
+        self.waiters = 0  # fetch_symbols callers still wanting the record
+        self.queued = True
+        self.done = False
+        self.record = None
+        self.error = None
+        self.attempts = 0  # failed calls this symbol was in
+
+
+class UpstreamGovernor:
+    """Shared upstream budget of ``rpm`` calls per minute, bursts up to ``burst``.
+
+    Callers waiting for budget are served strictly by priority class
+    (``PRIORITIES``), then in arrival order, so a single-quote lookup never
+    queues behind a prefetch cycle. A call that fails with HTTP 429 pauses
+    every caller for the Retry-After period (exponential backoff from
+    ``backoff_base`` up to ``backoff_max`` without one) and is retried up to
+    ``retries`` times. 5xx responses and connection failures are retried
+    as often after a full-jitter pause from ``retry_backoff``; every
+    attempt takes its own budget, so retries count against the quota.
+    ``daily_limit`` (0 = none) caps calls per UTC day.
+
+    ``fetch_symbols`` queues symbols instead of calling right away: whoever
+    gets the next slot fetches its own symbols plus anything else queued
+    for the same endpoint, up to ``max_coalesce`` per call. An ``rpm`` of
+    zero or less disables the budget (backoff still applies).
+    """
+
+    def __init__(self, rpm, burst=None, max_coalesce=50, retries=2,
+                 backoff_base=1.0, backoff_max=60.0, retry_backoff=0.2, daily_limit=0):
+        self.rpm = float(rpm)
+        self.rate = self.rpm / 60.0
+        self.capacity = float(burst if burst is not None else max(1.0, self.rate))
+        self.max_coalesce = max(1, max_coalesce)
+        self.retries = max(0, retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_backoff = retry_backoff
+        self.daily_limit = daily_limit
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters = []  # heap of [rank, seq]
+        self._seq = itertools.count()
+        self._pending = {}  # endpoint -> {symbol: _Pending}
+        self._paused_until = 0.0
+        self._backoff_streak = 0
+        self._recent = collections.deque()  # grant times within the last minute
+        self._day = None
+        self._day_calls = 0
+        self.calls = 0
+        self.throttles = 0
+        self.retried = 0  # calls repeated after a 5xx or connection failure
+        self.timeouts = 0
+        self.coalesced_calls = 0
+        self.coalesced_symbols = 0  # symbols that rode on another caller's call
+        self.joined_symbols = 0  # symbols already queued or in flight when requested
+        self._granted = dict.fromkeys(PRIORITIES, 0)
+        self._waited = dict.fromkeys(PRIORITIES, 0.0)
+
+    # -- budget -----------------------------------------------------------
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def _day_exhausted(self):
+        day = time.strftime('%Y-%m-%d', time.gmtime())
+        if day != self._day:
+            self._day, self._day_calls = day, 0
+        return self.daily_limit > 0 and self._day_calls >= self.daily_limit
+
+    def acquire(self, priority=None, timeout=None, give_up=None):
+        """Wait for one call's worth of budget in ``priority`` order.
+
+        Returns False if ``timeout`` expires or ``give_up()`` becomes true
+        first (checked whenever the governor state changes).
+        """
+        priority = priority or current_priority.get()
+        rank = PRIORITIES.index(priority)
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        with self._cond:
+            entry = [rank, next(self._seq)]
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    if give_up is not None and give_up():
+                        return False
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = None
+                    if self._waiters[0] is entry:
+                        if now < self._paused_until:
+                            wait = self._paused_until - now
+                        elif self._day_exhausted():
+                            wait = 60.0
+                        elif self.rate <= 0 or self._tokens >= 1:
+                            if self.rate > 0:
+                                self._tokens -= 1
+                            self._record_grant(priority, now, now - started)
+                            return True
+                        else:
+                            wait = (1 - self._tokens) / self.rate
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def _record_grant(self, priority, now, waited):
+        self.calls += 1
+        self._day_calls += 1
+        self._granted[priority] += 1
+        self._waited[priority] += waited
+        self._recent.append(now)
+        while self._recent and self._recent[0] <= now - 60:
+            self._recent.popleft()
+
+    def _refund(self):
+        """Hand back a slot that was granted but not used"""
+        with self._cond:
+            self.calls -= 1
+            self._day_calls -= 1
+            if self.rate > 0:
+                self._tokens = min(self.capacity, self._tokens + 1)
+            if self._recent:
+                self._recent.pop()
+            self._cond.notify_all()
+
+    def _throttled(self, error):
+        """Pause everyone after a 429; returns False for any other error"""
+        if getattr(error, 'code', None) != 429:
+            return False
+        headers = getattr(error, 'headers', None)
+        header = headers.get('Retry-After') if headers is not None else None
+        with self._cond:
+            self.throttles += 1
+            self._backoff_streak += 1
+            if header and header.strip().isdigit():
+                delay = min(float(header), self.backoff_max)
+            else:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (self._backoff_streak - 1))
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._tokens = 0.0  # no burst straight after the pause
+            self._cond.notify_all()
+        return True
+
+    def _retry_pause(self, attempt):
+        """Full-jitter backoff before retrying a 5xx or connection failure"""
+        with self._cond:
+            self.retried += 1
+        time.sleep(random.uniform(0, self.retry_backoff * 2 ** attempt))
+
+    def _succeeded(self):
+        if self._backoff_streak:
+            with self._cond:
+                self._backoff_streak = 0
+
+    def call(self, fetch, priority=None, timeout=None):
+        """Run ``fetch()`` once budget allows, retrying it after 429 backoff and transient failures.
+
+        Raises TimeoutError when no budget became available within ``timeout``.
+        """
+        attempt = 0
+        while True:
+            if not self.acquire(priority, timeout):
+                raise TimeoutError("Upstream request budget exhausted")
+            try:
+                result = fetch()
+            except Exception as e:
+                if self._throttled(e) and attempt < self.retries:
+                    attempt += 1
+                    continue
+                if is_transient(e) and attempt < self.retries:
+                    self._retry_pause(attempt)
+                    attempt += 1
+                    continue
+                raise
+            self._succeeded()
+            return result
+
+    # -- coalescing -------------------------------------------------------
+
+    def fetch_symbols(self, endpoint, symbols, fetch, priority=None, timeout=None):
+        """Records for ``symbols`` via ``fetch(batch) -> {symbol: record}`` calls.
+
+        Symbols are queued per ``endpoint`` and fetched in coalesced
+        multi-symbol calls, possibly together with (or by) other callers.
+        Raises the upstream error if a call covering one of ``symbols``
+        failed, or TimeoutError when no budget became available in time
+        (symbols nobody else is waiting for then leave the queue).
+        """
+        rank = PRIORITIES.index(priority or current_priority.get())
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            pending = self._pending.setdefault(endpoint, {})
+            mine = {}
+            for symbol in dict.fromkeys(symbols):
+                entry = pending.get(symbol)
+                if entry is None:
+                    entry = pending[symbol] = _Pending(rank, next(self._seq))
+                else:
+                    self.joined_symbols += 1
+                    entry.rank = min(entry.rank, rank)
+                entry.waiters += 1
+                mine[symbol] = entry
+        try:
+            return self._await_symbols(endpoint, mine, fetch, priority, deadline)
+        finally:
+            self._release(endpoint, mine)
+
+    def _await_symbols(self, endpoint, mine, fetch, priority, deadline):
+        pending = self._pending[endpoint]
+
+        def nothing_queued():
+            return not any(entry.queued for entry in mine.values())
+
+        while True:
+            with self._cond:
+                while nothing_queued() and not all(entry.done for entry in mine.values()):
+                    # Everything of ours is in someone else's call
+                    self._cond.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise TimeoutError("Timed out waiting for a coalesced upstream call")
+                if all(entry.done for entry in mine.values()):
+                    break
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self.acquire(priority, remaining, give_up=nothing_queued):
+                if nothing_queued():
+                    continue
+                raise TimeoutError("Upstream request budget exhausted")
+
+            with self._cond:
+                batch = [symbol for symbol, entry in mine.items() if entry.queued][:self.max_coalesce]
+                if len(batch) < self.max_coalesce:
+                    others = sorted((entry.rank, entry.seq, symbol) for symbol, entry in pending.items()
+                                    if entry.queued and symbol not in mine)
+                    extra = [symbol for _, _, symbol in others[:self.max_coalesce - len(batch)]]
+                    self.coalesced_symbols += len(extra)
+                    batch += extra
+                for symbol in batch:
+                    pending[symbol].queued = False
+                if len(batch) > 1:
+                    self.coalesced_calls += 1
+            if not batch:
+                self._refund()
+                continue
+            self._run_batch(endpoint, batch, fetch)
+
+        errors = [entry.error for entry in mine.values() if entry.error is not None]
+        if errors:
+            raise errors[0]
+        return {symbol: entry.record for symbol, entry in mine.items() if entry.record is not None}
+
+    def _release(self, endpoint, mine):
+        """Drop a caller's claim; symbols still queued for nobody else are withdrawn"""
+        with self._cond:
+            pending = self._pending[endpoint]
+            for symbol, entry in mine.items():
+                entry.waiters -= 1
+                if entry.queued and entry.waiters == 0 and pending.get(symbol) is entry:
+                    del pending[symbol]
+
+    def _run_batch(self, endpoint, batch, fetch):
+        error = None
+        records = {}
+        try:
+            records = fetch(batch) or {}
+        except Exception as e:
+            error = e
+        retry = False
+        if error is None:
+            self._succeeded()
+        elif self._throttled(error):
+            retry = True
+        elif is_transient(error):
+            with self._cond:
+                attempt = min(self._pending[endpoint][symbol].attempts for symbol in batch)
+            retry = attempt < self.retries
+            if retry:
+                self._retry_pause(attempt)
+        with self._cond:
+            pending = self._pending[endpoint]
+            for symbol in batch:
+                entry = pending[symbol]
+                if retry and entry.attempts < self.retries and entry.waiters:
+                    entry.attempts += 1
+                    entry.queued = True  # back in the queue: the next call takes budget again
+                    continue
+                entry.done = True
+                entry.record = records.get(symbol)
+                entry.error = error
+                del pending[symbol]
+            self._cond.notify_all()
+
+    # -- reporting --------------------------------------------------------
+
+    def stats(self):
+        """Quota usage, backoff state and per-priority counters"""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            while self._recent and self._recent[0] <= now - 60:
+                self._recent.popleft()
+            self._day_exhausted()
+            waiting = collections.Counter(PRIORITIES[rank] for rank, _ in self._waiters)
+            priorities = {
+                name: {
+                    "calls": self._granted[name],
+                    "waiting": waiting[name],
+                    "avg_wait_ms": round(self._waited[name] / self._granted[name] * 1000, 2)
+                    if self._granted[name] else 0.0
+                }
+                for name in PRIORITIES
+            }
+            return {
+                "rpm_limit": self.rpm,
+                "calls_last_minute": len(self._recent),
+                "remaining_this_minute": max(0, int(self.rpm) - len(self._recent)) if self.rpm > 0 else None,
+                "available": round(self._tokens, 2) if self.rate > 0 else None,
+                "daily_limit": self.daily_limit,
+                "calls_today": self._day_calls,
+                "calls": self.calls,
+                "queued_symbols": sum(1 for pending in self._pending.values()
+                                      for entry in pending.values() if entry.queued),
+                "coalesced_calls": self.coalesced_calls,
+                "coalesced_symbols": self.coalesced_symbols,
+                "joined_symbols": self.joined_symbols,
+                "throttles": self.throttles,
+                "retried": self.retried,
+                "paused_seconds": round(max(0.0, self._paused_until - now), 2),
+                "timeouts": self.timeouts,
+                "priorities": priorities
+            }
@@ -4,48 +4,315 @@ Scanner Pro AI - HTTP Server
 Serves the advanced trading platform with live data capabilities
 """
 
+import collections
+import email.utils
+import gzip
+import hashlib
 import http.server
-import socketserver
+import mimetypes
 import os
+import shutil
+import socketserver
 import sys
-import mimetypes
-from pathlib import Path
+import threading
+import urllib.parse
+
+from serialization import COMPRESS_MIN_BYTES, etag_matches, negotiate_encoding
+
+try:
+    import brotli
+    HAVE_BROTLI = True
+except ImportError:  # brotli is optional: gzip-only precompression without it
+    brotli = None
+    HAVE_BROTLI = False
+
+SCANNER_PORT = int(os.environ.get('SCANNER_PORT', '8000'))
+SCANNER_ROOT = os.environ.get('SCANNER_ROOT', '/home/user/webapp')
+SCANNER_SERVER_MODE = os.environ.get('SCANNER_SERVER_MODE', 'threaded')  # 'threaded' or 'single'
+SCANNER_CACHE_MAX_FILE = int(os.environ.get('SCANNER_CACHE_MAX_FILE', str(2 * 1024 * 1024)))  # larger: sendfile
+SCANNER_CACHE_MAX_BYTES = int(os.environ.get('SCANNER_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+SCANNER_ASSET_MAX_AGE = int(os.environ.get('SCANNER_ASSET_MAX_AGE', '3600'))  # non-HTML Cache-Control max-age
+SCANNER_ACCESS_LOG = os.environ.get('SCANNER_ACCESS_LOG', '1') == '1'
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/xml', 'image/svg+xml')
+
+
+def cache_control_for(content_type):
+    """HTML always revalidates (a 304 is cheap); other assets are cached for a while"""
+    if content_type.startswith('text/html'):
+        return 'no-cache'
+    return f'public, max-age={SCANNER_ASSET_MAX_AGE}'
+
+
+class _Asset:
+    """One file held in memory with its precompressed variants"""
+
+    __slots__ = ('mtime_ns', 'size', 'content_type', 'last_modified', 'cache_control', 'variants', 'etags', 'nbytes')
+
+    def __init__(self, stat, content_type, body):
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.content_type = content_type
+        self.last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        self.cache_control = cache_control_for(content_type)
+        self.variants = {None: body}
+        if len(body) >= COMPRESS_MIN_BYTES and content_type.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                self.variants['gzip'] = compressed
+            if HAVE_BROTLI:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    self.variants['br'] = compressed
+        # Strong ETag per representation, same scheme as the proxy's JSON responses
+        digest = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.etags = {encoding: f'"{digest}-{encoding}"' if encoding else f'"{digest}"' for encoding in self.variants}
+        self.nbytes = sum(len(variant) for variant in self.variants.values())
+
+
+class StaticAssetCache:
+    """In-memory copies of static files, invalidated when a file's mtime or size changes.
+
+    Every lookup stats the file; a changed file is re-read and its gzip
+    (and, with the optional ``brotli`` package, brotli) variants are
+    compressed once at load, never per request. Files over
+    ``max_file_bytes`` are not cached (``get`` returns None and the caller
+    streams them with sendfile); the least recently used files are evicted
+    beyond ``max_total_bytes``.
+    """
+
+    def __init__(self, max_file_bytes=SCANNER_CACHE_MAX_FILE, max_total_bytes=SCANNER_CACHE_MAX_BYTES):
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self._assets = collections.OrderedDict()  # path -> _Asset, least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.uncached = 0
+
+    def get(self, path, stat):
+        """Cached asset for ``path`` (``stat`` from the caller's os.stat), or None if too large"""
+        if stat.st_size > self.max_file_bytes:
+            self.uncached += 1
+            return None
+        with self._lock:
+            asset = self._assets.get(path)
+            if asset is not None and asset.mtime_ns == stat.st_mtime_ns and asset.size == stat.st_size:
+                self._assets.move_to_end(path)
+                self.hits += 1
+                return asset
+
+        with open(path, 'rb') as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type == 'application/javascript':
+            content_type += '; charset=utf-8'
+        asset = _Asset(stat, content_type, body)
+        with self._lock:
+            previous = self._assets.pop(path, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._assets[path] = asset
+            self._bytes += asset.nbytes
+            self.loads += 1
+            while self._bytes > self.max_total_bytes and len(self._assets) > 1:
+                _, evicted = self._assets.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+        return asset
+
+    def stats(self):
+        with self._lock:
+            return {
+                "files": len(self._assets),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "uncached_requests": self.uncached,
+                "brotli": HAVE_BROTLI
+            }
+
+
+class StaticFilesMixin:
+    """Cached, precompressed, conditional static file responses for a request handler.
+
+    Needs ``static_root`` and ``asset_cache`` (a StaticAssetCache) on the
+    handler class. ``serve_static`` returns False for paths it leaves to
+    the caller: directories without an index.html (or without their
+    trailing slash) and missing files.
+    """
+
+    static_root = SCANNER_ROOT
+    asset_cache = None
+
+    def _static_file(self):
+        url_path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        parts = [part for part in url_path.split('/') if part and part not in ('.', '..')]
+        if any(part.startswith('.') for part in parts):
+            return False  # dotfiles (.git, .env) are never served
+        path = os.path.join(self.static_root, *parts)
+        if os.path.isdir(path):
+            if not url_path.endswith('/'):
+                return None
+            path = os.path.join(path, 'index.html')
+        return path if os.path.isfile(path) else None
+
+    def _not_modified(self, etag, mtime):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            return etag_matches(if_none_match, {etag})
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return int(mtime) <= email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError):
+                return False
+        return False
+
+    def serve_static(self, head_only=False):
+        """Answer the request from ``static_root``; returns False when nothing was sent"""
+        path = self._static_file()
+        if path is False:
+            self.send_error(404, "File not found")
+            return True
+        if path is None:
+            return False
+        try:
+            stat = os.stat(path)
+            asset = self.asset_cache.get(path, stat)
+        except OSError:
+            return False
+        if asset is None:
+            self._send_uncached(path, stat, head_only)
+            return True
+
+        encoding = negotiate_encoding(self.headers.get('Accept-Encoding'), tuple(e for e in ('br', 'gzip')
+                                                                              if e in asset.variants))
+        etag = asset.etags[encoding]
+        if self._not_modified(etag, stat.st_mtime):
+            self.send_response(304)
+            self._send_validators(etag, asset.last_modified, asset.cache_control, len(asset.variants) > 1)
+            self.end_headers()
+            return True
+
+        body = asset.variants[encoding]
+        self.send_response(200)
+        self.send_header('Content-Type', asset.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self._send_validators(etag, asset.last_modified, asset.cache_control, len(asset.variants) > 1)
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+        return True
+
+    def _send_validators(self, etag, last_modified, cache_control, varies):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('Cache-Control', cache_control)
+        if varies:
+            self.send_header('Vary', 'Accept-Encoding')
+
+    def _send_uncached(self, path, stat, head_only):
+        """Large files: validators from size/mtime, body copied kernel-side with sendfile.
+
+        Handlers without a socket (``connection`` is None, as under the
+        asyncio gateway) get the body copied into ``wfile`` instead.
+        """
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if self._not_modified(etag, stat.st_mtime):
+            self.send_response(304)
+            self._send_validators(etag, last_modified, cache_control_for(content_type), False)
+            self.end_headers()
+            return
+        with open(path, 'rb') as f:
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(stat.st_size))
+            self._send_validators(etag, last_modified, cache_control_for(content_type), False)
+            self.end_headers()
+            if head_only:
+                return
+            if self.connection is None:
+                shutil.copyfileobj(f, self.wfile)
+                return
+            self.wfile.flush()
+            self.connection.sendfile(f, count=stat.st_size)
+
+
+class ScannerHandler(StaticFilesMixin, http.server.SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive: every response carries a Content-Length
+    disable_nagle_algorithm = True  # headers and body are separate writes; don't let them wait on delayed ACKs
+    asset_cache = StaticAssetCache()
 
-class ScannerHandler(http.server.SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory="/home/user/webapp", **kwargs)
-    
+        super().__init__(*args, directory=SCANNER_ROOT, **kwargs)
+
     def end_headers(self):
         # Add CORS headers for API access
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         super().end_headers()
-    
+
+    def do_GET(self):
+        """Files from the asset cache; redirects and directory listings as before"""
+        if not self.serve_static():
+            super().do_GET()
+
+    def do_HEAD(self):
+        if not self.serve_static(head_only=True):
+            super().do_HEAD()
+
     def do_OPTIONS(self):
         self.send_response(200)
+        self.send_header('Content-Length', '0')
         self.end_headers()
-    
+
     def log_message(self, format, *args):
         """Enhanced logging for the scanner"""
+        if not SCANNER_ACCESS_LOG:
+            return
         timestamp = self.log_date_time_string()
         message = f"[{timestamp}] {format % args}"
         print(message)
         sys.stdout.flush()
 
+class ThreadedScannerServer(http.server.ThreadingHTTPServer):
+    """One thread per connection, so a slow client never blocks the others"""
+
+    request_queue_size = 128  # listen backlog; socketserver's 5 drops SYNs on bursts
+
 def main():
-    PORT = 8000
-    
+    PORT = SCANNER_PORT
+
     print("🚀 Scanner Pro AI - Starting HTTP Server...")
     print(f"📡 Server: http://0.0.0.0:{PORT}")
-    print(f"📁 Directory: /home/user/webapp")
+    print(f"📁 Directory: {SCANNER_ROOT}")
+    print(f"🧵 Serving mode: {SCANNER_SERVER_MODE}")
+    print(f"🗜️  Static assets: cached in memory, gzip{' + brotli' if HAVE_BROTLI else ''} precompressed")
     print(f"🔍 Mass Scanner: Ready for 4,500+ stocks")
     print(f"🧠 AI Analysis: Natural language queries supported")
     print(f"📊 Live Data: Polygon API integration ready")
     print("=" * 60)
-    
+
+    if SCANNER_SERVER_MODE == 'threaded':
+        server_class = ThreadedScannerServer
+    elif SCANNER_SERVER_MODE == 'single':
+        server_class = socketserver.TCPServer
+        ScannerHandler.protocol_version = 'HTTP/1.0'  # one connection at a time: no keep-alive
+    else:
+        print(f"❌ Unknown SCANNER_SERVER_MODE {SCANNER_SERVER_MODE!r} (expected 'threaded' or 'single')")
+        sys.exit(1)
+
     try:
-        with socketserver.TCPServer(("0.0.0.0", PORT), ScannerHandler) as httpd:
+        with server_class(("0.0.0.0", PORT), ScannerHandler) as httpd:
             print(f"✅ Scanner Pro AI serving at port {PORT}")
             sys.stdout.flush()
             httpd.serve_forever()
@@ -56,4 +323,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Response Serialization
+Compact/columnar JSON encoding, gzip/deflate negotiation and ETag revalidation for proxy responses
+"""
+
+import gzip
+import hashlib
+import json
+import zlib
+
+# Bodies smaller than this are sent uncompressed - not worth the CPU
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_LEVEL = 5
+
+
+def to_columnar(data, key='quotes'):
+    """Turn ``data[key]`` (a list of dicts) into one array per field.
+
+    ``{"quotes": [{"ticker": "A", "price": 1}, ...]}`` becomes
+    ``{"quotes": {"ticker": ["A", ...], "price": [1, ...]}, "fields": [...], "format": "columnar"}``.
+    Fields missing from a row are filled with ``None``.
+    """
+    rows = data.get(key)
+    if not isinstance(rows, list):
+        return data
+    fields = list(dict.fromkeys(field for row in rows for field in row))
+    columnar = dict(data)
+    columnar[key] = {field: [row.get(field) for row in rows] for field in fields}
+    columnar["fields"] = fields
+    columnar["format"] = "columnar"
+    return columnar
+
+
+def encode_json(data, pretty=False):
+    """Serialize to UTF-8 JSON bytes - compact unless ``pretty``"""
+    if pretty:
+        return json.dumps(data, indent=2).encode()
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+def negotiate_encoding(accept_encoding, available=('gzip', 'deflate')):
+    """Pick the first of ``available`` the Accept-Encoding header allows, or None"""
+    if not accept_encoding:
+        return None
+    offered = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip().lower()] = quality
+    for name in available:
+        if offered.get(name, offered.get('*', 0.0)) > 0:
+            return name
+    return None
+
+
+def etag_matches(if_none_match, etags):
+    """True when an If-None-Match header matches one of ``etags`` (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return bool(candidates & etags)
+
+
+def build_json_response(data, request_headers=None, status=200, pretty=False, conditional=True):
+    """Encode ``data`` for the wire.
+
+    Returns ``(status, headers, body)``. When ``conditional`` and the
+    request's If-None-Match matches the body's ETag the status becomes 304
+    with an empty body. Each content-coding gets its own strong ETag.
+    """
+    request_headers = request_headers or {}
+    body = encode_json(data, pretty)
+    digest = hashlib.blake2b(body, digest_size=12).hexdigest()
+    encoding = negotiate_encoding(request_headers.get('Accept-Encoding')) if len(body) >= COMPRESS_MIN_BYTES else None
+    etag = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+    headers = [
+        ('Content-Type', 'application/json'),
+        ('Cache-Control', 'no-cache'),
+        ('Vary', 'Accept-Encoding'),
+        ('ETag', etag)
+    ]
+
+    if conditional and status == 200 and etag_matches(request_headers.get('If-None-Match'),
+                                                        {etag, f'"{digest}"'}):
+        return 304, headers, b''
+
+    if encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
+    elif encoding == 'deflate':
+        body = zlib.compress(body, COMPRESS_LEVEL)
+    if encoding:
+        headers.append(('Content-Encoding', encoding))
+    headers.append(('Content-Length', str(len(body))))
+    return status, headers, body
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Persistent Quote Snapshots
+Append-only on-disk log of the latest quote per symbol so a restarted proxy starts warm
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    """Latest raw quote per symbol, persisted as an append-only JSON-lines log.
+
+    Each line is ``{"q": {symbol: [fetched_at, record], ...}}``; later lines
+    win. ``record`` only stages updates in memory (latest per symbol), a
+    writer thread appends them as one line every ``flush_interval`` seconds,
+    so request threads never touch the disk. When the log holds more than
+    ``compact_ratio`` entries per live symbol it is rewritten (temp file +
+    atomic rename) with one entry per symbol. A torn last line from a crash
+    is truncated away on load.
+    """
+
+    def __init__(self, path, flush_interval=1.0, compact_ratio=4):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.compact_ratio = compact_ratio
+        self._latest = {}  # symbol -> [fetched_at, record]
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._logged_entries = 0
+        self.load_seconds = None
+        self.skipped_lines = 0
+        self.flushes = 0
+        self.compactions = 0
+        self.last_error = None
+
+    def load(self, repair=True):
+        """Read the log; returns ``{symbol: (fetched_at, record)}``.
+
+        ``repair=False`` leaves a torn last line in place, for readers that
+        share the file with another process still appending to it.
+        """
+        started = time.perf_counter()
+        latest = {}
+        entries = 0
+        try:
+            with open(self.path, 'rb+' if repair else 'rb') as f:
+                good_end = 0
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # Torn write from a crash: cut it off so the next append starts on a clean line
+                        self.skipped_lines += 1
+                        if repair:
+                            f.truncate(good_end)
+                        break
+                    good_end += len(line)
+                    try:
+                        batch = json.loads(line)["q"]
+                    except (ValueError, KeyError, TypeError):
+                        self.skipped_lines += 1
+                        continue
+                    latest.update(batch)
+                    entries += len(batch)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.last_error = str(e)
+            logger.warning("⚠️ Snapshot log %s not loaded: %s", self.path, e)
+        with self._lock:
+            self._latest = latest
+            self._logged_entries = entries
+        self.load_seconds = time.perf_counter() - started
+        return {symbol: (entry[0], entry[1]) for symbol, entry in latest.items()}
+
+    def record(self, records, fetched_at=None):
+        """Stage raw quote records keyed by symbol for the next flush"""
+        fetched_at = round(time.time() if fetched_at is None else fetched_at, 3)
+        with self._lock:
+            for symbol, quote in records.items():
+                if quote:
+                    self._pending[symbol] = [fetched_at, quote]
+
+    def flush(self):
+        """Append everything staged since the last flush; compact when the log has grown"""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._latest.update(pending)
+            if not pending:
+                return 0
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({"q": pending}, separators=(',', ':')) + '\n')
+                self._logged_entries += len(pending)
+                self.flushes += 1
+                if self._logged_entries > self.compact_ratio * max(1, len(self._latest)):
+                    self._compact()
+            except OSError as e:
+                self.last_error = str(e)
+                logger.warning("⚠️ Snapshot flush failed: %s", e)
+            return len(pending)
+
+    def _compact(self):
+        with self._lock:
+            latest = dict(self._latest)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"q": latest}, separators=(',', ':')) + '\n')
+        os.replace(tmp_path, self.path)
+        self._logged_entries = len(latest)
+        self.compactions += 1
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def start(self):
+        """Start the background writer thread"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        """Stop the writer and flush what is still staged"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.flush_interval + 1)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            symbols = len(self._latest)
+            pending = len(self._pending)
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        return {
+            "symbols": symbols,
+            "pending": pending,
+            "log_entries": self._logged_entries,
+            "file_bytes": size,
+            "flushes": self.flushes,
+            "compactions": self.compactions,
+            "load_ms": round(self.load_seconds * 1000, 2) if self.load_seconds is not None else None,
+            "skipped_lines": self.skipped_lines,
+            "last_error": self.last_error
+        }
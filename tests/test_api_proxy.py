@@ -0,0 +1,250 @@
+import http.client
+import http.server
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import api_proxy
+from api_proxy import APIProxyHandler
+from history_store import HistoryStore
+from indicators import IndicatorEngine
+from providers import FMPProvider
+from quote_cache import QuoteCache
+from rate_limit import UpstreamGovernor
+
+
+class StubProvider:
+    name = 'stub'
+    title = 'Stub'
+
+    def __init__(self):
+        self.calls = []
+
+    def quotes(self, symbols, timeout=10):
+        self.calls.append(list(symbols))
+        return {symbol: {"symbol": symbol, "price": 100.0, "volume": 1000} for symbol in symbols}
+
+    def history(self, symbol, interval, from_date, to_date, timeout=15):
+        return [{"date": from_date, "open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 10}]
+
+
+@pytest.fixture
+def proxy(monkeypatch):
+    """APIProxyHandler wired to a stub provider, fresh caches and its own executors"""
+    provider = StubProvider()
+    monkeypatch.setattr(APIProxyHandler, 'provider', provider)
+    monkeypatch.setattr(APIProxyHandler, 'quote_cache', QuoteCache(ttl=60))
+    monkeypatch.setattr(APIProxyHandler, 'governor', UpstreamGovernor(0))
+    monkeypatch.setattr(APIProxyHandler, 'quote_store', None)
+    monkeypatch.setattr(APIProxyHandler, 'indicators', IndicatorEngine())
+    monkeypatch.setattr(APIProxyHandler, 'snapshot_store', None)
+    batch_executor = ThreadPoolExecutor(max_workers=4)
+    prefetch_executor = ThreadPoolExecutor(max_workers=2)
+    history_executor = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(APIProxyHandler, 'batch_executor', batch_executor)
+    monkeypatch.setattr(APIProxyHandler, 'prefetch_executor', prefetch_executor)
+    monkeypatch.setattr(APIProxyHandler, 'history_executor', history_executor)
+    yield APIProxyHandler
+    for executor in (batch_executor, prefetch_executor, history_executor):
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+@pytest.fixture
+def serve(proxy):
+    """Run a worker pool server for ``proxy`` on an ephemeral port; returns ``get(path) -> (status, body)``"""
+    servers = []
+
+    def start(workers=2, queue_depth=4):
+        server = api_proxy.WorkerPoolHTTPServer(('127.0.0.1', 0), proxy, workers=workers,
+                                                queue_depth=queue_depth, drain_timeout=1)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    def get(path, server=None):
+        if server is None:
+            server = servers[-1] if servers else start()
+        connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            body = response.read()
+            return response.status, json.loads(body) if body else None
+        finally:
+            connection.close()
+
+    get.start = start
+    yield get
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class BlockingHandler(http.server.BaseHTTPRequestHandler):
+    release = threading.Event()
+
+    def do_GET(self):
+        self.release.wait(5)
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_saturated_worker_pool_answers_503():
+    BlockingHandler.release.clear()
+    server = api_proxy.WorkerPoolHTTPServer(('127.0.0.1', 0), BlockingHandler, workers=1, queue_depth=1,
+                                            drain_timeout=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    connections = []
+    try:
+        for _ in range(3):  # one on the worker, one queued, one over the limit
+            connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+            connection.request('GET', '/')
+            connections.append(connection)
+            time.sleep(0.1)
+        rejected = connections[2].getresponse()
+        assert rejected.status == 503 and rejected.getheader('Retry-After') == '1'
+        assert json.loads(rejected.read())["code"] == 503
+        assert server.stats()["rejected"] == 1
+
+        BlockingHandler.release.set()
+        assert [connection.getresponse().status for connection in connections[:2]] == [200, 200]
+    finally:
+        BlockingHandler.release.set()
+        for connection in connections:
+            connection.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_batch_request_completes_while_prefetch_saturates_budget(proxy, monkeypatch):
+    # 10 calls/second, 2 symbols per call: the prefetch cycle alone needs ~10s of budget
+    governor = UpstreamGovernor(600, burst=1, max_coalesce=2)
+    monkeypatch.setattr(proxy, 'governor', governor)
+    universe = [f"P{i:03d}" for i in range(200)]
+    prefetch = threading.Thread(target=proxy._prefetch_quotes, args=(universe,), daemon=True)
+    prefetch.start()
+    time.sleep(0.3)  # prefetch batches now hold their executor threads waiting for budget
+
+    try:
+        started = time.monotonic()
+        records, failed = proxy._fetch_quote_batches(['AAPL', 'MSFT'], batch_size=2)
+        elapsed = time.monotonic() - started
+    finally:
+        with governor._cond:  # let the rest of the prefetch cycle drain
+            governor.rate = 0
+            governor._cond.notify_all()
+        prefetch.join(10)
+
+    assert set(records) == {'AAPL', 'MSFT'} and not failed
+    assert elapsed < 2.0
+    assert governor.stats()["priorities"]["background"]["calls"] > 0
+
+
+def test_batch_request_completes_while_cold_history_waits_for_budget(proxy, serve, monkeypatch, tmp_path):
+    # 10 calls/second: 24 cold history reads need ~2.4s of budget
+    governor = UpstreamGovernor(600, burst=1)
+    monkeypatch.setattr(proxy, 'governor', governor)
+    monkeypatch.setattr(proxy, 'history_store', HistoryStore(str(tmp_path), proxy._fetch_history_bars))
+    symbols = ','.join(f"H{i:03d}" for i in range(24))
+    history = threading.Thread(target=serve, args=(f'/api/fmp/history?symbols={symbols}&from=2024-01-02&to=2024-01-02',))
+    history.start()
+    time.sleep(0.3)  # history reads now hold their executor threads waiting for budget
+
+    started = time.monotonic()
+    records, failed = proxy._fetch_quote_batches(['AAPL', 'MSFT'], batch_size=2)
+    elapsed = time.monotonic() - started
+    history.join(10)
+
+    assert set(records) == {'AAPL', 'MSFT'} and not failed
+    assert elapsed < 1.2
+
+
+@pytest.mark.parametrize('path', ['/api/fmp/quote/AAPL', '/api/fmp/batch-quotes?tickers=AAPL,MSFT'])
+def test_quotes_with_missing_price_and_change_are_logged(proxy, serve, monkeypatch, caplog, path):
+    # Polygon snapshots can lack fields; normalize_quote passes the None through
+    monkeypatch.setattr(proxy.provider, 'quotes', lambda symbols, timeout=10: {
+        symbol: {"symbol": symbol, "price": None, "changesPercentage": None} for symbol in symbols})
+    caplog.set_level(logging.INFO, logger='api_proxy')
+    status, body = serve(path)
+    assert status == 200 and body["status"] == "success"
+    assert "AAPL" in caplog.text and "$None (None%)" in caplog.text
+
+
+class UnavailableHandler(http.server.BaseHTTPRequestHandler):
+    """Upstream that always answers 503 over keep-alive connections"""
+    protocol_version = 'HTTP/1.1'
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        self.send_response(503)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_every_upstream_attempt_takes_governor_budget(proxy, monkeypatch):
+    UnavailableHandler.requests = 0
+    upstream = http.server.ThreadingHTTPServer(('127.0.0.1', 0), UnavailableHandler)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    governor = UpstreamGovernor(0, retries=2, retry_backoff=0)
+    monkeypatch.setattr(proxy, 'governor', governor)
+    monkeypatch.setattr(proxy, 'provider', FMPProvider(f"http://127.0.0.1:{upstream.server_address[1]}", 'key',
+                                                       proxy._get_json))
+    try:
+        for symbol in ('AAPL', 'MSFT', 'NVDA'):
+            with pytest.raises(Exception) as raised:
+                proxy._fetch_quote_records([symbol])
+            assert raised.value.code == 503
+    finally:
+        upstream.shutdown()
+        upstream.server_close()
+    assert UnavailableHandler.requests == 9  # first try plus two retries each
+    assert governor.calls == UnavailableHandler.requests and governor.retried == 6
+
+
+@pytest.mark.parametrize('limit', ['0', '-5'])
+def test_scan_rejects_non_positive_limit(proxy, serve, monkeypatch, limit):
+    pytest.importorskip('numpy')
+    from quote_store import QuoteStore
+    monkeypatch.setattr(proxy, 'quote_store', QuoteStore())
+    status, body = serve(f'/api/scan?limit={limit}')
+    assert status == 400 and 'limit' in body["message"]
+
+
+def test_scan_deduplicates_and_caps_symbols(proxy, serve, monkeypatch):
+    pytest.importorskip('numpy')
+    from quote_store import QuoteStore
+    monkeypatch.setattr(proxy, 'quote_store', QuoteStore())
+    status, body = serve('/api/scan?symbols=AAPL,aapl,MSFT')
+    assert status == 200
+    assert sorted(row["ticker"] for row in body["quotes"]) == ['AAPL', 'MSFT']
+    assert proxy.provider.calls == [['AAPL', 'MSFT']]
+
+    monkeypatch.setattr(api_proxy, 'REALTIME_MAX_TICKERS', 3)
+    status, body = serve('/api/scan?symbols=A,B,C,D')
+    assert status == 400 and 'Too many tickers' in body["message"]
+
+
+def test_bulk_quotes_reports_unknown_universes_when_falling_back(proxy, serve):
+    status, body = serve('/api/fmp/bulk-quotes?universe=nope,bogus')
+    assert status == 200
+    assert body["unknown_universes"] == ['nope', 'bogus']
+    assert body["fallback_universe"] == 'popular' and body["universes"] == ['popular']
+    assert body["count"] == len(api_proxy.UNIVERSES['popular'])
+
+
+def test_bulk_quotes_reports_unknown_universes_next_to_known_ones(proxy, serve):
+    status, body = serve('/api/fmp/bulk-quotes?universe=popular,nope')
+    assert status == 200
+    assert body["unknown_universes"] == ['nope'] and body["fallback_universe"] is None
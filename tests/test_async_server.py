@@ -0,0 +1,71 @@
+import asyncio
+import http.client
+import http.server
+import threading
+import time
+
+import pytest
+
+from async_server import AsyncProxyServer
+import api_proxy
+
+
+class SlowHandler(http.server.BaseHTTPRequestHandler):
+    stream_hub = None
+    release = threading.Event()
+
+    def do_GET(self):
+        self.release.wait(5)
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+@pytest.fixture
+def slow_server():
+    SlowHandler.release.clear()
+    server = AsyncProxyServer(SlowHandler, host='127.0.0.1', port=0, workers=1, queue_depth=0,
+                              request_timeout=0.2, drain_timeout=0)
+    loop = asyncio.new_event_loop()
+    stop = asyncio.Event()
+    thread = threading.Thread(target=lambda: loop.run_until_complete(server.serve(stop)), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while server._server is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    yield server
+    SlowHandler.release.set()
+    loop.call_soon_threadsafe(stop.set)
+    thread.join(5)
+
+
+def get_status(server):
+    connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+    try:
+        connection.request('GET', '/slow')
+        return connection.getresponse().status
+    finally:
+        connection.close()
+
+
+def test_timed_out_handler_still_counts_against_saturation(slow_server):
+    assert get_status(slow_server) == 504  # handler keeps running after the 504
+    started = time.monotonic()
+    assert get_status(slow_server) == 503  # the only worker is still busy: fail fast, don't queue
+    assert time.monotonic() - started < 0.2
+    assert slow_server.stats()["rejected"] == 1
+
+    SlowHandler.release.set()
+    deadline = time.monotonic() + 5
+    while slow_server._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert slow_server._pending == 0
+
+
+def test_stream_client_limit_follows_the_serving_mode(monkeypatch):
+    monkeypatch.setattr(api_proxy, 'STREAM_MAX_CLIENTS', 0)
+    monkeypatch.setattr(api_proxy, 'PROXY_WORKERS', 16)
+    assert api_proxy.stream_client_limit('asyncio') == 1000
+    assert api_proxy.stream_client_limit('pool') == 8
+    monkeypatch.setattr(api_proxy, 'STREAM_MAX_CLIENTS', 50)
+    assert api_proxy.stream_client_limit('asyncio') == 50
@@ -0,0 +1,109 @@
+import asyncio
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+from async_server import AsyncProxyServer
+from gateway import GatewayHandler, ThreadedGatewayServer
+from scanner_server import StaticAssetCache
+
+INDEX = b'<!doctype html><title>Scanner</title>'
+
+
+@pytest.fixture(params=['threaded', 'asyncio'])
+def gateway(request, tmp_path):
+    """A gateway over a temporary root in either serving mode; returns ``fetch(method, path, headers)``"""
+    (tmp_path / 'index.html').write_bytes(INDEX)
+    (tmp_path / 'app.js').write_bytes(b'console.log(1);\n' * 4096)  # over the cache limit: streamed
+    (tmp_path / 'docs').mkdir()
+    (tmp_path / 'docs' / 'index.html').write_bytes(b'<p>docs</p>')
+
+    class Handler(GatewayHandler):
+        static_root = str(tmp_path)
+        asset_cache = StaticAssetCache(max_file_bytes=32 * 1024)
+
+        def log_message(self, format, *args):
+            pass
+
+    if request.param == 'threaded':
+        server = ThreadedGatewayServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+    else:
+        server = AsyncProxyServer(Handler, host='127.0.0.1', port=0, workers=2, drain_timeout=0)
+        loop = asyncio.new_event_loop()
+        stopping = asyncio.Event()
+        thread = threading.Thread(target=lambda: loop.run_until_complete(server.serve(stopping)), daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while server._server is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        port = server.port
+
+        def stop():
+            loop.call_soon_threadsafe(stopping.set)
+            thread.join(5)
+
+    def fetch(method, path, headers=None):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        try:
+            connection.request(method, path, headers=dict(headers or {}, Host=f'127.0.0.1:{port}'))
+            response = connection.getresponse()
+            return response, response.read()
+        finally:
+            connection.close()
+
+    fetch.host = f'127.0.0.1:{port}'
+    yield fetch
+    stop()
+
+
+def test_static_files_are_served_from_the_root(gateway):
+    response, body = gateway('GET', '/')
+    assert response.status == 200 and body == INDEX
+    assert response.getheader('Content-Type').startswith('text/html')
+    response, body = gateway('GET', '/app.js')
+    assert response.status == 200 and body == b'console.log(1);\n' * 4096
+
+
+def test_api_paths_go_to_the_proxy(gateway):
+    response, body = gateway('GET', '/api/test')
+    assert response.status == 200 and json.loads(body)["status"] == "success"
+    response, body = gateway('GET', '/api/gateway/stats')
+    stats = json.loads(body)
+    assert stats["process"] == 0 and stats["processes"] == 1 and "static" in stats
+    response, body = gateway('GET', '/metrics')
+    assert response.status == 200 and response.getheader('Content-Type').startswith('text/plain')
+
+
+def test_unknown_paths(gateway):
+    assert gateway('GET', '/missing.html')[0].status == 404
+    assert gateway('GET', '/api/nope')[0].status == 404
+    redirect, _ = gateway('GET', '/docs?tab=1')
+    assert redirect.status == 301 and redirect.getheader('Location') == '/docs/?tab=1'
+    response, body = gateway('GET', '/docs/')
+    assert response.status == 200 and body == b'<p>docs</p>'
+
+
+def test_head(gateway):
+    response, body = gateway('HEAD', '/')
+    assert response.status == 200 and body == b'' and response.getheader('Content-Length') == str(len(INDEX))
+    assert gateway('HEAD', '/api/test')[0].status == 501
+
+
+def test_cors_headers_only_for_other_origins(gateway):
+    same, _ = gateway('GET', '/api/test', {'Origin': f'http://{gateway.host}'})
+    assert same.getheader('Access-Control-Allow-Origin') is None
+    bare, _ = gateway('GET', '/api/test')
+    assert bare.getheader('Access-Control-Allow-Origin') is None
+    cross, _ = gateway('GET', '/api/test', {'Origin': 'http://elsewhere.example'})
+    assert cross.getheader('Access-Control-Allow-Origin') == '*'
+    preflight, _ = gateway('OPTIONS', '/api/fmp/quote/AAPL', {'Origin': 'http://elsewhere.example'})
+    assert preflight.status == 200 and preflight.getheader('Access-Control-Allow-Methods')
@@ -0,0 +1,82 @@
+from history_store import DAY, BarFile, HistoryStore, format_day, parse_day
+
+
+def daily_bars(symbol, interval, from_date, to_date):
+    """One bar per calendar day, close = day of month"""
+    bars = []
+    day = parse_day(from_date)
+    while day <= parse_day(to_date):
+        date = format_day(day)
+        bars.append({"date": date, "open": 1, "high": 2, "low": 0.5, "close": int(date[-2:]), "volume": 10})
+        day += DAY
+    return bars
+
+
+def test_stores_sharing_a_directory_keep_each_others_bars(tmp_path):
+    # Two gateway worker processes = two stores on one directory, each with its own mapping
+    first = HistoryStore(str(tmp_path), daily_bars)
+    second = HistoryStore(str(tmp_path), daily_bars)
+    first.read('AAPL', '1day', parse_day('2024-01-01'), parse_day('2024-01-05'))
+    second._file('AAPL', '1day')  # opened while it only holds 01-01..01-05
+    first.read('AAPL', '1day', parse_day('2024-01-06'), parse_day('2024-01-10'))
+    second.read('AAPL', '1day', parse_day('2024-01-11'), parse_day('2024-01-15'))
+    first.read('AAPL', '1day', parse_day('2024-01-16'), parse_day('2024-01-20'))
+    second.read('AAPL', '1day', parse_day('2023-12-27'), parse_day('2023-12-31'))  # back-fill: rewrites the file
+    first.read('AAPL', '1day', parse_day('2024-01-21'), parse_day('2024-01-25'))  # must append to the new file
+
+    bar_file = BarFile(str(tmp_path / '1day' / 'AAPL.bars'))
+    columns = bar_file.read(parse_day('2023-12-27'), parse_day('2024-01-25') + DAY - 1)
+    assert list(columns['close']) == list(range(27, 32)) + list(range(1, 26))
+    assert bar_file.ranges == [[parse_day('2023-12-27'), parse_day('2024-01-25')]]
+
+    # Either store sees everything as covered, including what the other one fetched
+    fetches = first.upstream_fetches
+    _, gaps = first.read('AAPL', '1day', parse_day('2023-12-27'), parse_day('2024-01-25'))
+    assert gaps == 0 and first.upstream_fetches == fetches
+
+
+def test_missing_reports_gaps_around_covered_ranges(tmp_path):
+    bar_file = BarFile(str(tmp_path / 'A.bars'))
+    jan = lambda day: parse_day(f'2024-01-{day:02d}')
+    bar_file.cover(jan(5), jan(10))
+    bar_file.cover(jan(15), jan(20))
+    assert bar_file.missing(jan(1), jan(25)) == [(jan(1), jan(4)), (jan(11), jan(14)), (jan(21), jan(25))]
+    assert bar_file.missing(jan(6), jan(9)) == []
+    assert bar_file.missing(jan(8), jan(16)) == [(jan(11), jan(14))]
+
+
+def test_cover_merges_overlapping_and_adjacent_ranges(tmp_path):
+    bar_file = BarFile(str(tmp_path / 'A.bars'))
+    jan = lambda day: parse_day(f'2024-01-{day:02d}')
+    bar_file.cover(jan(1), jan(3))
+    bar_file.cover(jan(4), jan(6))  # adjacent day: one range
+    bar_file.cover(jan(10), jan(12))
+    bar_file.cover(jan(2), jan(11))  # bridges both
+    assert bar_file.ranges == [[jan(1), jan(12)]]
+    assert BarFile(bar_file.path).ranges == [[jan(1), jan(12)]]  # persisted in the header
+
+
+def test_append_in_place_then_rewrite_on_backfill(tmp_path):
+    bar_file = BarFile(str(tmp_path / 'A.bars'), capacity=4)
+    bar_file.replace(0, 100, [10, 20], [[1, 2]] * 5)
+    view = bar_file.read(0, 100)['close']  # outstanding slice across the rewrite below
+    bar_file.replace(21, 100, [30], [[3]] * 5)  # newer than everything: appended
+    bar_file.replace(0, 9, [5], [[0.5]] * 5)  # older: rewrite
+    assert list(bar_file.read(0, 100)['time']) == [5, 10, 20, 30]
+    assert list(bar_file.read(0, 100)['close']) == [0.5, 1, 2, 3]
+    assert list(view) == [1, 2]
+
+
+def test_history_store_only_fetches_what_is_missing(tmp_path):
+    calls = []
+
+    def fetch(symbol, interval, from_date, to_date):
+        calls.append((from_date, to_date))
+        return daily_bars(symbol, interval, from_date, to_date)
+
+    store = HistoryStore(str(tmp_path), fetch)
+    store.read('AAPL', '1day', parse_day('2024-01-05'), parse_day('2024-01-10'))
+    columns, gaps = store.read('AAPL', '1day', parse_day('2024-01-01'), parse_day('2024-01-12'))
+    assert calls == [('2024-01-05', '2024-01-10'), ('2024-01-01', '2024-01-04'), ('2024-01-11', '2024-01-12')]
+    assert gaps == 2 and list(columns['close']) == list(range(1, 13))
+    assert store.read('AAPL', '1day', parse_day('2024-01-02'), parse_day('2024-01-11'))[1] == 0
@@ -0,0 +1,59 @@
+import math
+import statistics
+
+import pytest
+
+from indicators import IndicatorEngine
+
+DAY_START = 1_704_204_000  # 2024-01-02 14:00 UTC
+
+
+def feed(engine, prices, volumes=None, symbol='AAPL', avg_volume=None):
+    for i, price in enumerate(prices):
+        quote = {"price": price, "timestamp": DAY_START + i, "volume": volumes[i] if volumes else 0}
+        if avg_volume:
+            quote["avgVolume"] = avg_volume
+        engine.update({symbol: quote})
+    return engine.get(symbol)
+
+
+def test_volatility_is_stdev_of_the_last_window_log_returns():
+    prices = [100 + 3 * math.sin(i) + i * 0.1 for i in range(50)]  # laps the ring buffer more than once
+    values = feed(IndicatorEngine(window=10), prices)
+    returns = [math.log(b / a) for a, b in zip(prices, prices[1:])][-10:]
+    assert values["volatility"] == pytest.approx(statistics.stdev(returns) * 100, abs=1e-4)
+    assert values["warm"] is True
+
+
+def test_volatility_needs_two_returns_and_window_for_warm():
+    engine = IndicatorEngine(window=10)
+    assert feed(engine, [100, 101])["volatility"] is None
+    values = feed(engine, [100, 101, 103])
+    assert values["volatility"] is not None and values["warm"] is False
+
+
+def test_vwap_weights_volume_traded_between_ticks():
+    # 1000 shares traded before tracking began are the baseline, not priced
+    values = feed(IndicatorEngine(), [10.0, 11.0, 12.0], volumes=[1000, 1100, 1400], avg_volume=700)
+    assert values["vwap"] == pytest.approx((11.0 * 100 + 12.0 * 300) / 400)
+    assert values["relative_volume"] == 2.0
+
+
+def test_ema_and_rsi():
+    prices = [100 + i for i in range(20)]
+    values = feed(IndicatorEngine(fast=3, slow=5, rsi_period=14), prices)
+    ema = prices[0]
+    for price in prices[1:]:
+        ema += 0.5 * (price - ema)
+    assert values["ema_fast"] == pytest.approx(ema, abs=1e-4)
+    assert values["rsi"] == 100.0  # gains only
+
+    values = feed(IndicatorEngine(rsi_period=4), [10, 11, 10, 11, 10], symbol='FLAT')
+    assert values["rsi"] == 50.0
+
+
+def test_repeated_timestamp_is_not_counted_twice():
+    engine = IndicatorEngine()
+    engine.update({"AAPL": {"price": 100, "timestamp": DAY_START}})
+    engine.update({"AAPL": {"price": 200, "timestamp": DAY_START}})
+    assert engine.get("AAPL")["ticks"] == 1 and engine.stats()["duplicate_ticks"] == 1
@@ -0,0 +1,102 @@
+import time
+
+from prefetcher import UniversePrefetcher
+
+UNIVERSES = {
+    "popular": ("AAPL", "MSFT", "NVDA"),
+    "growth": ("NVDA", "SHOP", "CRWD"),
+    "energy": ("XOM", "CVX"),
+}
+
+
+def recording_fetch(calls, missing=(), failing=()):
+    def fetch(symbols):
+        calls.append(list(symbols))
+        records = {symbol: {"symbol": symbol, "price": 1.0} for symbol in symbols if symbol not in missing}
+        failed = [{"batch": 1, "symbols": [s for s in symbols if s in failing], "error": "503"}] if failing else []
+        for symbol in failing:
+            records.pop(symbol, None)
+        return records, failed
+    return fetch
+
+
+def test_hot_set_is_ordered_by_decayed_request_counts():
+    prefetcher = UniversePrefetcher(UNIVERSES, None, warm_universes=["popular", "growth", "energy"], half_life=300)
+    assert prefetcher.priority_order() == ["popular", "growth", "energy"]  # no requests: configured order
+    prefetcher.record_request("energy")
+    prefetcher.record_request("growth")
+    prefetcher.record_request("growth")
+    assert prefetcher.priority_order() == ["growth", "energy", "popular"]
+
+
+def test_old_requests_decay():
+    prefetcher = UniversePrefetcher(UNIVERSES, None, warm_universes=["popular", "growth"], half_life=0.05)
+    for _ in range(4):
+        prefetcher.record_request("popular")
+    time.sleep(0.2)  # four half-lives: 4 requests decay to 0.25
+    prefetcher.record_request("growth")
+    assert prefetcher.priority_order() == ["growth", "popular"]
+    assert prefetcher.stats()["request_scores"]["popular"] < 0.5
+
+
+def test_unknown_warm_universes_are_skipped():
+    prefetcher = UniversePrefetcher(UNIVERSES, None, warm_universes=["popular", "gone"])
+    assert prefetcher.priority_order() == ["popular"]
+
+
+def test_refresh_fetches_shared_symbols_once_in_priority_order():
+    calls = []
+    prefetcher = UniversePrefetcher(UNIVERSES, recording_fetch(calls), warm_universes=["popular", "growth"])
+    prefetcher.record_request("growth")
+    assert prefetcher.lookup(["AAPL"]) is None and not prefetcher.warmed
+    count, failed = prefetcher.refresh_once()
+    assert calls == [["NVDA", "SHOP", "CRWD", "AAPL", "MSFT"]]
+    assert count == 5 and failed == [] and prefetcher.warmed
+    records, oldest = prefetcher.lookup(["AAPL", "NVDA"])
+    assert set(records) == {"AAPL", "NVDA"} and oldest <= time.time()
+    assert prefetcher.lookup(["XOM"]) is None  # not warm: caller falls back to a live fetch
+
+
+def test_symbols_without_a_quote_are_remembered_as_missing():
+    prefetcher = UniversePrefetcher(UNIVERSES, recording_fetch([], missing={"MSFT"}), warm_universes=["popular"])
+    prefetcher.refresh_once()
+    records, _ = prefetcher.lookup(["AAPL", "MSFT"])
+    assert set(records) == {"AAPL"}
+
+
+def test_failed_batches_keep_the_previous_entry():
+    calls = []
+    prefetcher = UniversePrefetcher(UNIVERSES, recording_fetch(calls), warm_universes=["popular"])
+    prefetcher.refresh_once()
+    _, first = prefetcher.lookup(["AAPL"])
+    prefetcher.fetch = recording_fetch(calls, failing={"AAPL"})
+    time.sleep(0.01)
+    prefetcher.refresh_once()
+    records, oldest = prefetcher.lookup(["AAPL", "MSFT"])
+    assert oldest == first and "AAPL" in records
+    assert prefetcher.stats()["last_error"] == "1 batch(es) failed"
+
+
+def test_restore_never_overwrites_fresher_entries():
+    prefetcher = UniversePrefetcher(UNIVERSES, recording_fetch([]), warm_universes=["popular"])
+    prefetcher.refresh_once()
+    assert prefetcher.restore({"AAPL": (1.0, {"symbol": "AAPL", "price": 0.5}),
+                               "XOM": (1.0, {"symbol": "XOM", "price": 90.0})}) == 2
+    records, _ = prefetcher.lookup(["AAPL"])
+    assert records["AAPL"]["price"] == 1.0
+    assert prefetcher.lookup(["XOM"]) == ({"XOM": {"symbol": "XOM", "price": 90.0}}, 1.0)
+
+    restored = UniversePrefetcher(UNIVERSES, None)
+    restored.restore({"XOM": (1.0, None)})
+    assert not restored.warmed  # restored entries alone are not a refresh cycle
+
+
+def test_background_loop_refreshes_until_stopped():
+    calls = []
+    prefetcher = UniversePrefetcher(UNIVERSES, recording_fetch(calls), warm_universes=["energy"], interval=0.02)
+    prefetcher.start()
+    time.sleep(0.2)
+    prefetcher.stop()
+    prefetcher._thread.join(1)
+    assert not prefetcher._thread.is_alive()
+    assert prefetcher.cycles >= 2 and all(call == ["XOM", "CVX"] for call in calls)
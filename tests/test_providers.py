@@ -0,0 +1,24 @@
+from urllib.error import HTTPError
+
+import pytest
+
+from providers import FailoverProvider, ReplayProvider
+from rate_limit import UpstreamGovernor
+
+
+def test_failover_serves_fallback_when_primary_fails():
+    provider = FailoverProvider(ReplayProvider(error_rate=1.0), ReplayProvider())
+    records = provider.quotes(['AAPL', 'MSFT'])
+    assert set(records) == {'AAPL', 'MSFT'}
+    assert provider.failovers == 1 and '503' in provider.last_error
+
+
+def test_failover_passes_429_to_the_governor():
+    primary, fallback = ReplayProvider(throttle_rate=1.0), ReplayProvider()
+    provider = FailoverProvider(primary, fallback)
+    governor = UpstreamGovernor(0, retries=1, backoff_max=0.01)
+    with pytest.raises(HTTPError) as raised:
+        governor.call(lambda: provider.quotes(['AAPL']))
+    assert raised.value.code == 429
+    assert governor.throttles == 2  # first try plus one retry, each pausing the budget
+    assert provider.failovers == 0 and fallback.calls == 0
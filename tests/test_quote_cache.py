@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from quote_cache import QuoteCache
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = QuoteCache(ttl=60)
+    calls = []
+    release = threading.Event()
+
+    def fetch(symbols):
+        calls.append(list(symbols))
+        release.wait(5)
+        return {symbol: {"symbol": symbol} for symbol in symbols}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_many('quote', ['AAPL'], fetch)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert calls == [['AAPL']]
+    assert results == [{'AAPL': {"symbol": 'AAPL'}}] * 5
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_fetch_error_reaches_every_waiter_and_is_not_cached():
+    cache = QuoteCache(ttl=60)
+    with pytest.raises(RuntimeError):
+        cache.get_many('quote', ['AAPL'], lambda symbols: (_ for _ in ()).throw(RuntimeError("upstream down")))
+    assert cache.get_many('quote', ['AAPL'], lambda symbols: {'AAPL': 1}) == {'AAPL': 1}
+
+
+def test_entries_expire_after_ttl_and_misses_are_cached():
+    cache = QuoteCache(ttl=0.1)
+    calls = []
+
+    def fetch(symbols):
+        calls.append(list(symbols))
+        return {'AAPL': len(calls)}
+
+    assert cache.get_many('quote', ['AAPL', 'NOPE'], fetch) == {'AAPL': 1}
+    assert cache.get_many('quote', ['AAPL', 'NOPE'], fetch) == {'AAPL': 1}  # NOPE cached as missing
+    assert calls == [['AAPL', 'NOPE']]
+    time.sleep(0.15)
+    assert cache.get_many('quote', ['AAPL'], fetch) == {'AAPL': 2}
+
+
+def test_namespaces_are_separate_and_lru_is_bounded():
+    cache = QuoteCache(ttl=60, max_entries=2)
+    cache.get_many('quote', ['A'], lambda s: {'A': 'full'})
+    assert cache.get_many('quote-short', ['A'], lambda s: {'A': 'short'}) == {'A': 'short'}
+    cache.get_many('quote', ['B'], lambda s: {'B': 'full'})
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
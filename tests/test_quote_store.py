@@ -0,0 +1,37 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from quote_store import QuoteStore
+
+
+@pytest.fixture
+def store():
+    store = QuoteStore(capacity=4)
+    store.update({f"S{i:02d}": {"price": 10 + i, "changesPercentage": i, "volume": 100 * i, "avgVolume": 100}
+                  for i in range(20)})
+    return store
+
+
+def test_scan_returns_top_limit_rows_sorted(store):
+    rows, matched, scanned = store.scan(sort='change', limit=3)
+    assert [row["ticker"] for row in rows] == ['S19', 'S18', 'S17']
+    assert (matched, scanned) == (20, 20)
+
+
+def test_scan_without_limit_returns_every_match(store):
+    rows, matched, _ = store.scan({'price': (25, None)}, sort='price', descending=False, limit=None)
+    assert [row["ticker"] for row in rows] == [f"S{i:02d}" for i in range(15, 20)]
+    assert matched == 5
+
+
+@pytest.mark.parametrize('limit', [0, -5])
+def test_scan_rejects_non_positive_limit(store, limit):
+    with pytest.raises(ValueError):
+        store.scan(limit=limit)
+
+
+def test_scan_counts_duplicate_symbols_once(store):
+    rows, matched, scanned = store.scan(symbols=['S01', 'S01', 'S02', 'NOPE'], limit=10)
+    assert [row["ticker"] for row in rows] == ['S02', 'S01']
+    assert (matched, scanned) == (2, 2)
@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+
+import pytest
+
+from quote_stream import QuoteStreamHub, StreamSubscriber, sse_event, sse_quotes_event
+
+
+class Upstream:
+    """Quote source whose prices the test moves; records every poll"""
+
+    def __init__(self):
+        self.prices = {"AAPL": 100.0, "MSFT": 200.0, "NVDA": 300.0}
+        self.polls = []
+        self.lock = threading.Lock()
+
+    def fetch(self, symbols):
+        with self.lock:
+            self.polls.append(list(symbols))
+            return {s: {"ticker": s, "price": self.prices[s], "volume": 1} for s in symbols if s in self.prices}
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def hub():
+    upstream = Upstream()
+    hub = QuoteStreamHub(upstream.fetch, interval=3600, max_subscribers=2)
+    hub.upstream = upstream
+    yield hub
+    hub.close_all()
+
+
+def test_sse_encoding():
+    assert sse_event("subscribed", ["AAPL"], retry=3000) == b'retry: 3000\nevent: subscribed\ndata: ["AAPL"]\n\n'
+    event = sse_quotes_event({"AAPL": {"ticker": "AAPL"}}).decode()
+    assert event.startswith("event: quotes\ndata: ") and event.endswith("\n\n")
+    assert json.loads(event.split("data: ", 1)[1])["quotes"] == [{"ticker": "AAPL"}]
+
+
+def test_subscriber_keeps_only_the_latest_quote_per_symbol():
+    subscriber = StreamSubscriber(["AAPL", "MSFT"])
+    subscriber.offer({"AAPL": {"price": 1}, "NVDA": {"price": 9}})
+    subscriber.offer({"AAPL": {"price": 2}, "MSFT": {"price": 3}})
+    assert subscriber.drain(0) == {"AAPL": {"price": 2}, "MSFT": {"price": 3}}
+    assert subscriber.coalesced == 1
+    started = time.monotonic()
+    assert subscriber.drain(0.05) == {}  # nothing new: waits out the timeout
+    assert time.monotonic() - started >= 0.04
+
+
+def test_subscribe_polls_right_away_and_pushes_only_changes(hub):
+    subscriber = hub.subscribe(["AAPL", "MSFT"])
+    assert subscriber.drain(2) == {"AAPL": {"ticker": "AAPL", "price": 100.0, "volume": 1},
+                                   "MSFT": {"ticker": "MSFT", "price": 200.0, "volume": 1}}
+    wait_for(lambda: hub.polls >= 2)  # the loop's first poll plus the subscribe wake-up
+    assert hub.upstream.polls[0] == ["AAPL", "MSFT"]
+
+    assert hub.poll_once() == 0  # nothing moved
+    hub.upstream.prices["MSFT"] = 201.0
+    assert hub.poll_once() == 1
+    assert subscriber.drain(0) == {"MSFT": {"ticker": "MSFT", "price": 201.0, "volume": 1}}
+
+
+def test_later_subscribers_get_known_quotes_and_share_the_poll(hub):
+    first = hub.subscribe(["AAPL"])
+    first.drain(2)
+    wait_for(lambda: hub.polls >= 2)
+    second = hub.subscribe(["AAPL", "NVDA"])
+    assert second.drain(0)["AAPL"]["price"] == 100.0  # snapshot on subscribe, before any poll
+    wait_for(lambda: hub.polls >= 3)
+    assert hub.upstream.polls[-1] == ["AAPL", "NVDA"]  # one poll for the union
+    assert set(second.drain(1)) == {"NVDA"}
+    assert hub.stats()["symbols"] == 2
+
+
+def test_client_cap(hub):
+    first = hub.subscribe(["AAPL"])
+    assert hub.subscribe(["MSFT"]) is not None
+    assert hub.subscribe(["NVDA"]) is None
+    hub.unsubscribe(first)
+    assert first.closed
+    assert hub.subscribe(["NVDA"]) is not None
+    assert hub.stats()["subscribers"] == 2 and hub.stats()["max_subscribers"] == 2
+
+
+def test_subscribers_that_stop_draining_are_evicted(hub):
+    hub.max_lag = 0.05
+    slow = hub.subscribe(["AAPL"])
+    wait_for(lambda: hub.polls >= 2)
+    time.sleep(0.1)
+    hub.poll_once()
+    assert slow.closed and hub.stats()["evicted"] == 1 and hub.stats()["subscribers"] == 0
+
+
+def test_close_all_wakes_blocked_drains(hub):
+    subscriber = hub.subscribe(["AAPL"])
+    subscriber.drain(2)
+    drained = threading.Event()
+
+    def stream():
+        while not subscriber.closed:
+            subscriber.drain(10)
+        drained.set()
+
+    threading.Thread(target=stream, daemon=True).start()
+    time.sleep(0.05)
+    hub.close_all()
+    assert drained.wait(1)
+    assert hub.stats()["subscribers"] == 0
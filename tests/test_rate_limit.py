@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from rate_limit import UpstreamGovernor
+
+
+def recording_fetch(calls, delay=0.0):
+    def fetch(batch):
+        calls.append(sorted(batch))
+        time.sleep(delay)
+        return {symbol: {"symbol": symbol} for symbol in batch}
+    return fetch
+
+
+def exhaust(governor):
+    assert governor.acquire('interactive', timeout=0)
+
+
+def test_timed_out_symbols_leave_the_queue():
+    governor = UpstreamGovernor(1, burst=1)  # one call per minute
+    exhaust(governor)
+    with pytest.raises(TimeoutError):
+        governor.fetch_symbols('quote', ['B', 'C'], recording_fetch([]), timeout=0.1)
+    assert governor._pending['quote'] == {}
+    assert governor.stats()["queued_symbols"] == 0
+
+
+def test_timed_out_symbol_stays_queued_for_other_waiters():
+    governor = UpstreamGovernor(60, burst=1)  # next slot in one second
+    exhaust(governor)
+    calls = []
+    results = {}
+    patient = threading.Thread(target=lambda: results.update(
+        governor.fetch_symbols('quote', ['X'], recording_fetch(calls), timeout=5)))
+    patient.start()
+    time.sleep(0.05)
+    with pytest.raises(TimeoutError):
+        governor.fetch_symbols('quote', ['X', 'Y'], recording_fetch(calls), timeout=0.1)
+    patient.join(5)
+    assert set(results) == {'X'}
+    assert calls == [['X']]  # Y was withdrawn with the impatient caller, X was fetched once
+    assert governor._pending['quote'] == {}
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    governor = UpstreamGovernor(600, burst=1)  # a slot every 0.1s
+    exhaust(governor)
+    order = []
+
+    def wait(priority):
+        governor.acquire(priority, timeout=5)
+        order.append(priority)
+
+    threads = []
+    for priority in ('background', 'batch', 'interactive'):
+        threads.append(threading.Thread(target=wait, args=(priority,)))
+        threads[-1].start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join(5)
+    assert order == ['interactive', 'batch', 'background']
+    priorities = governor.stats()["priorities"]
+    assert priorities["background"]["avg_wait_ms"] > priorities["interactive"]["avg_wait_ms"]
+
+
+def test_queued_symbols_are_coalesced_into_one_call():
+    governor = UpstreamGovernor(60, burst=1, max_coalesce=3)
+    exhaust(governor)
+    calls = []
+    results = []
+    threads = [threading.Thread(target=lambda s=symbol: results.append(
+                   governor.fetch_symbols('quote', [s], recording_fetch(calls), timeout=5)))
+               for symbol in ('A', 'B', 'C', 'D')]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join(5)
+    assert len(results) == 4 and all(len(result) == 1 for result in results)
+    assert sorted(calls) == [['A', 'B', 'C'], ['D']]  # max_coalesce caps the first call
+    assert governor.coalesced_symbols == 2
+
+
+def test_callers_asking_for_the_same_symbol_share_its_call():
+    governor = UpstreamGovernor(0)
+    calls = []
+    fetch = recording_fetch(calls, delay=0.2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(governor.fetch_symbols('quote', ['A'], fetch)))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert calls == [['A']] and len(results) == 3
+    assert governor.joined_symbols == 2
+
+
+def test_429_pauses_and_retries():
+    from urllib.error import HTTPError
+    governor = UpstreamGovernor(0, retries=2, backoff_base=0.05, backoff_max=0.05)
+    attempts = []
+
+    def fetch():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise HTTPError('http://upstream', 429, 'Too Many Requests', {}, None)
+        return 'ok'
+
+    assert governor.call(fetch) == 'ok'
+    assert governor.throttles == 2
+    assert attempts[2] - attempts[1] >= 0.04
+
+
+def test_coalesced_batch_is_retried_after_a_5xx_with_fresh_budget():
+    from urllib.error import HTTPError
+    governor = UpstreamGovernor(0, retries=2, retry_backoff=0)
+    calls = []
+
+    def fetch(batch):
+        calls.append(sorted(batch))
+        if len(calls) < 3:
+            raise HTTPError('http://upstream', 503, 'Service Unavailable', {}, None)
+        return {symbol: {"symbol": symbol} for symbol in batch}
+
+    assert set(governor.fetch_symbols('quote', ['A', 'B'], fetch)) == {'A', 'B'}
+    assert calls == [['A', 'B']] * 3
+    assert governor.calls == 3 and governor.retried == 2
+    assert governor.stats()["queued_symbols"] == 0
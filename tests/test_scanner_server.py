@@ -0,0 +1,114 @@
+import email.utils
+import gzip
+import http.client
+import os
+import threading
+
+import pytest
+
+from scanner_server import ScannerHandler, StaticAssetCache, ThreadedScannerServer
+
+INDEX = ('<!doctype html><title>Scanner</title>' + '<div class="row">AAPL MSFT NVDA</div>' * 200).encode()
+
+
+@pytest.fixture
+def static(tmp_path):
+    """A scanner server over a temporary root; returns ``request(method, path, headers) -> (response, body)``"""
+    (tmp_path / 'index.html').write_bytes(INDEX)
+    (tmp_path / 'big.js').write_bytes(b'console.log(1);\n' * 4096)  # 64 KB: over the cache's file limit
+    (tmp_path / '.env').write_bytes(b'SECRET=1\n')
+
+    class Handler(ScannerHandler):
+        static_root = str(tmp_path)
+        asset_cache = StaticAssetCache(max_file_bytes=32 * 1024)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadedScannerServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def request(method, path, headers=None):
+        connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+        try:
+            connection.request(method, path, headers=headers or {})
+            response = connection.getresponse()
+            return response, response.read()
+        finally:
+            connection.close()
+
+    request.root = tmp_path
+    request.cache = Handler.asset_cache
+    yield request
+    server.shutdown()
+    server.server_close()
+
+
+def test_gzip_variant_has_its_own_etag_and_vary(static):
+    plain, plain_body = static('GET', '/index.html')
+    zipped, zipped_body = static('GET', '/index.html', {'Accept-Encoding': 'gzip'})
+    assert plain.status == zipped.status == 200
+    assert plain_body == INDEX and gzip.decompress(zipped_body) == INDEX
+    assert zipped.getheader('Content-Encoding') == 'gzip' and plain.getheader('Content-Encoding') is None
+    assert int(zipped.getheader('Content-Length')) == len(zipped_body) < len(INDEX)
+    assert zipped.getheader('ETag') == plain.getheader('ETag')[:-1] + '-gzip"'
+    assert plain.getheader('Vary') == zipped.getheader('Vary') == 'Accept-Encoding'
+    assert plain.getheader('Cache-Control') == 'no-cache'
+    assert static.cache.stats()["loads"] == 1 and static.cache.stats()["hits"] == 1
+
+
+def test_if_none_match_revalidates_only_the_same_variant(static):
+    zipped, _ = static('GET', '/', {'Accept-Encoding': 'gzip'})  # directory index
+    etag = zipped.getheader('ETag')
+    not_modified, body = static('GET', '/', {'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert not_modified.status == 304 and body == b''
+    assert not_modified.getheader('ETag') == etag and not_modified.getheader('Vary') == 'Accept-Encoding'
+    other_variant, body = static('GET', '/', {'If-None-Match': etag})
+    assert other_variant.status == 200 and body == INDEX
+
+
+def test_if_modified_since(static):
+    response, _ = static('GET', '/index.html')
+    last_modified = response.getheader('Last-Modified')
+    assert static('GET', '/index.html', {'If-Modified-Since': last_modified})[0].status == 304
+    earlier = email.utils.formatdate(os.stat(static.root / 'index.html').st_mtime - 60, usegmt=True)
+    assert static('GET', '/index.html', {'If-Modified-Since': earlier})[0].status == 200
+    assert static('GET', '/index.html', {'If-Modified-Since': 'garbage'})[0].status == 200
+
+
+def test_head_sends_headers_only(static):
+    response, body = static('HEAD', '/index.html', {'Accept-Encoding': 'gzip'})
+    assert response.status == 200 and body == b''
+    assert int(response.getheader('Content-Length')) == len(gzip.compress(INDEX, 9, mtime=0))
+    big, body = static('HEAD', '/big.js')
+    assert big.status == 200 and body == b'' and big.getheader('Content-Length') == str(64 * 1024)
+
+
+def test_changed_file_is_reloaded(static):
+    path = static.root / 'index.html'
+    first, _ = static('GET', '/index.html')
+    path.write_bytes(INDEX.replace(b'NVDA', b'TSLA'))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    second, body = static('GET', '/index.html')
+    assert body == INDEX.replace(b'NVDA', b'TSLA')
+    assert second.getheader('ETag') != first.getheader('ETag')
+    assert static('GET', '/index.html', {'If-None-Match': first.getheader('ETag')})[0].status == 200
+    assert static.cache.stats()["loads"] == 2
+
+
+def test_large_files_are_streamed_with_stat_validators(static):
+    path = static.root / 'big.js'
+    response, body = static('GET', '/big.js', {'Accept-Encoding': 'gzip'})
+    assert response.status == 200 and body == path.read_bytes()
+    assert response.getheader('Content-Encoding') is None and response.getheader('Vary') is None
+    stat = os.stat(path)
+    assert response.getheader('ETag') == f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    assert response.getheader('Cache-Control').startswith('public, max-age=')
+    assert static('GET', '/big.js', {'If-None-Match': response.getheader('ETag')})[0].status == 304
+    assert static.cache.stats()["files"] == 0 and static.cache.stats()["uncached_requests"] == 2
+
+
+def test_dotfiles_are_never_served(static):
+    assert static('GET', '/.env')[0].status == 404
+    assert static('GET', '/%2Eenv')[0].status == 404
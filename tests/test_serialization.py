@@ -0,0 +1,111 @@
+import gzip
+import json
+import zlib
+
+import pytest
+
+from serialization import (COMPRESS_MIN_BYTES, build_json_response, etag_matches, negotiate_encoding,
+                           to_columnar)
+
+BIG = {"quotes": [{"ticker": f"T{i:04d}", "price": i * 1.5} for i in range(200)]}
+SMALL = {"status": "success"}
+
+
+def header(headers, name):
+    return dict(headers).get(name)
+
+
+@pytest.mark.parametrize('accept, expected', [
+    (None, None),
+    ('', None),
+    ('gzip', 'gzip'),
+    ('deflate, gzip', 'gzip'),  # server preference order wins
+    ('br, deflate', 'deflate'),
+    ('gzip;q=0, deflate', 'deflate'),
+    ('gzip;q=0, deflate;q=0', None),
+    ('*', 'gzip'),
+    ('*;q=0.5, gzip;q=0', 'deflate'),
+    ('identity', None),
+    ('gzip;q=junk', None),
+])
+def test_negotiate_encoding(accept, expected):
+    assert negotiate_encoding(accept) == expected
+
+
+@pytest.mark.parametrize('if_none_match, expected', [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),  # weak comparison
+    ('"other", "abc"', True),
+    ('"other"', False),
+    ('*', True),
+    (' * ', True),
+])
+def test_etag_matches(if_none_match, expected):
+    assert etag_matches(if_none_match, {'"abc"'}) is expected
+
+
+def test_small_bodies_are_not_compressed():
+    status, headers, body = build_json_response(SMALL, {'Accept-Encoding': 'gzip'})
+    assert status == 200 and len(body) < COMPRESS_MIN_BYTES
+    assert header(headers, 'Content-Encoding') is None
+    assert json.loads(body) == SMALL
+    assert header(headers, 'Content-Length') == str(len(body))
+
+
+def test_each_encoding_gets_its_own_etag():
+    _, plain_headers, plain = build_json_response(BIG)
+    _, gzip_headers, gzipped = build_json_response(BIG, {'Accept-Encoding': 'gzip'})
+    _, deflate_headers, deflated = build_json_response(BIG, {'Accept-Encoding': 'deflate'})
+    assert json.loads(plain) == json.loads(gzip.decompress(gzipped)) == json.loads(zlib.decompress(deflated)) == BIG
+    assert header(gzip_headers, 'Content-Encoding') == 'gzip'
+    assert header(gzip_headers, 'Content-Length') == str(len(gzipped)) and len(gzipped) < len(plain)
+    etags = {header(h, 'ETag') for h in (plain_headers, gzip_headers, deflate_headers)}
+    assert len(etags) == 3
+    assert header(gzip_headers, 'ETag') == header(plain_headers, 'ETag')[:-1] + '-gzip"'
+    assert all(header(h, 'Vary') == 'Accept-Encoding' for h in (plain_headers, gzip_headers, deflate_headers))
+
+
+def test_gzip_output_is_deterministic():
+    assert build_json_response(BIG, {'Accept-Encoding': 'gzip'}) == build_json_response(BIG, {'Accept-Encoding': 'gzip'})
+
+
+def test_matching_etag_gives_304_without_body():
+    _, headers, _ = build_json_response(BIG, {'Accept-Encoding': 'gzip'})
+    etag = header(headers, 'ETag')
+    for if_none_match in (etag, f'W/{etag}', f'"nope", {etag}', '*'):
+        status, not_modified_headers, body = build_json_response(
+            BIG, {'Accept-Encoding': 'gzip', 'If-None-Match': if_none_match})
+        assert (status, body) == (304, b'')
+        assert header(not_modified_headers, 'ETag') == etag
+        assert header(not_modified_headers, 'Content-Length') is None
+
+
+def test_identity_etag_revalidates_a_compressed_response():
+    _, headers, _ = build_json_response(BIG)
+    status, _, _ = build_json_response(BIG, {'Accept-Encoding': 'gzip', 'If-None-Match': header(headers, 'ETag')})
+    assert status == 304
+
+
+def test_changed_body_or_non_200_is_not_304():
+    _, headers, _ = build_json_response(BIG)
+    etag = header(headers, 'ETag')
+    assert build_json_response(dict(BIG, extra=1), {'If-None-Match': etag})[0] == 200
+    assert build_json_response(BIG, {'If-None-Match': etag}, status=500)[0] == 500
+    assert build_json_response(BIG, {'If-None-Match': '*'}, conditional=False)[0] == 200
+
+
+def test_pretty_and_compact_encodings():
+    _, _, compact = build_json_response(SMALL)
+    _, _, pretty = build_json_response(SMALL, pretty=True)
+    assert compact == b'{"status":"success"}'
+    assert b'\n' in pretty and json.loads(pretty) == SMALL
+
+
+def test_to_columnar_fills_missing_fields():
+    data = {"status": "success", "quotes": [{"ticker": "A", "price": 1}, {"ticker": "B", "volume": 5}]}
+    columnar = to_columnar(data)
+    assert columnar["quotes"] == {"ticker": ["A", "B"], "price": [1, None], "volume": [None, 5]}
+    assert columnar["fields"] == ["ticker", "price", "volume"] and columnar["format"] == "columnar"
+    assert data["quotes"][0] == {"ticker": "A", "price": 1}  # input left alone
+    assert to_columnar({"status": "error"}) == {"status": "error"}
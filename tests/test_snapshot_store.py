@@ -0,0 +1,37 @@
+from snapshot_store import SnapshotStore
+
+
+def test_torn_last_line_is_cut_off_and_appends_resume_cleanly(tmp_path):
+    path = tmp_path / 'snapshot.log'
+    store = SnapshotStore(str(path))
+    store.record({'AAPL': {"price": 1}}, fetched_at=100)
+    store.flush()
+    with open(path, 'ab') as f:
+        f.write(b'{"q":{"MSFT":[101,{"pri')  # crash mid-write
+
+    reopened = SnapshotStore(str(path))
+    assert reopened.load() == {'AAPL': (100, {"price": 1})}
+    assert reopened.skipped_lines == 1
+    reopened.record({'MSFT': {"price": 2}}, fetched_at=102)
+    reopened.flush()
+
+    assert SnapshotStore(str(path)).load() == {'AAPL': (100, {"price": 1}), 'MSFT': (102, {"price": 2})}
+
+
+def test_read_only_load_leaves_a_torn_line_for_the_writer(tmp_path):
+    path = tmp_path / 'snapshot.log'
+    path.write_bytes(b'{"q":{"AAPL":[100,{"price":1}]}}\n{"q":{"MS')
+    reader = SnapshotStore(str(path))
+    assert reader.load(repair=False) == {'AAPL': (100, {"price": 1})}
+    assert path.read_bytes().endswith(b'{"q":{"MS')
+
+
+def test_compaction_keeps_only_the_latest_record_per_symbol(tmp_path):
+    path = tmp_path / 'snapshot.log'
+    store = SnapshotStore(str(path), compact_ratio=2)
+    for tick in range(5):
+        store.record({'AAPL': {"price": tick}}, fetched_at=tick)
+        store.flush()
+    assert store.compactions >= 1
+    assert len(path.read_bytes().splitlines()) < 5
+    assert SnapshotStore(str(path)).load() == {'AAPL': (4, {"price": 4})}
@@ -0,0 +1,92 @@
+import json
+import os
+
+import pytest
+
+from universes import UniverseIndex, parse_universes
+
+UNIVERSES = {
+    "popular": ["aapl", "MSFT", "NVDA", "AAPL"],
+    "growth": ["NVDA", "SHOP", "CRWD"],
+    "chips": ["NVDA", "AMD", "MSFT"],
+}
+
+
+def write(path, data, mtime_offset=0):
+    path.write_text(json.dumps(data) if not isinstance(data, str) else data)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset * 1_000_000_000))
+
+
+@pytest.fixture
+def universe_file(tmp_path):
+    path = tmp_path / 'universes.json'
+    write(path, UNIVERSES)
+    return path
+
+
+def test_parse_normalises_and_deduplicates():
+    assert parse_universes(UNIVERSES)["popular"] == ("AAPL", "MSFT", "NVDA")
+    for bad in ({}, [], {"x": "AAPL"}, {"x": ["AAPL", ""]}, {"x": ["AAPL", 3]}):
+        with pytest.raises(ValueError):
+            parse_universes(bad)
+
+
+def test_mapping_interface_and_memberships(universe_file):
+    index = UniverseIndex(str(universe_file))
+    assert list(index) == ["popular", "growth", "chips"] and len(index) == 3
+    assert "growth" in index and "energy" not in index
+    assert index["growth"] == ("NVDA", "SHOP", "CRWD") and index.get("energy") is None
+    assert index.universes_for("nvda") == ("popular", "growth", "chips")
+    assert index.universes_for("XOM") == ()
+    stats = index.stats()
+    assert (stats["universes"], stats["symbols"], stats["listed_symbols"], stats["shared_symbols"]) == (3, 6, 9, 2)
+
+
+def test_resolve_union_lists_each_symbol_once(universe_file):
+    index = UniverseIndex(str(universe_file))
+    assert index.resolve(["popular", "growth"]) == (["AAPL", "MSFT", "NVDA", "SHOP", "CRWD"], [])
+
+
+def test_resolve_intersection_keeps_the_first_universe_order(universe_file):
+    index = UniverseIndex(str(universe_file))
+    assert index.resolve(["popular", "chips"], mode='intersection') == (["MSFT", "NVDA"], [])
+    assert index.resolve(["popular", "growth", "chips"], mode='intersection') == (["NVDA"], [])
+
+
+def test_resolve_reports_unknown_names(universe_file):
+    index = UniverseIndex(str(universe_file))
+    assert index.resolve(["growth", "energy", "gone"]) == (["NVDA", "SHOP", "CRWD"], ["energy", "gone"])
+    assert index.resolve(["energy"]) == ([], ["energy"])
+    assert index.resolve(["energy", "chips"], mode='intersection') == (["NVDA", "AMD", "MSFT"], ["energy"])
+    with pytest.raises(ValueError):
+        index.resolve(["growth"], mode='xor')
+
+
+def test_edits_go_live_after_the_check_interval(universe_file):
+    index = UniverseIndex(str(universe_file), check_interval=0)
+    write(universe_file, {"energy": ["XOM", "CVX"]}, mtime_offset=1)
+    assert list(index) == ["energy"]
+    assert index.resolve(["popular", "energy"]) == (["XOM", "CVX"], ["popular"])
+    assert index.stats()["reloads"] == 2
+
+
+def test_changes_wait_for_the_check_interval(universe_file):
+    index = UniverseIndex(str(universe_file), check_interval=3600)
+    write(universe_file, {"energy": ["XOM"]}, mtime_offset=1)
+    assert "popular" in index
+    assert index.reload() and list(index) == ["energy"]
+
+
+def test_broken_file_keeps_the_previous_snapshot(universe_file):
+    index = UniverseIndex(str(universe_file), check_interval=0)
+    write(universe_file, '{"popular": [', mtime_offset=1)
+    assert index["popular"] == ("AAPL", "MSFT", "NVDA")
+    assert index.stats()["last_error"] and index.stats()["reloads"] == 1
+    write(universe_file, {"popular": ["TSLA"]}, mtime_offset=2)
+    assert index["popular"] == ("TSLA",) and index.stats()["last_error"] is None
+
+
+def test_missing_file_at_startup_is_an_error(tmp_path):
+    with pytest.raises(RuntimeError):
+        UniverseIndex(str(tmp_path / 'nope.json'))
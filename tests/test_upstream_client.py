@@ -0,0 +1,137 @@
+import http.server
+import threading
+import time
+from urllib.error import HTTPError
+
+import pytest
+
+import upstream_client
+from upstream_client import UpstreamClient
+
+
+class ScriptedHandler(http.server.BaseHTTPRequestHandler):
+    """Answers with the next status from ``server.script`` (200 once it runs out)"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            status, headers = server.script.pop(0) if server.script else (200, {})
+        if server.delay:
+            time.sleep(server.delay)
+        body = b'{"ok":true}' if status == 200 else b''
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.script = []
+    server.delay = 0.0
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/quote/AAPL?apikey=x"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Backoff pauses the client asked for, without sleeping"""
+    delays = []
+    monkeypatch.setattr(upstream_client.time, 'sleep', delays.append)
+    return delays
+
+
+def test_connections_are_reused(upstream):
+    client = UpstreamClient()
+    for _ in range(5):
+        assert client.get(upstream.url) == b'{"ok":true}'
+    stats = client.stats()
+    assert (stats["created"], stats["reused"], stats["open"], stats["idle"]) == (1, 4, 1, 1)
+    client.close()
+    assert client.stats()["open"] == 0
+
+
+def test_concurrent_callers_stay_within_the_pool(upstream):
+    upstream.delay = 0.05
+    client = UpstreamClient(max_per_host=2)
+    threads = [threading.Thread(target=client.get, args=(upstream.url,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert upstream.requests == 6
+    assert client.stats()["created"] <= 2
+
+
+def test_retry_statuses_are_retried_with_backoff(upstream, sleeps):
+    upstream.script = [(503, {}), (502, {})]
+    client = UpstreamClient(retries=2, backoff=0.2)
+    assert client.get(upstream.url) == b'{"ok":true}'
+    assert upstream.requests == 3 and client.stats()["retries"] == 2
+    assert len(sleeps) == 2 and 0 <= sleeps[0] <= 0.2 and 0 <= sleeps[1] <= 0.4  # full jitter, doubling
+
+
+def test_retry_after_sets_the_minimum_pause(upstream, sleeps):
+    upstream.script = [(429, {'Retry-After': '3'})]
+    client = UpstreamClient(retries=1, backoff=0.01)
+    client.get(upstream.url)
+    assert sleeps == [3.0]
+
+
+def test_gives_up_after_retries(upstream, sleeps):
+    upstream.script = [(503, {})] * 5
+    client = UpstreamClient(retries=2)
+    with pytest.raises(HTTPError) as raised:
+        client.get(upstream.url)
+    assert raised.value.code == 503 and upstream.requests == 3
+
+
+def test_without_retries_every_failure_is_one_request(upstream, sleeps):
+    # The proxy's configuration: the governor owns retries so each attempt takes budget
+    upstream.script = [(503, {})]
+    client = UpstreamClient(retries=0, retry_statuses=())
+    with pytest.raises(HTTPError):
+        client.get(upstream.url)
+    assert upstream.requests == 1 and sleeps == []
+
+
+def test_other_errors_are_not_retried(upstream, sleeps):
+    upstream.script = [(404, {})]
+    with pytest.raises(HTTPError) as raised:
+        UpstreamClient(retries=2).get(upstream.url)
+    assert raised.value.code == 404 and upstream.requests == 1 and sleeps == []
+
+
+def test_connection_closed_by_the_server_is_replaced_transparently(upstream):
+    upstream.script = [(200, {'Connection': 'close'})]
+    client = UpstreamClient(retries=0)
+    client.get(upstream.url)  # server closes after this one; the client drops it
+    client.get(upstream.url)
+    assert client.stats()["created"] == 2 and client.stats()["errors"] == 0
+
+    idle, _ = client._pools[('http', '127.0.0.1', upstream.server_address[1])].idle[-1]
+    idle.sock.shutdown(2)  # an idle connection that died while parked
+    assert client.get(upstream.url) == b'{"ok":true}'
+    assert upstream.requests == 3
+
+
+def test_unreachable_host_raises_oserror(sleeps):
+    client = UpstreamClient(retries=1, connect_timeout=1)
+    with pytest.raises(OSError):
+        client.get("http://127.0.0.1:9/")
+    assert client.stats()["errors"] == 2 and client.stats()["open"] == 0
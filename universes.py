@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Universe Index
+Stock universes loaded from universes.json into symbol<->universe indexes, reloaded when the file changes
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Snapshot:
+    """Immutable view of one load of the universe file"""
+
+    __slots__ = ('universes', 'memberships', 'mtime', 'loaded_at')
+
+    def __init__(self, universes, mtime):
+        self.universes = universes  # name -> tuple of symbols, file order, no duplicates
+        memberships = {}
+        for name, symbols in universes.items():
+            for symbol in symbols:
+                memberships.setdefault(symbol, []).append(name)
+        self.memberships = {symbol: tuple(names) for symbol, names in memberships.items()}
+        self.mtime = mtime
+        self.loaded_at = time.time()
+
+
+def parse_universes(data):
+    """Validate ``{name: [symbols]}`` and normalise symbols to upper case"""
+    if not isinstance(data, dict) or not data:
+        raise ValueError("universe file must be a non-empty JSON object")
+    universes = {}
+    for name, symbols in data.items():
+        if not isinstance(symbols, list) or not all(isinstance(s, str) and s.strip() for s in symbols):
+            raise ValueError(f"universe '{name}' must be a list of symbols")
+        universes[name] = tuple(dict.fromkeys(s.strip().upper() for s in symbols))
+    return universes
+
+
+class UniverseIndex:
+    """Universe name -> symbols and symbol -> universes, hot reloadable.
+
+    Readers always see one complete snapshot (swapped atomically on reload).
+    The file's mtime is checked at most every ``check_interval`` seconds
+    on access, so edits go live without a restart; a file that fails to
+    parse keeps the previous snapshot. Behaves like a read-only mapping of
+    universe name to symbol tuple.
+    """
+
+    def __init__(self, path, check_interval=5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._seen_mtime = None  # last mtime attempted, so a broken file is not re-parsed every check
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.last_error = None
+        self.reload()
+        if self._snapshot is None:
+            raise RuntimeError(f"Cannot load universes from {path}: {self.last_error}")
+
+    def reload(self):
+        """Re-read the file now; returns True when a new snapshot was installed"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = self._seen_mtime = os.stat(self.path).st_mtime
+                with open(self.path, encoding='utf-8') as f:
+                    universes = parse_universes(json.load(f))
+            except (OSError, ValueError) as e:
+                self.last_error = str(e)
+                logger.warning("⚠️ Universe file %s not loaded: %s", self.path, e)
+                return False
+            self._snapshot = _Snapshot(universes, mtime)
+            self.reloads += 1
+            self.last_error = None
+        logger.info("🌌 Loaded %d universes (%d distinct symbols) from %s",
+                    len(universes), len(self._snapshot.memberships), self.path)
+        return True
+
+    def _current(self):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._checked_at = time.monotonic()
+            try:
+                changed = os.stat(self.path).st_mtime != self._seen_mtime
+            except OSError:
+                changed = False
+            if changed:
+                self.reload()
+        return self._snapshot
+
+    # Read-only mapping interface (used by the prefetcher)
+    def __getitem__(self, name):
+        return self._current().universes[name]
+
+    def __contains__(self, name):
+        return name in self._current().universes
+
+    def __iter__(self):
+        return iter(self._current().universes)
+
+    def __len__(self):
+        return len(self._current().universes)
+
+    def get(self, name, default=None):
+        return self._current().universes.get(name, default)
+
+    def universes_for(self, symbol):
+        """Names of every universe containing ``symbol``"""
+        return self._current().memberships.get(symbol.upper(), ())
+
+    def resolve(self, names, mode='union'):
+        """Distinct symbols of several universes, each exactly once.
+
+        ``mode`` is ``'union'`` (first-seen order) or ``'intersection'``
+        (order of the first universe). Returns ``(symbols, unknown_names)``.
+        """
+        if mode not in ('union', 'intersection'):
+            raise ValueError(f"Unknown universe mode: {mode}")
+        snapshot = self._current()
+        known = [name for name in names if name in snapshot.universes]
+        unknown = [name for name in names if name not in snapshot.universes]
+        if not known:
+            return [], unknown
+        if mode == 'union':
+            symbols = dict.fromkeys(symbol for name in known for symbol in snapshot.universes[name])
+            return list(symbols), unknown
+        wanted = set(known)
+        return [symbol for symbol in snapshot.universes[known[0]]
+                if wanted.issubset(snapshot.memberships[symbol])], unknown
+
+    def stats(self):
+        snapshot = self._current()
+        listed = sum(len(symbols) for symbols in snapshot.universes.values())
+        return {
+            "universes": len(snapshot.universes),
+            "symbols": len(snapshot.memberships),
+            "listed_symbols": listed,
+            "shared_symbols": sum(1 for names in snapshot.memberships.values() if len(names) > 1),
+            "reloads": self.reloads,
+            "loaded_at": int(snapshot.loaded_at),
+            "last_error": self.last_error
+        }
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Scanner Pro AI - Pooled Upstream HTTP Client
+Keep-alive connection pool shared by every proxy thread for upstream (FMP) GET requests
+"""
+
+import http.client
+import random
+import threading
+import time
+import urllib.parse
+from collections import deque
+from urllib.error import HTTPError
+
+# Statuses worth retrying for an idempotent GET
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class _HostPool:
+    """Idle connections and counters for one (scheme, host, port)"""
+
+    def __init__(self, max_connections):
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.idle = deque()  # (connection, last_used)
+        self.lock = threading.Lock()
+        self.open = 0
+        self.created = 0
+        self.reused = 0
+        self.retries = 0
+        self.errors = 0
+
+
+class UpstreamClient:
+    """Bounded keep-alive connection pool with retries for upstream GETs.
+
+    At most ``max_per_host`` connections exist per host; callers beyond that
+    wait up to ``pool_timeout`` seconds for one to be returned. Idle
+    connections are reused LIFO and dropped after ``max_idle_seconds``.
+    Connection failures and ``retry_statuses`` are retried ``retries`` times
+    with full-jitter exponential backoff.
+    """
+
+    def __init__(self, max_per_host=8, connect_timeout=3.0, read_timeout=10.0,
+                 retries=2, backoff=0.2, max_idle_seconds=30.0, pool_timeout=10.0,
+                 retry_statuses=RETRY_STATUSES):
+        self.max_per_host = max(1, max_per_host)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.max_idle_seconds = max_idle_seconds
+        self.pool_timeout = pool_timeout
+        self.retry_statuses = frozenset(retry_statuses)
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+
+    def _pool_for(self, key):
+        with self._pools_lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = _HostPool(self.max_per_host)
+            return pool
+
+    def _checkout(self, pool, key):
+        """Reuse the most recently used idle connection, or open a new one"""
+        now = time.monotonic()
+        with pool.lock:
+            while pool.idle:
+                conn, last_used = pool.idle.pop()
+                if now - last_used <= self.max_idle_seconds and conn.sock is not None:
+                    pool.reused += 1
+                    return conn, True
+                pool.open -= 1
+                conn.close()
+            pool.open += 1
+            pool.created += 1
+
+        scheme, host, port = key
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        conn = connection_class(host, port, timeout=self.connect_timeout)
+        try:
+            conn.connect()
+        except BaseException:
+            self._discard(pool, conn)
+            raise
+        return conn, False
+
+    def _checkin(self, pool, conn):
+        with pool.lock:
+            pool.idle.append((conn, time.monotonic()))
+
+    def _discard(self, pool, conn):
+        conn.close()
+        with pool.lock:
+            pool.open -= 1
+
+    def _sleep_backoff(self, attempt, retry_after=None):
+        delay = random.uniform(0, self.backoff * (2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, 30.0))
+        time.sleep(delay)
+
+    def get(self, url, timeout=None, headers=None):
+        """GET ``url`` and return the response body as bytes.
+
+        ``timeout`` overrides the read timeout for this call. Non-2xx
+        responses raise ``urllib.error.HTTPError`` so callers can handle
+        them exactly like ``urllib.request.urlopen`` failures.
+        """
+        parsed = urllib.parse.urlsplit(url)
+        scheme = parsed.scheme or 'http'
+        port = parsed.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parsed.hostname, port)
+        target = parsed.path or '/'
+        if parsed.query:
+            target += '?' + parsed.query
+        request_headers = {'Accept': 'application/json', 'Connection': 'keep-alive'}
+        request_headers.update(headers or {})
+
+        pool = self._pool_for(key)
+        attempt = 0
+        while True:
+            if not pool.slots.acquire(timeout=self.pool_timeout):
+                raise TimeoutError(f"Upstream pool for {parsed.hostname} exhausted")
+            retry_after = None
+            try:
+                conn, reused = self._checkout(pool, key)
+                try:
+                    conn.sock.settimeout(timeout or self.read_timeout)
+                    conn.request('GET', target, headers=request_headers)
+                    response = conn.getresponse()
+                    body = response.read()
+                except (http.client.HTTPException, OSError) as e:
+                    self._discard(pool, conn)
+                    if reused and attempt == 0 and not isinstance(e, TimeoutError):
+                        # A keep-alive connection the server already closed - the request never arrived
+                        attempt += 1
+                        continue
+                    raise
+                if response.will_close:
+                    self._discard(pool, conn)
+                else:
+                    self._checkin(pool, conn)
+            except (http.client.HTTPException, OSError):
+                with pool.lock:
+                    pool.errors += 1
+                if attempt >= self.retries:
+                    raise
+            else:
+                if 200 <= response.status < 300:
+                    return body
+                if response.status not in self.retry_statuses or attempt >= self.retries:
+                    with pool.lock:
+                        pool.errors += 1
+                    raise HTTPError(url, response.status, response.reason, response.headers, None)
+                header = response.getheader('Retry-After')
+                retry_after = float(header) if header and header.isdigit() else None
+            finally:
+                pool.slots.release()
+
+            with pool.lock:
+                pool.retries += 1
+            self._sleep_backoff(attempt, retry_after)
+            attempt += 1
+
+    def stats(self):
+        """Per-host and total pool counters"""
+        hosts = {}
+        totals = {"open": 0, "idle": 0, "in_use": 0, "created": 0, "reused": 0, "retries": 0, "errors": 0}
+        with self._pools_lock:
+            pools = list(self._pools.items())
+        for (scheme, host, port), pool in pools:
+            with pool.lock:
+                entry = {
+                    "open": pool.open,
+                    "idle": len(pool.idle),
+                    "in_use": pool.open - len(pool.idle),
+                    "created": pool.created,
+                    "reused": pool.reused,
+                    "retries": pool.retries,
+                    "errors": pool.errors
+                }
+            hosts[f"{scheme}://{host}:{port}"] = entry
+            for name in totals:
+                totals[name] += entry[name]
+        return dict(totals, max_per_host=self.max_per_host, hosts=hosts)
+
+    def close(self):
+        """Close every idle connection"""
+        with self._pools_lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            with pool.lock:
+                while pool.idle:
+                    conn, _ = pool.idle.pop()
+                    conn.close()
+                    pool.open -= 1